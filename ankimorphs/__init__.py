@@ -20,7 +20,7 @@ from typing import Literal
 import aqt
 from anki import hooks
 from anki.cards import Card
-from anki.collection import OpChangesAfterUndo
+from anki.collection import OpChanges, OpChangesAfterUndo
 from aqt import gui_hooks, mw
 from aqt.browser.browser import Browser
 from aqt.overview import Overview
@@ -44,6 +44,7 @@ from . import (
     browser_utils,
     debug_utils,
     message_box_utils,
+    morph_priority_utils,
     name_file_utils,
     reviewing_utils,
     tags_and_queue_utils,
@@ -55,10 +56,14 @@ from .ankimorphs_db import AnkiMorphsDB
 from .extra_settings import ankimorphs_extra_settings, extra_settings_keys
 from .extra_settings.ankimorphs_extra_settings import AnkiMorphsExtraSettings
 from .generators.generators_window import GeneratorWindow
-from .highlighting.highlight_just_in_time import highlight_morphs_jit
+from .highlighting.highlight_just_in_time import (
+    highlight_morphs_jit,
+    invalidate_highlighting_cache,
+)
 from .known_morphs_exporter import KnownMorphsExporterDialog
 from .progression.progression_window import ProgressionWindow
 from .recalc import recalc_main
+from .seen_morphs_index import seen_morphs_index
 from .settings import settings_dialog
 from .settings.settings_dialog import SettingsDialog
 from .tag_selection_dialog import TagSelectionDialog
@@ -79,6 +84,8 @@ def main() -> None:
     gui_hooks.top_toolbar_did_init_links.append(init_toolbar_items)
 
     gui_hooks.profile_did_open.append(load_am_profile_configs)
+    gui_hooks.profile_did_open.append(register_config_updated_action)
+    gui_hooks.profile_did_open.append(invalidate_highlighting_cache)
     gui_hooks.profile_did_open.append(init_db)
     gui_hooks.profile_did_open.append(create_am_directories_and_files)
     gui_hooks.profile_did_open.append(register_addon_dialogs)
@@ -101,7 +108,10 @@ def main() -> None:
 
     gui_hooks.state_did_undo.append(rebuild_seen_morphs)
 
+    gui_hooks.operation_did_execute.append(invalidate_config_snapshot_on_change)
+
     gui_hooks.profile_will_close.append(cleanup_profile_session)
+    gui_hooks.profile_will_close.append(invalidate_highlighting_cache)
 
 
 def init_toolbar_items(links: list[str], toolbar: Toolbar) -> None:
@@ -168,6 +178,19 @@ def load_am_profile_configs() -> None:
         ankimorphs_config.reset_all_configs()
 
 
+def register_config_updated_action() -> None:
+    # the configs can also be changed with the config editor of the add-ons dialog
+    assert mw is not None
+    mw.addonManager.setConfigUpdatedAction(__name__, invalidate_config_caches)
+
+
+def invalidate_config_caches(_config: object) -> None:
+    # the cached highlights were made with the old configs, just
+    # like when the configs are changed in the settings dialog
+    ankimorphs_config.invalidate_config_snapshot()
+    invalidate_highlighting_cache()
+
+
 def init_db() -> None:
     with AnkiMorphsDB() as am_db:
         am_db.create_all_tables()
@@ -408,10 +431,22 @@ def rebuild_seen_morphs(_changes: OpChangesAfterUndo) -> None:
             am_db.print_table("Seen_Morphs")
 
 
+def invalidate_config_snapshot_on_change(
+    changes: OpChanges, _handler: object | None
+) -> None:
+    # The note filters are matched by note type id, which changes
+    # when note types are added, renamed, removed or imported.
+    if changes.notetype:
+        ankimorphs_config.invalidate_config_snapshot()
+
+
 def cleanup_profile_session() -> None:
     global _updated_seen_morphs_for_profile
     _updated_seen_morphs_for_profile = False
     AnkiMorphsDB.drop_seen_morphs_table()
+    seen_morphs_index.reset()
+    morph_priority_utils.clear_loaded_morph_priorities()
+    ankimorphs_config.invalidate_config_snapshot()
     AnkiMorphsExtraSettings().save_current_ankimorphs_version()
 
 
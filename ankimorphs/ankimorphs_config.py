@@ -1,3 +1,4 @@
+# pylint:disable=too-many-lines
 ###################################################################################
 #                               ADDON SETTINGS/CONFIGS
 ###################################################################################
@@ -96,8 +97,11 @@ class RawConfigKeys:
     PREPROCESS_CUSTOM_CHARACTERS_TO_IGNORE = "preprocess_custom_characters_to_ignore"
     INTERVAL_FOR_KNOWN_MORPHS = "interval_for_known_morphs"
     RECALC_ON_SYNC = "recalc_on_sync"
+    RECALC_PROFILING = "recalc_profiling"
     RECALC_SUSPEND_KNOWN_NEW_CARDS = "recalc_suspend_known_new_cards"
     READ_KNOWN_MORPHS_FOLDER = "read_known_morphs_folder"
+    SPACY_WORKER_PROCESSES = "spacy_worker_processes"
+    SPACY_BATCH_SIZE = "spacy_batch_size"
     TOOLBAR_STATS_USE_KNOWN = "toolbar_stats_use_known"
     TOOLBAR_STATS_USE_SEEN = "toolbar_stats_use_seen"
     EXTRA_FIELDS_DISPLAY_INFLECTIONS = "extra_fields_display_inflections"
@@ -390,11 +394,33 @@ class AnkiMorphsConfig:  # pylint:disable=too-many-instance-attributes, too-many
                 expected_type=int,
                 use_default=is_default,
             )
+            # there always has to be at least one process and one sentence per batch
+            self.spacy_worker_processes: int = max(
+                1,
+                self._get_config_item(
+                    key=RawConfigKeys.SPACY_WORKER_PROCESSES,
+                    expected_type=int,
+                    use_default=is_default,
+                ),
+            )
+            self.spacy_batch_size: int = max(
+                1,
+                self._get_config_item(
+                    key=RawConfigKeys.SPACY_BATCH_SIZE,
+                    expected_type=int,
+                    use_default=is_default,
+                ),
+            )
             self.recalc_on_sync: bool = self._get_config_item(
                 key=RawConfigKeys.RECALC_ON_SYNC,
                 expected_type=bool,
                 use_default=is_default,
             )
+            self.recalc_profiling: bool = self._get_config_item(
+                key=RawConfigKeys.RECALC_PROFILING,
+                expected_type=bool,
+                use_default=is_default,
+            )
             self.recalc_suspend_known_new_cards: bool = self._get_config_item(
                 key=RawConfigKeys.RECALC_SUSPEND_KNOWN_NEW_CARDS,
                 expected_type=bool,
@@ -766,6 +792,7 @@ def load_stored_am_configs(
 
     # write the merged configs to 'meta.json', i.e. the config Anki uses.
     mw.addonManager.writeConfig(__name__, merged_configs)
+    invalidate_config_snapshot()
 
 
 def update_configs(new_configs: dict[str, str | int | float | bool | object]) -> None:
@@ -777,6 +804,7 @@ def update_configs(new_configs: dict[str, str | int | float | bool | object]) ->
         config[key] = value
 
     mw.addonManager.writeConfig(__name__, config)
+    invalidate_config_snapshot()
     save_config_to_am_file(config)
 
 
@@ -795,64 +823,169 @@ def reset_all_configs() -> None:
     assert mw is not None
     default_configs = get_all_defaults_config_dict()
     mw.addonManager.writeConfig(__name__, default_configs)  # updates 'meta.json'
+    invalidate_config_snapshot()
 
     assert default_configs is not None
     save_config_to_am_file(default_configs)
 
 
-def get_read_enabled_filters() -> list[AnkiMorphsConfigFilter]:
-    config_filters = AnkiMorphsConfig().get_config_filters()
-    assert isinstance(config_filters, list)
+################################################################
+#                      CONFIG SNAPSHOT
+################################################################
+# Creating an AnkiMorphsConfig reads the config and the default
+# config from the addon manager, and then validates every item,
+# which is far too slow for the code that runs on every card,
+# e.g. highlighting, reviewing and the toolbar.
+#
+# That code instead uses a shared snapshot of the config, which
+# is created the first time it is needed and then replaced
+# (never modified) when the configs change. The note types of
+# the filters are resolved to their ids once, so matching a
+# note to a filter is a dict lookup.
+#
+# Since the snapshot is shared, the config and filter objects
+# it contains must not be modified.
+################################################################
+
+
+class _ConfigSnapshot:
+    __slots__ = (
+        "am_config",
+        "config_filters",
+        "_filters",
+        "_read_filters",
+        "_modify_filters",
+        "_missing_note_types",
+    )
 
-    read_filters = []
-    for config_filter in config_filters:
-        if config_filter.read:
-            read_filters.append(config_filter)
-    return read_filters
+    def __init__(self) -> None:
+        self.am_config: AnkiMorphsConfig = AnkiMorphsConfig()
+        self.config_filters: list[AnkiMorphsConfigFilter] = (
+            self.am_config.get_config_filters()
+        )
+        # note type id -> filter, these are resolved the first time they are
+        # needed and not here, since the config is also used before the
+        # collection is loaded (e.g. by the toolbar).
+        self._filters: dict[NotetypeId, AnkiMorphsConfigFilter] | None = None
+        self._read_filters: dict[NotetypeId, AnkiMorphsConfigFilter] = {}
+        self._modify_filters: dict[NotetypeId, AnkiMorphsConfigFilter] = {}
+        # the note types of the filters that did not exist when resolved
+        self._missing_note_types: list[str] = []
+
+    def get_matching_filter(
+        self, note_type_id: NotetypeId, only_read: bool, only_modify: bool
+    ) -> AnkiMorphsConfigFilter | None:
+        if self._filters is None or (
+            note_type_id not in self._filters and self._has_new_note_types()
+        ):
+            # Note types that are renamed or removed are handled by invalidating
+            # the snapshot when the note types change, but a note type could
+            # also be added without an operation, e.g. by other add-ons.
+            self._resolve_note_type_ids()
+        assert self._filters is not None
+
+        if only_read:
+            return self._read_filters.get(note_type_id)
+        if only_modify:
+            return self._modify_filters.get(note_type_id)
+        return self._filters.get(note_type_id)
+
+    def _has_new_note_types(self) -> bool:
+        assert mw is not None
+        return any(
+            mw.col.models.id_for_name(note_type) is not None
+            for note_type in self._missing_note_types
+        )
 
+    def _resolve_note_type_ids(self) -> None:
+        assert mw is not None
 
-def get_modify_enabled_filters() -> list[AnkiMorphsConfigFilter]:
-    config_filters = AnkiMorphsConfig().get_config_filters()
-    assert isinstance(config_filters, list)
+        filters: dict[NotetypeId, AnkiMorphsConfigFilter] = {}
+        read_filters: dict[NotetypeId, AnkiMorphsConfigFilter] = {}
+        modify_filters: dict[NotetypeId, AnkiMorphsConfigFilter] = {}
+        missing_note_types: list[str] = []
 
-    modify_filters = []
-    for config_filter in config_filters:
-        if config_filter.modify:
-            modify_filters.append(config_filter)
-    return modify_filters
+        for config_filter in self.config_filters:
+            note_type_id: NotetypeId | None = mw.col.models.id_for_name(
+                config_filter.note_type
+            )
+            if note_type_id is None:
+                missing_note_types.append(config_filter.note_type)
+                continue
+            # only the first matching filter is used
+            filters.setdefault(note_type_id, config_filter)
+            if config_filter.read:
+                read_filters.setdefault(note_type_id, config_filter)
+            if config_filter.modify:
+                modify_filters.setdefault(note_type_id, config_filter)
 
+        self._read_filters = read_filters
+        self._modify_filters = modify_filters
+        self._missing_note_types = missing_note_types
+        # assigned last, that way the other dicts are ready when this is set
+        self._filters = filters
 
-def get_matching_filter(note: Note) -> AnkiMorphsConfigFilter | None:
-    assert mw is not None
-    config_filters = AnkiMorphsConfig().get_config_filters()
-    assert isinstance(config_filters, list)
 
-    for am_filter in config_filters:
-        note_type_id: NotetypeId | None = mw.col.models.id_for_name(am_filter.note_type)
-        if note_type_id == note.mid:
-            return am_filter
-    return None
+_config_snapshot: _ConfigSnapshot | None = None
 
 
-def get_matching_modify_filter(note: Note) -> AnkiMorphsConfigFilter | None:
-    assert mw is not None
-    modify_filters: list[AnkiMorphsConfigFilter] = get_modify_enabled_filters()
+def _get_config_snapshot() -> _ConfigSnapshot:
+    global _config_snapshot
+
+    # Reading the global only once makes sure that we get a complete
+    # snapshot even if it is replaced by another thread in the meantime.
+    config_snapshot: _ConfigSnapshot | None = _config_snapshot
+    if config_snapshot is None:
+        config_snapshot = _ConfigSnapshot()
+        _config_snapshot = config_snapshot
+    return config_snapshot
+
+
+def invalidate_config_snapshot() -> None:
+    global _config_snapshot
+    _config_snapshot = None
+
+
+def get_config() -> AnkiMorphsConfig:
+    """
+    Returns the shared config snapshot, which must not be modified.
+    Use AnkiMorphsConfig() to get a config that can be modified.
+    """
+    return _get_config_snapshot().am_config
+
+
+def get_read_enabled_filters() -> list[AnkiMorphsConfigFilter]:
+    return [
+        config_filter
+        for config_filter in _get_config_snapshot().config_filters
+        if config_filter.read
+    ]
 
-    for am_filter in modify_filters:
-        note_type_id: NotetypeId | None = mw.col.models.id_for_name(am_filter.note_type)
-        if note_type_id == note.mid:
-            return am_filter
-    return None
+
+def get_modify_enabled_filters() -> list[AnkiMorphsConfigFilter]:
+    return [
+        config_filter
+        for config_filter in _get_config_snapshot().config_filters
+        if config_filter.modify
+    ]
+
+
+def get_matching_filter(note: Note) -> AnkiMorphsConfigFilter | None:
+    return _get_config_snapshot().get_matching_filter(
+        note.mid, only_read=False, only_modify=False
+    )
+
+
+def get_matching_modify_filter(note: Note) -> AnkiMorphsConfigFilter | None:
+    return _get_config_snapshot().get_matching_filter(
+        note.mid, only_read=False, only_modify=True
+    )
 
 
 def get_matching_read_filter(note: Note) -> AnkiMorphsConfigFilter | None:
-    assert mw is not None
-    read_filters: list[AnkiMorphsConfigFilter] = get_read_enabled_filters()
-    for am_filter in read_filters:
-        note_type_id: NotetypeId | None = mw.col.models.id_for_name(am_filter.note_type)
-        if note_type_id == note.mid:
-            return am_filter
-    return None
+    return _get_config_snapshot().get_matching_filter(
+        note.mid, only_read=True, only_modify=False
+    )
 
 
 def show_critical_config_error() -> None:
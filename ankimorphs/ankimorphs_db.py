@@ -1,9 +1,8 @@
 from __future__ import annotations
 
-import functools
+import marshal
 import sqlite3
-from collections import Counter
-from collections.abc import Sequence
+from collections.abc import Iterable, Sequence
 from pathlib import Path
 from typing import Any
 
@@ -18,12 +17,22 @@ from .ankimorphs_config import AnkiMorphsConfig
 from .morpheme import Morpheme
 from .name_file_utils import get_names_from_file_as_morphs
 from .recalc.anki_data_utils import AnkiMorphsCardData
+from .seen_morphs_index import seen_morphs_index
 
 
 class AnkiMorphsDB:  # pylint:disable=too-many-public-methods
     # A card can have many morphs, morphs can be on many cards,
     # therefore, we need a many-to-many db structure:
     # Cards -> Card_Morph_Map <- Morphs
+    #
+    # Card_Morph_Map is by far the biggest table, so it only stores integer
+    # ids, that way the table stays small and the joins compare integers
+    # instead of strings. Morphs that share a lemma also share a lemma_id.
+    #
+    # The tags of the cards are stored the same way:
+    # Cards -> Card_Tags <- Tags
+    # which means the tag filters can use an index instead of
+    # scanning the tags text of every card.
 
     def __init__(self, db_path: Path | None = None) -> None:
         """
@@ -59,9 +68,22 @@ class AnkiMorphsDB:  # pylint:disable=too-many-public-methods
             self.con.close()
 
     def create_all_tables(self) -> None:
+        try:
+            self._create_all_tables()
+        except sqlite3.OperationalError:
+            # The existing tables have an outdated schema, e.g. the
+            # morph_id column is missing. The tables are rebuilt
+            # from scratch on every recalc anyway, so we can safely
+            # drop them here.
+            self.drop_all_tables()
+            self._create_all_tables()
+
+    def _create_all_tables(self) -> None:
         self.create_morph_table()
         self.create_cards_table()
         self.create_card_morph_map_table()
+        self.create_tags_tables()
+        self.create_collection_priorities_table()
         self.create_seen_morph_table()
 
     def create_cards_table(self) -> None:
@@ -74,10 +96,17 @@ class AnkiMorphsDB:  # pylint:disable=too-many-public-methods
                         note_id INTEGER,
                         note_type_id INTEGER,
                         card_type INTEGER,
-                        tags TEXT
+                        tags TEXT,
+                        expression_hash TEXT
                     )
                     """
             )
+            self.con.execute(
+                """
+                    CREATE INDEX IF NOT EXISTS Cards_Note_Type_Id
+                    ON Cards (note_type_id)
+                    """
+            )
 
     def create_card_morph_map_table(self) -> None:
         with self.con:
@@ -86,14 +115,66 @@ class AnkiMorphsDB:  # pylint:disable=too-many-public-methods
                     CREATE TABLE IF NOT EXISTS Card_Morph_Map
                     (
                         card_id INTEGER,
-                        morph_lemma TEXT,
-                        morph_inflection TEXT,
-                        FOREIGN KEY(card_id) REFERENCES card(id),
-                        FOREIGN KEY(morph_lemma, morph_inflection) REFERENCES morph(lemma, inflection)
-                        PRIMARY KEY(card_id, morph_lemma, morph_inflection)
+                        morph_id INTEGER,
+                        FOREIGN KEY(card_id) REFERENCES Cards(card_id),
+                        FOREIGN KEY(morph_id) REFERENCES Morphs(morph_id),
+                        PRIMARY KEY(card_id, morph_id)
+                    ) WITHOUT ROWID
+                    """
+            )
+            # covering index for finding the cards that have a specific morph
+            self.con.execute(
+                """
+                    CREATE INDEX IF NOT EXISTS Card_Morph_Map_Morph_Id
+                    ON Card_Morph_Map (morph_id, card_id)
+                    """
+            )
+
+    def create_tags_tables(self) -> None:
+        with self.con:
+            self.con.execute(
+                """
+                    CREATE TABLE IF NOT EXISTS Tags
+                    (
+                        tag_id INTEGER PRIMARY KEY,
+                        tag TEXT
                     )
                     """
             )
+            self.con.execute(
+                """
+                    CREATE TABLE IF NOT EXISTS Card_Tags
+                    (
+                        card_id INTEGER,
+                        tag_id INTEGER,
+                        FOREIGN KEY(card_id) REFERENCES Cards(card_id),
+                        FOREIGN KEY(tag_id) REFERENCES Tags(tag_id),
+                        PRIMARY KEY(card_id, tag_id)
+                    ) WITHOUT ROWID
+                    """
+            )
+            # covering index for finding the cards that have a specific tag
+            self.con.execute(
+                """
+                    CREATE INDEX IF NOT EXISTS Card_Tags_Tag_Id
+                    ON Card_Tags (tag_id, card_id)
+                    """
+            )
+
+    def create_collection_priorities_table(self) -> None:
+        with self.con:
+            self.con.execute(
+                """
+                    CREATE TABLE IF NOT EXISTS Collection_Priorities
+                    (
+                        only_lemma_priorities INTEGER,
+                        lemma TEXT,
+                        inflection TEXT,
+                        rank INTEGER,
+                        PRIMARY KEY (only_lemma_priorities, lemma, inflection)
+                    ) WITHOUT ROWID
+                    """
+            )
 
     def create_morph_table(self) -> None:
         with self.con:
@@ -101,14 +182,22 @@ class AnkiMorphsDB:  # pylint:disable=too-many-public-methods
                 """
                     CREATE TABLE IF NOT EXISTS Morphs
                     (
+                        morph_id INTEGER PRIMARY KEY,
+                        lemma_id INTEGER,
                         lemma TEXT,
                         inflection TEXT,
                         highest_lemma_learning_interval INTEGER,
                         highest_inflection_learning_interval INTEGER,
-                        PRIMARY KEY (lemma, inflection)
+                        UNIQUE (lemma, inflection)
                     )
                     """
             )
+            self.con.execute(
+                """
+                    CREATE INDEX IF NOT EXISTS Morphs_Lemma_Id
+                    ON Morphs (lemma_id)
+                    """
+            )
 
     def create_seen_morph_table(self) -> None:
         with self.con:
@@ -123,99 +212,163 @@ class AnkiMorphsDB:  # pylint:disable=too-many-public-methods
                     """
             )
 
+    def create_priority_file_cache_table(self) -> None:
+        # Not part of create_all_tables or drop_all_tables since it is not
+        # rebuilt on recalc, the cached priorities stay valid as long as the
+        # file is unchanged (the path, mode, mtime and size are stored).
+        with self.con:
+            self.con.execute(
+                """
+                    CREATE TABLE IF NOT EXISTS Priority_File_Cache
+                    (
+                        file_path TEXT,
+                        only_lemma_priorities INTEGER,
+                        modified_time INTEGER,
+                        file_size INTEGER,
+                        marshal_version INTEGER,
+                        morph_priorities BLOB,
+                        PRIMARY KEY (file_path, only_lemma_priorities)
+                    )
+                    """
+            )
+
     def insert_many_into_card_table(
-        self, card_list: list[dict[str, int | str | bool]]
+        self, card_rows: Iterable[tuple[int, int, int, int, str, str]]
     ) -> None:
+        """
+        card_rows: (card_id, note_id, note_type_id, card_type, tags, expression_hash)
+        """
         with self.con:
             self.con.executemany(
                 """
-                    INSERT OR IGNORE INTO Cards VALUES
-                    (
-                       :card_id,
-                       :note_id,
-                       :note_type_id,
-                       :card_type,
-                       :tags
-                    )
+                    INSERT OR IGNORE INTO Cards VALUES (?, ?, ?, ?, ?, ?)
                     """,
-                card_list,
+                card_rows,
             )
 
     def insert_many_into_morph_table(
-        self, morph_list: list[dict[str, int | str | bool]]
+        self, morph_rows: Iterable[tuple[int, int, str, str, int, int]]
     ) -> None:
+        """
+        morph_rows: (morph_id, lemma_id, lemma, inflection, highest_lemma_learning_interval,
+        highest_inflection_learning_interval), the learning intervals have
+        to be final, i.e. the morphs have to be unique.
+        """
         with self.con:
-            # we only need to update the inflections on conflict since the lemmas
-            # have already been updated before they are inserted here
             self.con.executemany(
                 """
-                    INSERT INTO Morphs
-                    VALUES
-                    (
-                       :lemma,
-                       :inflection,
-                       :highest_lemma_learning_interval,
-                       :highest_inflection_learning_interval
-                    )
-                    ON CONFLICT(lemma, inflection) DO UPDATE SET
-                        highest_inflection_learning_interval = :highest_inflection_learning_interval
-                    WHERE highest_inflection_learning_interval < :highest_inflection_learning_interval
-                """,
-                morph_list,
+                    INSERT OR IGNORE INTO Morphs VALUES (?, ?, ?, ?, ?, ?)
+                    """,
+                morph_rows,
             )
 
     def insert_many_into_card_morph_map_table(
-        self, card_morph_list: list[dict[str, int | str | bool]]
+        self, card_morph_rows: Iterable[tuple[int, int]]
     ) -> None:
+        """
+        card_morph_rows: (card_id, morph_id)
+        """
         with self.con:
             self.con.executemany(
                 """
-                    INSERT OR IGNORE INTO Card_Morph_Map VALUES
-                    (
-                       :card_id,
-                       :morph_lemma,
-                       :morph_inflection
-                    )
+                    INSERT OR IGNORE INTO Card_Morph_Map VALUES (?, ?)
                     """,
-                card_morph_list,
+                card_morph_rows,
             )
 
-    def get_readable_card_morphs(self, card_id: int) -> list[tuple[str, str]]:
-        card_morphs: list[tuple[str, str]] = []
+    def insert_many_into_tag_table(self, tag_rows: Iterable[tuple[int, str]]) -> None:
+        """
+        tag_rows: (tag_id, tag)
+        """
+        with self.con:
+            self.con.executemany(
+                """
+                    INSERT OR IGNORE INTO Tags VALUES (?, ?)
+                    """,
+                tag_rows,
+            )
 
+    def insert_many_into_card_tags_table(
+        self, card_tag_rows: Iterable[tuple[int, int]]
+    ) -> None:
+        """
+        card_tag_rows: (card_id, tag_id)
+        """
         with self.con:
-            card_morphs_raw = self.con.execute(
+            self.con.executemany(
                 """
-                    SELECT morph_lemma, morph_inflection
-                    FROM Card_Morph_Map
-                    WHERE card_id = ?
+                    INSERT OR IGNORE INTO Card_Tags VALUES (?, ?)
                     """,
-                (card_id,),
-            ).fetchall()
+                card_tag_rows,
+            )
 
-            for row in card_morphs_raw:
-                card_morphs.append((row[0], row[1]))
+    def get_card_expression_hashes(self) -> dict[int, str]:
+        """
+        Returns the expression hashes stored during the previous recalc.
+        An empty dict is returned if the Cards table is missing or has an
+        outdated schema, which results in every card being re-morphemized.
+        """
+        try:
+            with self.con:
+                rows = self.con.execute(
+                    """
+                        SELECT card_id, expression_hash
+                        FROM Cards
+                        WHERE expression_hash IS NOT NULL
+                        """
+                ).fetchall()
+        except sqlite3.OperationalError:
+            return {}
 
-        return card_morphs
+        return dict(rows)
 
-    def get_all_morphs_seen_today(self, only_lemma: bool = False) -> set[str]:
-        self.create_seen_morph_table()
-        card_morphs: set[str] = set("")
-        select_statement: str = "SELECT lemma, inflection"
+    def get_all_card_morphs(self) -> dict[int, set[Morpheme]] | None:
+        """
+        Returns the morphs of every card without learning intervals,
+        used to skip morphemizing cards whose expressions have not changed.
+        None is returned if the tables are missing or have an outdated schema.
+        """
+        card_morphs: dict[int, set[Morpheme]] = {}
 
-        if only_lemma:
-            select_statement = "SELECT lemma, lemma"
+        try:
+            with self.con:
+                rows = self.con.execute(
+                    """
+                        SELECT cmm.card_id, m.lemma, m.inflection
+                        FROM Card_Morph_Map cmm
+                        INNER JOIN Morphs m ON
+                            cmm.morph_id = m.morph_id
+                        """
+                ).fetchall()
+        except sqlite3.OperationalError:
+            return None
+
+        for card_id, lemma, inflection in rows:
+            morph = Morpheme(lemma=lemma, inflection=inflection)
+            if card_id not in card_morphs:
+                card_morphs[card_id] = {morph}
+            else:
+                card_morphs[card_id].add(morph)
+
+        return card_morphs
+
+    def get_readable_card_morphs(self, card_id: int) -> list[tuple[str, str]]:
+        card_morphs: list[tuple[str, str]] = []
 
         with self.con:
             card_morphs_raw = self.con.execute(
-                f"""
-                    {select_statement}
-                    FROM Seen_Morphs
-                    """
+                """
+                    SELECT m.lemma, m.inflection
+                    FROM Card_Morph_Map cmm
+                    INNER JOIN Morphs m ON
+                        cmm.morph_id = m.morph_id
+                    WHERE cmm.card_id = ?
+                    """,
+                (card_id,),
             ).fetchall()
 
             for row in card_morphs_raw:
-                card_morphs.add(row[0] + row[1])
+                card_morphs.append((row[0], row[1]))
 
         return card_morphs
 
@@ -224,81 +377,74 @@ class AnkiMorphsDB:  # pylint:disable=too-many-public-methods
             self.con.execute(
                 """
                     INSERT OR IGNORE INTO Seen_Morphs (lemma, inflection)
-                    SELECT morph_lemma, morph_inflection
-                    FROM Card_Morph_Map
-                    WHERE card_id = ?
+                    SELECT m.lemma, m.inflection
+                    FROM Card_Morph_Map cmm
+                    INNER JOIN Morphs m ON
+                        cmm.morph_id = m.morph_id
+                    WHERE cmm.card_id = ?
                     """,
                 (card_id,),
             )
 
-    def get_card_morphs(
-        self, card_id: int, search_unknowns: bool = False, only_lemma: bool = False
-    ) -> set[tuple[str, str]] | None:
-        """
-        Returns a set of tuples (lemma, inflection)
-        """
-        morphs: set[tuple[str, str]] = set()
-
-        if only_lemma:
-            raw_base_card_morphs = self._get_card_morph_lemma_and_lemma(
-                card_id, search_unknowns
-            )
-        else:
-            raw_base_card_morphs = self._get_card_morph_lemma_and_inflection(
-                card_id, search_unknowns
+        if seen_morphs_index.has_seen_morphs():
+            seen_morphs_index.add_seen_morphs(
+                self.get_card_morph_and_lemma_ids(card_id)
             )
 
-        for card_morph in raw_base_card_morphs:
-            morphs.add((card_morph[0], card_morph[1]))
-
-        if len(morphs) == 0:
-            return None
-
-        return morphs
-
-    def _get_card_morph_lemma_and_inflection(
-        self, card_id: int, search_unknowns: bool
-    ) -> list[str]:
-        where_query_string = "WHERE Card_Morph_Map.card_id = ?"
-
-        if search_unknowns:
-            where_query_string += " AND Morphs.highest_inflection_learning_interval = 0"
-
+    def get_card_morph_and_lemma_ids(self, card_id: int) -> list[tuple[int, int]]:
         with self.con:
-            card_morphs = self.con.execute(
+            return self.con.execute(
                 """
-                    SELECT DISTINCT morph_lemma, morph_inflection
-                    FROM Card_Morph_Map
-                    INNER JOIN Morphs ON
-                        Card_Morph_Map.morph_lemma = Morphs.lemma AND Card_Morph_Map.morph_inflection = Morphs.inflection
-                    """
-                + where_query_string,
+                    SELECT m.morph_id, m.lemma_id
+                    FROM Card_Morph_Map cmm
+                    INNER JOIN Morphs m ON
+                        cmm.morph_id = m.morph_id
+                    WHERE cmm.card_id = ?
+                    """,
                 (card_id,),
             ).fetchall()
 
-        return card_morphs
-
-    def _get_card_morph_lemma_and_lemma(
-        self, card_id: int, search_unknowns: bool
-    ) -> list[str]:
-        where_query_string = "WHERE Card_Morph_Map.card_id = ?"
-
-        if search_unknowns:
-            where_query_string += " AND Morphs.highest_lemma_learning_interval = 0"
-
-        with self.con:
-            card_morphs = self.con.execute(
-                """
-                    SELECT DISTINCT morph_lemma, morph_lemma
-                    FROM Card_Morph_Map
-                    INNER JOIN Morphs ON
-                        Card_Morph_Map.morph_lemma = Morphs.lemma
+    def load_seen_morphs_index(self) -> None:
+        if not seen_morphs_index.has_seen_morphs():
+            self.create_seen_morph_table()
+            with self.con:
+                seen_morph_ids = self.con.execute(
                     """
-                + where_query_string,
-                (card_id,),
-            ).fetchall()
+                    SELECT m.morph_id
+                    FROM Seen_Morphs sm
+                    INNER JOIN Morphs m ON
+                        m.lemma = sm.lemma AND m.inflection = sm.inflection
+                    """
+                ).fetchall()
+                # names are stored as (name, name), so we can't rely on
+                # the inflection to find the lemma ids
+                seen_lemma_ids = self.con.execute(
+                    """
+                    SELECT DISTINCT m.lemma_id
+                    FROM Seen_Morphs sm
+                    INNER JOIN Morphs m ON
+                        m.lemma = sm.lemma
+                    """
+                ).fetchall()
+            seen_morphs_index.set_seen_morphs(
+                seen_morph_ids=(row[0] for row in seen_morph_ids),
+                seen_lemma_ids=(row[0] for row in seen_lemma_ids),
+            )
 
-        return card_morphs
+        if not seen_morphs_index.has_card_unknown_morphs():
+            with self.con:
+                # a morph with an unknown lemma always has an unknown inflection
+                seen_morphs_index.set_card_unknown_morphs(
+                    self.con.execute(
+                        """
+                        SELECT cmm.card_id, m.morph_id, m.lemma_id, m.highest_lemma_learning_interval
+                        FROM Card_Morph_Map cmm
+                        INNER JOIN Morphs m ON
+                            cmm.morph_id = m.morph_id
+                        WHERE m.highest_inflection_learning_interval = 0
+                        """
+                    )
+                )
 
     def get_ids_of_cards_with_same_morphs(
         self,
@@ -306,37 +452,40 @@ class AnkiMorphsDB:  # pylint:disable=too-many-public-methods
         search_unknowns: bool = False,
         search_lemma_only: bool = False,
     ) -> set[CardId] | None:
-        # The where_query_string is a necessary hack to overcome the sqlite problem
-        # of not allowing variable length parameters
-
         card_ids: set[CardId] = set()
-        card_morphs: set[tuple[str, str]] | None = self.get_card_morphs(
-            card_id, search_unknowns
-        )
-        if card_morphs is None:
-            return None
 
+        # Morphs with the same lemma share the same lemma_id, so we can find
+        # the other cards by only joining on integer ids.
         if search_lemma_only:
-            where_query_string = "WHERE" + "".join(
-                [f" (morph_lemma = '{morph[0]}') OR" for morph in card_morphs]
-            )
+            same_morphs_join = """
+                INNER JOIN Morphs same_morphs ON
+                    same_morphs.lemma_id = card_morphs.lemma_id
+                INNER JOIN Card_Morph_Map other_cards ON
+                    other_cards.morph_id = same_morphs.morph_id
+                """
         else:
-            where_query_string = "WHERE" + "".join(
-                [
-                    f" (morph_lemma = '{morph[0]}' AND morph_inflection = '{morph[1]}') OR"
-                    for morph in card_morphs
-                ]
-            )
+            same_morphs_join = """
+                INNER JOIN Card_Morph_Map other_cards ON
+                    other_cards.morph_id = card_morphs.morph_id
+                """
 
-        where_query_string = where_query_string[:-3]  # removes last ' OR'
+        where_query_string = "WHERE card_morph_map.card_id = ?"
+        if search_unknowns:
+            where_query_string += (
+                " AND card_morphs.highest_inflection_learning_interval = 0"
+            )
 
         with self.con:
             raw_card_ids = self.con.execute(
                 """
-                SELECT DISTINCT card_id
-                FROM Card_Morph_Map
+                SELECT DISTINCT other_cards.card_id
+                FROM Card_Morph_Map card_morph_map
+                INNER JOIN Morphs card_morphs ON
+                    card_morphs.morph_id = card_morph_map.morph_id
                 """
+                + same_morphs_join
                 + where_query_string,
+                (card_id,),
             ).fetchall()
 
             for card_id_raw in raw_card_ids:
@@ -347,44 +496,19 @@ class AnkiMorphsDB:  # pylint:disable=too-many-public-methods
 
         return card_ids
 
-    def get_highest_inflection_learning_interval(self, morph: Morpheme) -> int | None:
+    def get_all_highest_learning_intervals(self) -> list[tuple[str, str, int, int]]:
+        """
+        returns: (lemma, inflection, highest_lemma_learning_interval,
+        highest_inflection_learning_interval) of all morphs that are not unknown
+        """
         with self.con:
-            highest_learning_interval = self.con.execute(
+            return self.con.execute(
                 """
-                    SELECT highest_inflection_learning_interval
-                    FROM Morphs
-                    WHERE lemma = ? And inflection = ?
-                    """,
-                (morph.lemma, morph.inflection),
-            ).fetchone()
-
-            if highest_learning_interval is None:
-                return None
-
-            # un-tuple the result
-            highest_learning_interval = highest_learning_interval[0]
-            assert isinstance(highest_learning_interval, int)
-            return highest_learning_interval
-
-    def get_highest_lemma_learning_interval(self, morph: Morpheme) -> int | None:
-        with self.con:
-            highest_learning_interval = self.con.execute(
+                SELECT lemma, inflection, highest_lemma_learning_interval, highest_inflection_learning_interval
+                FROM Morphs
+                WHERE highest_lemma_learning_interval > 0
                 """
-                    SELECT highest_lemma_learning_interval
-                    FROM Morphs
-                    WHERE lemma = ?
-                    LIMIT 1
-                    """,
-                (morph.lemma,),
-            ).fetchone()
-
-            if highest_learning_interval is None:
-                return None
-
-            # un-tuple the result
-            highest_learning_interval = highest_learning_interval[0]
-            assert isinstance(highest_learning_interval, int)
-            return highest_learning_interval
+            ).fetchall()
 
     def get_morph_inflections_learning_statuses(self) -> dict[str, str]:
         morph_status_dict: dict[str, str] = {}
@@ -448,7 +572,7 @@ class AnkiMorphsDB:  # pylint:disable=too-many-public-methods
             SELECT Card_Morph_Map.card_id, Morphs.lemma, Morphs.inflection, Morphs.highest_lemma_learning_interval, Morphs.highest_inflection_learning_interval
             FROM Card_Morph_Map
             INNER JOIN Morphs ON
-                Card_Morph_Map.morph_lemma = Morphs.lemma AND Card_Morph_Map.morph_inflection = Morphs.inflection
+                Card_Morph_Map.morph_id = Morphs.morph_id
             ORDER BY Morphs.lemma, Morphs.inflection
             """,
         ).fetchall()
@@ -472,8 +596,8 @@ class AnkiMorphsDB:  # pylint:disable=too-many-public-methods
     def get_am_cards_data_dict(
         self,
         note_type_id: NotetypeId | None,
-        include_tags: str,  # whitespace separated string
-        exclude_tags: str,  # whitespace separated string
+        include_tags: Sequence[str],
+        exclude_tags: Sequence[str],
     ) -> dict[CardId, AnkiMorphsCardData]:
         assert mw is not None
         assert mw.col.db is not None
@@ -487,15 +611,21 @@ class AnkiMorphsDB:  # pylint:disable=too-many-public-methods
 
         params: list[Any] = [note_type_id]
 
-        if len(include_tags) > 0:
-            required_conditions = " AND ".join(["tags LIKE ?"] * len(include_tags))
-            query += f" AND {required_conditions}"
-            params.extend([f"% {tag} %" for tag in include_tags])
-
-        if len(exclude_tags) > 0:
-            excluded_conditions = " AND ".join(["tags NOT LIKE ?"] * len(exclude_tags))
-            query += f" AND {excluded_conditions}"
-            params.extend([f"% {tag} %" for tag in exclude_tags])
+        for tag in include_tags:
+            tag_ids: list[int] = self._get_matching_tag_ids(tag)
+            if len(tag_ids) == 0:
+                return {}  # none of the cards have the required tag
+            placeholders = ",".join(["?"] * len(tag_ids))
+            query += f" AND card_id IN (SELECT card_id FROM Card_Tags WHERE tag_id IN ({placeholders}))"
+            params.extend(tag_ids)
+
+        for tag in exclude_tags:
+            tag_ids = self._get_matching_tag_ids(tag)
+            if len(tag_ids) == 0:
+                continue  # none of the cards have the excluded tag
+            placeholders = ",".join(["?"] * len(tag_ids))
+            query += f" AND card_id NOT IN (SELECT card_id FROM Card_Tags WHERE tag_id IN ({placeholders}))"
+            params.extend(tag_ids)
 
         result = self.con.execute(query, tuple(params)).fetchall()
 
@@ -505,45 +635,151 @@ class AnkiMorphsDB:  # pylint:disable=too-many-public-methods
 
         return am_db_row_data_dict
 
-    # the cache needs to have a max size to maintain garbage collection
-    @functools.lru_cache(maxsize=131072)
+    def _get_matching_tag_ids(self, tag: str) -> list[int]:
+        # Tags match the same way as the tag searches in Anki: the case is
+        # ignored and the child tags of hierarchical tags are included,
+        # e.g. 'movie' matches 'Movie' and 'movie::comedy'.
+        tag = tag.casefold()
+        child_tag_prefix = tag + "::"
+        return [
+            tag_id
+            for tag_id, other_tag in self.con.execute("SELECT tag_id, tag FROM Tags")
+            if other_tag.casefold() == tag
+            or other_tag.casefold().startswith(child_tag_prefix)
+        ]
+
+    def insert_collection_priorities(self) -> None:
+        # The more cards a morph is on, the more it is prioritized, i.e. the lower
+        # its rank is. Morphs that are on the same number of cards are ranked
+        # alphabetically, which keeps the ranks stable between recalcs.
+        #
+        # The lemma priorities use the lemma as the inflection, that way they
+        # can be looked up with the same (lemma, inflection) keys.
+        with self.con:
+            self.con.execute("DELETE FROM Collection_Priorities")
+            self.con.execute(
+                """
+                INSERT INTO Collection_Priorities
+                SELECT 0, m.lemma, m.inflection,
+                    ROW_NUMBER() OVER (ORDER BY COUNT(*) DESC, m.lemma, m.inflection) - 1
+                FROM Card_Morph_Map cmm
+                INNER JOIN Morphs m ON
+                    cmm.morph_id = m.morph_id
+                GROUP BY cmm.morph_id
+                """
+            )
+            self.con.execute(
+                """
+                INSERT INTO Collection_Priorities
+                SELECT 1, m.lemma, m.lemma,
+                    ROW_NUMBER() OVER (ORDER BY COUNT(*) DESC, m.lemma) - 1
+                FROM Card_Morph_Map cmm
+                INNER JOIN Morphs m ON
+                    cmm.morph_id = m.morph_id
+                GROUP BY m.lemma_id
+                """
+            )
+
     def get_morph_priorities_from_collection(
         self, only_lemma_priorities: bool
     ) -> dict[tuple[str, str], int]:
-        # Sorting the morphs (ORDER BY) is crucial to avoid bugs
-        morphs_query = self.con.execute(
-            """
-            SELECT morph_lemma, morph_inflection
-            FROM Card_Morph_Map
-            ORDER BY morph_lemma, morph_inflection
-            """,
-        ).fetchall()
+        # the ranks are computed when caching, see insert_collection_priorities
+        try:
+            morph_priorities = self._get_collection_priorities(only_lemma_priorities)
+        except sqlite3.OperationalError:
+            morph_priorities = {}  # the table does not exist
 
-        intermediate_morph_list = []
+        if len(morph_priorities) == 0:
+            # the db might be from a version that did not have the table yet,
+            # in which case the ranks have not been computed since the last recalc.
+            self.create_collection_priorities_table()
+            self.insert_collection_priorities()
+            morph_priorities = self._get_collection_priorities(only_lemma_priorities)
 
-        if only_lemma_priorities:
-            for lemma, _ in morphs_query:
-                intermediate_morph_list.append((lemma, lemma))
-        else:
-            for lemma, inflection in morphs_query:
-                intermediate_morph_list.append((lemma, inflection))
+        return morph_priorities
 
-        morphs_sorted_amount: dict[tuple[str, str], int] = dict(
-            Counter(intermediate_morph_list).most_common()
-        )
+    def _get_collection_priorities(
+        self, only_lemma_priorities: bool
+    ) -> dict[tuple[str, str], int]:
+        return {
+            (lemma, inflection): rank
+            for lemma, inflection, rank in self.con.execute(
+                """
+                SELECT lemma, inflection, rank
+                FROM Collection_Priorities
+                WHERE only_lemma_priorities = ?
+                """,
+                (only_lemma_priorities,),
+            )
+        }
 
-        morph_priorities: dict[tuple[str, str], int] = {}
+    def get_cached_morph_priorities(
+        self,
+        file_path: str,
+        only_lemma_priorities: bool,
+        modified_time: int,
+        file_size: int,
+    ) -> dict[tuple[str, str], int] | None:
+        """
+        Returns None if the file has not been cached, or if it
+        has changed since it was cached.
+        """
+        self.create_priority_file_cache_table()
 
-        # Reverse the values, the lower the priority number is, the more it is prioritized.
-        # Note: we can use a shortcut of providing the same priority (index) for both
-        # the lemma and the inflection since we generate the intermediate lists from
-        # scratch every recalc, so which ever ends up being used will have the correct value.
-        for index, key in enumerate(morphs_sorted_amount):
-            morph_priorities[key] = index
-            # print(f"key: {key}, index: {index}")
+        with self.con:
+            result = self.con.execute(
+                """
+                SELECT morph_priorities
+                FROM Priority_File_Cache
+                WHERE file_path = ? AND only_lemma_priorities = ?
+                    AND modified_time = ? AND file_size = ? AND marshal_version = ?
+                """,
+                (
+                    file_path,
+                    only_lemma_priorities,
+                    modified_time,
+                    file_size,
+                    marshal.version,
+                ),
+            ).fetchone()
 
+        if result is None:
+            return None
+
+        try:
+            morph_priorities = marshal.loads(result[0])
+        except (EOFError, ValueError, TypeError):
+            return None  # corrupted, the file will just be parsed again
+
+        assert isinstance(morph_priorities, dict)
         return morph_priorities
 
+    def insert_cached_morph_priorities(  # pylint:disable=too-many-arguments
+        self,
+        file_path: str,
+        only_lemma_priorities: bool,
+        modified_time: int,
+        file_size: int,
+        morph_priorities: dict[tuple[str, str], int],
+    ) -> None:
+        self.create_priority_file_cache_table()
+
+        with self.con:
+            self.con.execute(
+                """
+                INSERT OR REPLACE INTO Priority_File_Cache
+                VALUES (?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    file_path,
+                    only_lemma_priorities,
+                    modified_time,
+                    file_size,
+                    marshal.version,
+                    marshal.dumps(morph_priorities),
+                ),
+            )
+
     def get_known_lemmas_with_count(
         self, highest_lemma_learning_interval: int
     ) -> list[tuple[str, int]]:
@@ -553,13 +789,13 @@ class AnkiMorphsDB:  # pylint:disable=too-many-public-methods
         with self.con:
             return self.con.execute(
                 """
-                SELECT morph_lemma, COUNT(morph_lemma)
+                SELECT m.lemma, COUNT(*)
                 FROM Card_Morph_Map cmm
                 INNER JOIN Morphs m ON
-                    cmm.morph_lemma = m.lemma AND cmm.morph_inflection = m.inflection
+                    cmm.morph_id = m.morph_id
                 WHERE m.highest_lemma_learning_interval >= ?
-                GROUP BY morph_lemma
-                ORDER BY morph_lemma
+                GROUP BY m.lemma_id
+                ORDER BY m.lemma
                 """,
                 (highest_lemma_learning_interval,),
             ).fetchall()
@@ -573,13 +809,13 @@ class AnkiMorphsDB:  # pylint:disable=too-many-public-methods
         with self.con:
             return self.con.execute(
                 """
-                SELECT morph_lemma, morph_inflection, COUNT(morph_inflection)
+                SELECT m.lemma, m.inflection, COUNT(*)
                 FROM Card_Morph_Map cmm
                 INNER JOIN Morphs m ON
-                    cmm.morph_lemma = m.lemma AND cmm.morph_inflection = m.inflection
+                    cmm.morph_id = m.morph_id
                 WHERE m.highest_inflection_learning_interval >= ?
-                GROUP BY morph_lemma, morph_inflection
-                ORDER BY morph_lemma, morph_inflection
+                GROUP BY cmm.morph_id
+                ORDER BY m.lemma, m.inflection
                 """,
                 (highest_inflection_learning_interval,),
             ).fetchall()
@@ -599,10 +835,14 @@ class AnkiMorphsDB:  # pylint:disable=too-many-public-methods
             print(f"PRAGMA {table}: {result.fetchall()}")
 
     def drop_all_tables(self) -> None:
+        seen_morphs_index.reset()
         with self.con:
             self.con.execute("DROP TABLE IF EXISTS Cards;")
             self.con.execute("DROP TABLE IF EXISTS Morphs;")
             self.con.execute("DROP TABLE IF EXISTS Card_Morph_Map;")
+            self.con.execute("DROP TABLE IF EXISTS Card_Tags;")
+            self.con.execute("DROP TABLE IF EXISTS Collection_Priorities;")
+            self.con.execute("DROP TABLE IF EXISTS Tags;")
             self.con.execute("DROP TABLE IF EXISTS Seen_Morphs;")
 
     @staticmethod
@@ -640,7 +880,7 @@ class AnkiMorphsDB:  # pylint:disable=too-many-public-methods
         where_query_string = ""
         if len(cards_studied_today) > 0:
             where_query_string = (
-                "WHERE card_id IN (" + ",".join(map(str, cards_studied_today)) + ")"
+                "WHERE cmm.card_id IN (" + ",".join(map(str, cards_studied_today)) + ")"
             )
 
         am_db.drop_seen_morphs_table()
@@ -652,14 +892,17 @@ class AnkiMorphsDB:  # pylint:disable=too-many-public-methods
                 am_db.con.execute(
                     """
                         INSERT OR IGNORE INTO Seen_Morphs (lemma, inflection)
-                        SELECT morph_lemma, morph_inflection
-                        FROM Card_Morph_Map
+                        SELECT m.lemma, m.inflection
+                        FROM Card_Morph_Map cmm
+                        INNER JOIN Morphs m ON
+                            cmm.morph_id = m.morph_id
                         """
                     + where_query_string
                 )
         am_db.con.close()
 
         am_db.insert_names_to_seen_morphs()
+        seen_morphs_index.reset_seen_morphs()
 
     @staticmethod
     def get_new_cards_seen_today() -> Sequence[int]:
@@ -703,6 +946,7 @@ class AnkiMorphsDB:  # pylint:disable=too-many-public-methods
                 name_morphs,
             )
         am_db.con.close()
+        seen_morphs_index.reset_seen_morphs()
 
 
 def _on_success() -> None:
@@ -719,9 +963,10 @@ def _on_failure(error: Exception | sqlite3.OperationalError) -> None:
     mw.progress.finish()
 
     if isinstance(error, sqlite3.OperationalError):
-        # schema has been changed
+        # schema has been changed, the tables get filled again on the next recalc
         am_db = AnkiMorphsDB()
         am_db.drop_all_tables()
+        am_db.create_all_tables()
         am_db.con.close()
         return
 
@@ -76,7 +76,6 @@ def browse_same_morphs(  # pylint:disable=too-many-arguments
         assert mw.reviewer.card is not None
         note = mw.reviewer.card.note()
 
-    am_db = AnkiMorphsDB()
     am_filter = ankimorphs_config.get_matching_read_filter(note)
 
     if am_filter is None:
@@ -95,23 +94,24 @@ def browse_same_morphs(  # pylint:disable=too-many-arguments
     # It's implemented in a non-exhaustive manner like this mainly because
     # the menus get cluttered and the modifier keys combinations get unwieldy.
 
-    if search_lemma_only:
-        card_ids = am_db.get_ids_of_cards_with_same_morphs(
-            card_id,
-            search_unknowns=True,
-            search_lemma_only=True,
-        )
-        error_text = "No unknown morphs"
-    elif search_unknowns:
-        # only matches morph inflections
-        card_ids = am_db.get_ids_of_cards_with_same_morphs(
-            card_id, search_unknowns=True
-        )
-        error_text = "No unknown morphs"
-    else:
-        # only matches morph inflections
-        card_ids = am_db.get_ids_of_cards_with_same_morphs(card_id)
-        error_text = "No morphs"
+    with AnkiMorphsDB() as am_db:
+        if search_lemma_only:
+            card_ids = am_db.get_ids_of_cards_with_same_morphs(
+                card_id,
+                search_unknowns=True,
+                search_lemma_only=True,
+            )
+            error_text = "No unknown morphs"
+        elif search_unknowns:
+            # only matches morph inflections
+            card_ids = am_db.get_ids_of_cards_with_same_morphs(
+                card_id, search_unknowns=True
+            )
+            error_text = "No unknown morphs"
+        else:
+            # only matches morph inflections
+            card_ids = am_db.get_ids_of_cards_with_same_morphs(card_id)
+            error_text = "No morphs"
 
     if card_ids is None:
         tooltip(error_text)
@@ -164,8 +164,8 @@ def focus_query(
     if len(card_ids) == 0:
         return None
 
-    query = "cid:" + "".join([f"{card_id}," for card_id in card_ids])
-    query = query[:-1]  # removes the last comma
+    # this can be hundreds of thousands of ids, so we join them in one go
+    query = "cid:" + ",".join(map(str, card_ids))
 
     if ready_tag:
         # we can escape characters like underscore in tags by using SearchNode
@@ -1,6 +1,9 @@
 from __future__ import annotations
 
 import copy
+from collections import deque
+from collections.abc import Iterable
+from concurrent.futures import Future, ThreadPoolExecutor
 from enum import Enum
 from functools import partial
 from pathlib import Path
@@ -33,7 +36,7 @@ from .text_extractors import (
     extract_vtt_text,
 )
 
-extractors: dict[str, Callable[[Path], list[str]]] = {
+extractors: dict[str, Callable[[Path], Iterable[str]]] = {
     ".ass": extract_ass_text,
     ".epub": extract_epub_text,
     ".html": extract_html_text,
@@ -43,6 +46,11 @@ extractors: dict[str, Callable[[Path], list[str]]] = {
     ".txt": extract_basic_text,
 }
 
+# Extracting the text is mostly file io and regex, the morphemizers
+# are not thread-safe, so they only run on the calling thread.
+_EXTRACTION_WORKERS = 4
+_MAX_PREFETCHED_FILES = 8
+
 
 class Column(Enum):
     FILE_NAME = 0
@@ -104,7 +112,7 @@ class FileMorphsStats:
         return self
 
 
-class PreprocessOptions:
+class PreprocessOptions:  # pylint:disable=too-many-instance-attributes
     def __init__(self, ui: Ui_GeneratorsWindow):
         self.filter_square_brackets: bool = ui.squareBracketsCheckBox.isChecked()
         self.filter_round_brackets: bool = ui.roundBracketsCheckBox.isChecked()
@@ -113,6 +121,11 @@ class PreprocessOptions:
         self.filter_morphemizer_names: bool = ui.namesMorphemizerCheckBox.isChecked()
         self.filter_names_from_file: bool = ui.namesFileCheckBox.isChecked()
 
+        # the generators window doesn't have these options, so we use the settings
+        am_config = AnkiMorphsConfig()
+        self.spacy_worker_processes: int = am_config.spacy_worker_processes
+        self.spacy_batch_size: int = am_config.spacy_batch_size
+
     def to_mock_am_config(self) -> AnkiMorphsConfig:
         return Mock(
             spec=AnkiMorphsConfig,
@@ -123,73 +136,76 @@ class PreprocessOptions:
             preprocess_ignore_names_morphemizer=self.filter_morphemizer_names,
             preprocess_ignore_names_textfile=self.filter_names_from_file,
             preprocess_ignore_custom_characters="",  # todo: add option in generators window?
+            spacy_worker_processes=self.spacy_worker_processes,
+            spacy_batch_size=self.spacy_batch_size,
         )
 
 
+class MorphLearningIntervals:
+    """
+    The highest learning intervals of all the morphs in the collection,
+    read from the db in a single query so the morphs of the input files
+    can be classified without a query per morph.
+    """
+
+    __slots__ = (
+        "_evaluate_morph_inflection",
+        "_lemma_intervals",
+        "_inflection_intervals",
+    )
+
+    def __init__(self, am_config: AnkiMorphsConfig, am_db: AnkiMorphsDB) -> None:
+        self._evaluate_morph_inflection: bool = am_config.evaluate_morph_inflection
+        # only morphs with an interval above zero are stored,
+        # the rest are unknown and default to zero
+        self._lemma_intervals: dict[str, int] = {}
+        self._inflection_intervals: dict[tuple[str, str], int] = {}
+
+        for (
+            lemma,
+            inflection,
+            lemma_interval,
+            inflection_interval,
+        ) in am_db.get_all_highest_learning_intervals():
+            self._lemma_intervals[lemma] = lemma_interval
+            if inflection_interval > 0:
+                self._inflection_intervals[(lemma, inflection)] = inflection_interval
+
+    def get_highest_learning_interval(self, morph: Morpheme) -> int:
+        if self._evaluate_morph_inflection:
+            return self._inflection_intervals.get((morph.lemma, morph.inflection), 0)
+        return self._lemma_intervals.get(morph.lemma, 0)
+
+
 def get_morph_stats_from_file(
     am_config: AnkiMorphsConfig,
-    am_db: AnkiMorphsDB,
+    learning_intervals: MorphLearningIntervals,
     file_morphs: dict[str, MorphOccurrence],
 ) -> FileMorphsStats:
     file_morphs_stats = FileMorphsStats()
-    highest_learning_interval: int | None
-
-    if am_config.evaluate_morph_inflection:
-        for morph_occurrence_object in file_morphs.values():
-            morph = morph_occurrence_object.morph
-            occurrence = morph_occurrence_object.occurrence
-            highest_learning_interval = am_db.get_highest_inflection_learning_interval(
-                morph
-            )
+    interval_for_known: int = am_config.interval_for_known_morphs
 
-            _update_file_morphs_stats(
-                file_morphs_stats=file_morphs_stats,
-                interval_for_known=am_config.interval_for_known_morphs,
-                morph=morph,
-                occurrence=occurrence,
-                highest_learning_interval=highest_learning_interval,
-            )
-    else:
-        for morph_occurrence_object in file_morphs.values():
-            morph = morph_occurrence_object.morph
-            occurrence = morph_occurrence_object.occurrence
-            highest_learning_interval = am_db.get_highest_lemma_learning_interval(morph)
-
-            _update_file_morphs_stats(
-                file_morphs_stats=file_morphs_stats,
-                interval_for_known=am_config.interval_for_known_morphs,
-                morph=morph,
-                occurrence=occurrence,
-                highest_learning_interval=highest_learning_interval,
-            )
-
-    return file_morphs_stats
+    for morph_occurrence_object in file_morphs.values():
+        morph = morph_occurrence_object.morph
+        occurrence = morph_occurrence_object.occurrence
+        highest_learning_interval = learning_intervals.get_highest_learning_interval(
+            morph
+        )
 
+        if highest_learning_interval == 0:
+            file_morphs_stats.total_unknowns += occurrence
+            file_morphs_stats.unique_unknowns.add(morph)
+        elif highest_learning_interval < interval_for_known:
+            file_morphs_stats.total_learning += occurrence
+            file_morphs_stats.unique_learning.add(morph)
+        else:
+            file_morphs_stats.total_known += occurrence
+            file_morphs_stats.unique_known.add(morph)
 
-def _update_file_morphs_stats(
-    file_morphs_stats: FileMorphsStats,
-    interval_for_known: int,
-    morph: Morpheme,
-    occurrence: int,
-    highest_learning_interval: int | None,
-) -> None:
-    if highest_learning_interval is None:
-        file_morphs_stats.total_unknowns += occurrence
-        file_morphs_stats.unique_unknowns.add(morph)
-        return
-
-    if highest_learning_interval == 0:
-        file_morphs_stats.total_unknowns += occurrence
-        file_morphs_stats.unique_unknowns.add(morph)
-    elif highest_learning_interval < interval_for_known:
-        file_morphs_stats.total_learning += occurrence
-        file_morphs_stats.unique_learning.add(morph)
-    else:
-        file_morphs_stats.total_known += occurrence
-        file_morphs_stats.unique_known.add(morph)
+    return file_morphs_stats
 
 
-def generate_morph_occurrences_by_file(
+def generate_morph_occurrences_by_file(  # pylint:disable=too-many-locals
     ui: Ui_GeneratorsWindow,
     morphemizers: list[Morphemizer],
     input_dir_root: Path,
@@ -198,6 +214,10 @@ def generate_morph_occurrences_by_file(
 ) -> dict[Path, dict[str, MorphOccurrence]]:
     """
     'sorted_by_table=True' is used for study plans where the order matters.
+
+    The text of the upcoming files is extracted and preprocessed in a
+    thread pool while the current file is being morphemized, the files
+    are still morphemized one at a time in the given order.
     """
     assert mw is not None
 
@@ -205,6 +225,7 @@ def generate_morph_occurrences_by_file(
         morphemizers=morphemizers, morphemizer_combobox=ui.morphemizerComboBox
     )
     preprocess_options = PreprocessOptions(ui)
+    mock_am_config = preprocess_options.to_mock_am_config()
     morph_occurrences_by_file: dict[Path, dict[str, MorphOccurrence]] = {}
 
     sorted_input_files: list[Path]
@@ -217,40 +238,67 @@ def generate_morph_occurrences_by_file(
     else:
         sorted_input_files = input_files
 
-    for input_file in sorted_input_files:
-        if mw.progress.want_cancel():  # user clicked 'x' button
-            raise CancelledOperationException
-
-        mw.taskman.run_on_main(
-            partial(
-                mw.progress.update,
-                label=f"Processing file:<br>{input_file.relative_to(input_dir_root)}",
-            )
-        )
-
-        file_morph_occurrences: dict[str, MorphOccurrence] = (
-            create_file_morph_occurrences(
-                preprocess_options=preprocess_options,
-                file_path=input_file,
-                morphemizer=_morphemizer,
-            )
-        )
-        morph_occurrences_by_file[input_file] = file_morph_occurrences
+    # the results are read in the same order as the files were submitted,
+    # so the order of the output does not depend on which file finishes first
+    pending_files: deque[tuple[Path, Future[list[str]]]] = deque()
+    files_to_submit = iter(sorted_input_files)
+
+    with ThreadPoolExecutor(max_workers=_EXTRACTION_WORKERS) as executor:
+        try:
+            while True:
+                # only a limited number of files are read ahead
+                # to prevent every file being held in memory
+                while len(pending_files) < _MAX_PREFETCHED_FILES:
+                    next_file: Path | None = next(files_to_submit, None)
+                    if next_file is None:
+                        break
+                    pending_files.append(
+                        (
+                            next_file,
+                            executor.submit(
+                                get_filtered_lines_from_file,
+                                mock_am_config,
+                                next_file,
+                            ),
+                        )
+                    )
+
+                if len(pending_files) == 0:
+                    break
+
+                if mw.progress.want_cancel():  # user clicked 'x' button
+                    raise CancelledOperationException
+
+                input_file, filtered_lines_future = pending_files.popleft()
+
+                mw.taskman.run_on_main(
+                    partial(
+                        mw.progress.update,
+                        label=f"Processing file:<br>{input_file.relative_to(input_dir_root)}",
+                    )
+                )
+
+                morph_occurrences_by_file[input_file] = get_morph_occurrences(
+                    mock_am_config=mock_am_config,
+                    morphemizer=_morphemizer,
+                    all_lines=filtered_lines_future.result(),
+                )
+        finally:
+            # files that have not started yet are dropped, so
+            # cancelling only waits for the files being read
+            for _, pending_future in pending_files:
+                pending_future.cancel()
 
     return morph_occurrences_by_file
 
 
-def create_file_morph_occurrences(
-    preprocess_options: PreprocessOptions,
+def get_filtered_lines_from_file(
+    mock_am_config: AnkiMorphsConfig,
     file_path: Path,
-    morphemizer: Morphemizer,
-) -> dict[str, MorphOccurrence]:
-
-    morph_occurrences: dict[str, MorphOccurrence]
-    raw_lines: list[str]
+) -> list[str]:
+    raw_lines: Iterable[str]
     filtered_lines: list[str] = []
     extension = file_path.suffix
-    mock_am_config = preprocess_options.to_mock_am_config()
 
     if extension in extractors:
         raw_lines = extractors[extension](file_path)
@@ -269,13 +317,7 @@ def create_file_morph_occurrences(
     except UnicodeDecodeError as exc:
         raise UnicodeException(path=file_path) from exc
 
-    morph_occurrences = get_morph_occurrences(
-        mock_am_config=mock_am_config,
-        morphemizer=morphemizer,
-        all_lines=filtered_lines,
-    )
-
-    return morph_occurrences
+    return filtered_lines
 
 
 def get_morph_occurrences(
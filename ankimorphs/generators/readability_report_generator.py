@@ -4,7 +4,11 @@ from functools import partial
 from pathlib import Path
 
 from aqt import mw
-from aqt.qt import Qt, QTableWidgetItem  # pylint:disable=no-name-in-module
+from aqt.qt import (  # pylint:disable=no-name-in-module
+    Qt,
+    QTableWidget,
+    QTableWidgetItem,
+)
 
 from ..ankimorphs_config import AnkiMorphsConfig
 from ..ankimorphs_db import AnkiMorphsDB
@@ -72,7 +76,11 @@ def _populate_tables_with_report(
     morph_occurrences_by_file: dict[Path, dict[str, MorphOccurrence]],
 ) -> None:
     am_config = AnkiMorphsConfig()
-    am_db = AnkiMorphsDB()
+
+    # the intervals are loaded once for the whole report instead
+    # of querying the db for every morph in every file
+    with AnkiMorphsDB() as am_db:
+        learning_intervals = generators_utils.MorphLearningIntervals(am_config, am_db)
 
     ui.numericalTableWidget.setRowCount(len(input_files) + 1)
     ui.percentTableWidget.setRowCount(len(input_files) + 1)
@@ -83,191 +91,99 @@ def _populate_tables_with_report(
     for row, input_file in enumerate(input_files):
         file_morphs = morph_occurrences_by_file[input_file]
         file_morphs_stats = generators_utils.get_morph_stats_from_file(
-            am_config, am_db, file_morphs
+            am_config, learning_intervals, file_morphs
         )
         global_report_morph_stats += file_morphs_stats
 
-        _populate_numerical_table(
+        _populate_tables_row(
             ui=ui,
-            input_dir_root=input_dir_root,
-            input_file=input_file,
-            row=row,
-            file_morphs_stats=file_morphs_stats,
-        )
-        _populate_percentage_table(
-            ui=ui,
-            input_dir_root=input_dir_root,
-            input_file=input_file,
+            file_name=str(input_file.relative_to(input_dir_root)),
             row=row,
             file_morphs_stats=file_morphs_stats,
         )
 
-    _add_total_row_to_tables(
+    _populate_tables_row(
         ui=ui,
-        input_dir_root=input_dir_root,
-        input_files=input_files,
-        global_report_morph_stats=global_report_morph_stats,
+        file_name="Total",
+        row=len(input_files),
+        file_morphs_stats=global_report_morph_stats,
     )
 
-    am_db.con.close()
 
-
-def _populate_numerical_table(  # pylint:disable=too-many-locals
+def _populate_tables_row(
     ui: Ui_GeneratorsWindow,
-    input_dir_root: Path,
-    input_file: Path,
+    file_name: str,
     row: int,
     file_morphs_stats: FileMorphsStats,
 ) -> None:
-    file_name = str(input_file.relative_to(input_dir_root))
-
-    unique_morphs: int = (
-        len(file_morphs_stats.unique_known)
-        + len(file_morphs_stats.unique_learning)
-        + len(file_morphs_stats.unique_unknowns)
+    unique_known: int = len(file_morphs_stats.unique_known)
+    unique_learning: int = len(file_morphs_stats.unique_learning)
+    unique_unknowns: int = len(file_morphs_stats.unique_unknowns)
+    unique_morphs: int = unique_known + unique_learning + unique_unknowns
+
+    total_known: int = file_morphs_stats.total_known
+    total_learning: int = file_morphs_stats.total_learning
+    total_unknowns: int = file_morphs_stats.total_unknowns
+    total_morphs: int = total_known + total_learning + total_unknowns
+
+    # both tables have the same columns, only the numbers
+    # are presented differently
+    _set_table_row(
+        table=ui.numericalTableWidget,
+        row=row,
+        file_name=file_name,
+        unique_morphs=unique_morphs,
+        total_morphs=total_morphs,
+        number_items=[
+            (Column.UNIQUE_KNOWN, QTableWidgetIntegerItem(unique_known)),
+            (Column.UNIQUE_LEARNING, QTableWidgetIntegerItem(unique_learning)),
+            (Column.UNIQUE_UNKNOWNS, QTableWidgetIntegerItem(unique_unknowns)),
+            (Column.TOTAL_KNOWN, QTableWidgetIntegerItem(total_known)),
+            (Column.TOTAL_LEARNING, QTableWidgetIntegerItem(total_learning)),
+            (Column.TOTAL_UNKNOWNS, QTableWidgetIntegerItem(total_unknowns)),
+        ],
     )
-
-    total_morphs: int = (
-        file_morphs_stats.total_known
-        + file_morphs_stats.total_learning
-        + file_morphs_stats.total_unknowns
+    _set_table_row(
+        table=ui.percentTableWidget,
+        row=row,
+        file_name=file_name,
+        unique_morphs=unique_morphs,
+        total_morphs=total_morphs,
+        number_items=[
+            (Column.UNIQUE_KNOWN, _get_percent_item(unique_known, unique_morphs)),
+            (Column.UNIQUE_LEARNING, _get_percent_item(unique_learning, unique_morphs)),
+            (Column.UNIQUE_UNKNOWNS, _get_percent_item(unique_unknowns, unique_morphs)),
+            (Column.TOTAL_KNOWN, _get_percent_item(total_known, total_morphs)),
+            (Column.TOTAL_LEARNING, _get_percent_item(total_learning, total_morphs)),
+            (Column.TOTAL_UNKNOWNS, _get_percent_item(total_unknowns, total_morphs)),
+        ],
     )
 
-    # fmt: off
-    file_name_item = QTableWidgetItem(file_name)
-
-    unique_morphs_item = QTableWidgetIntegerItem(unique_morphs)
-    unique_known_item = QTableWidgetIntegerItem(len(file_morphs_stats.unique_known))
-    unique_learning_item = QTableWidgetIntegerItem(len(file_morphs_stats.unique_learning))
-    unique_unknowns_item = QTableWidgetIntegerItem(len(file_morphs_stats.unique_unknowns))
-
-    total_morphs_item = QTableWidgetIntegerItem(total_morphs)
-    total_known_item = QTableWidgetIntegerItem(file_morphs_stats.total_known)
-    total_learning_item = QTableWidgetIntegerItem(file_morphs_stats.total_learning)
-    total_unknown_item = QTableWidgetIntegerItem(file_morphs_stats.total_unknowns)
-
-    unique_morphs_item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-    unique_known_item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-    unique_learning_item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-    unique_unknowns_item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-
-    total_morphs_item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-    total_known_item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-    total_learning_item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-    total_unknown_item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
 
-    ui.numericalTableWidget.setItem(row, Column.FILE_NAME.value, file_name_item)
-    ui.numericalTableWidget.setItem(row, Column.UNIQUE_MORPHS.value, unique_morphs_item)
-    ui.numericalTableWidget.setItem(row, Column.UNIQUE_KNOWN.value, unique_known_item)
-    ui.numericalTableWidget.setItem(row, Column.UNIQUE_LEARNING.value, unique_learning_item)
-    ui.numericalTableWidget.setItem(row, Column.UNIQUE_UNKNOWNS.value, unique_unknowns_item)
-    ui.numericalTableWidget.setItem(row, Column.TOTAL_MORPHS.value, total_morphs_item)
-    ui.numericalTableWidget.setItem(row, Column.TOTAL_KNOWN.value, total_known_item)
-    ui.numericalTableWidget.setItem(row, Column.TOTAL_LEARNING.value, total_learning_item)
-    ui.numericalTableWidget.setItem(row, Column.TOTAL_UNKNOWNS.value, total_unknown_item)
-    # fmt: on
+def _get_percent_item(part: int, whole: int) -> QTableWidgetPercentItem:
+    percent: float = 0
+    if whole != 0:
+        percent = (part / whole) * 100
+    return QTableWidgetPercentItem(round(percent, 1))
 
 
-def _populate_percentage_table(  # pylint:disable=too-many-locals
-    ui: Ui_GeneratorsWindow,
-    input_dir_root: Path,
-    input_file: Path,
+def _set_table_row(  # pylint:disable=too-many-arguments
+    table: QTableWidget,
     row: int,
-    file_morphs_stats: FileMorphsStats,
+    file_name: str,
+    unique_morphs: int,
+    total_morphs: int,
+    number_items: list[tuple[Column, QTableWidgetItem]],
 ) -> None:
-    file_name = str(input_file.relative_to(input_dir_root))
-
-    unique_morphs: int = (
-        len(file_morphs_stats.unique_known)
-        + len(file_morphs_stats.unique_learning)
-        + len(file_morphs_stats.unique_unknowns)
-    )
-
-    total_morphs: int = (
-        file_morphs_stats.total_known
-        + file_morphs_stats.total_learning
-        + file_morphs_stats.total_unknowns
-    )
-
-    unique_known_percent: float = 0
-    unique_learning_percent: float = 0
-    unique_unknown_percent: float = 0
-
-    total_known_percent: float = 0
-    total_learning_percent: float = 0
-    total_unknown_percent: float = 0
-
-    if unique_morphs != 0:
-        unique_known_percent = (
-            len(file_morphs_stats.unique_known) / unique_morphs
-        ) * 100
-
-        unique_learning_percent = (
-            len(file_morphs_stats.unique_learning) / unique_morphs
-        ) * 100
-
-        unique_unknown_percent = (
-            len(file_morphs_stats.unique_unknowns) / unique_morphs
-        ) * 100
-
-    if total_morphs != 0:
-        total_known_percent = (file_morphs_stats.total_known / total_morphs) * 100
-        total_learning_percent = (file_morphs_stats.total_learning / total_morphs) * 100
-        total_unknown_percent = (file_morphs_stats.total_unknowns / total_morphs) * 100
-
-    # fmt: off
-    file_name_item = QTableWidgetItem(file_name)
-
     unique_morphs_item = QTableWidgetIntegerItem(unique_morphs)
-    unique_known_item = QTableWidgetPercentItem(round(unique_known_percent, 1))
-    unique_learning_item = QTableWidgetPercentItem(round(unique_learning_percent, 1))
-    unique_unknowns_item = QTableWidgetPercentItem(round(unique_unknown_percent, 1))
-
     total_morphs_item = QTableWidgetIntegerItem(total_morphs)
-    total_known_item = QTableWidgetPercentItem(round(total_known_percent, 1))
-    total_learning_item = QTableWidgetPercentItem(round(total_learning_percent, 1))
-    total_unknown_item = QTableWidgetPercentItem(round(total_unknown_percent, 1))
-
-    unique_morphs_item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-    unique_known_item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-    unique_learning_item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-    unique_unknowns_item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-    total_morphs_item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-    total_known_item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-    total_learning_item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-    total_unknown_item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
 
-    ui.percentTableWidget.setItem(row, Column.FILE_NAME.value, file_name_item)
-    ui.percentTableWidget.setItem(row, Column.UNIQUE_MORPHS.value, unique_morphs_item)
-    ui.percentTableWidget.setItem(row, Column.UNIQUE_KNOWN.value, unique_known_item)
-    ui.percentTableWidget.setItem(row, Column.UNIQUE_LEARNING.value, unique_learning_item)
-    ui.percentTableWidget.setItem(row, Column.UNIQUE_UNKNOWNS.value, unique_unknowns_item)
-    ui.percentTableWidget.setItem(row, Column.TOTAL_MORPHS.value, total_morphs_item)
-    ui.percentTableWidget.setItem(row, Column.TOTAL_KNOWN.value, total_known_item)
-    ui.percentTableWidget.setItem(row, Column.TOTAL_LEARNING.value, total_learning_item)
-    ui.percentTableWidget.setItem(row, Column.TOTAL_UNKNOWNS.value, total_unknown_item)
-    # fmt: on
+    table.setItem(row, Column.FILE_NAME.value, QTableWidgetItem(file_name))
 
-
-def _add_total_row_to_tables(
-    ui: Ui_GeneratorsWindow,
-    input_dir_root: Path,
-    input_files: list[Path],
-    global_report_morph_stats: FileMorphsStats,
-) -> None:
-    fake_input_file = Path(input_dir_root, "Total")
-
-    _populate_numerical_table(
-        ui=ui,
-        input_dir_root=input_dir_root,
-        input_file=fake_input_file,
-        row=len(input_files),
-        file_morphs_stats=global_report_morph_stats,
-    )
-    _populate_percentage_table(
-        ui=ui,
-        input_dir_root=input_dir_root,
-        input_file=fake_input_file,
-        row=len(input_files),
-        file_morphs_stats=global_report_morph_stats,
-    )
+    for column, item in [
+        (Column.UNIQUE_MORPHS, unique_morphs_item),
+        (Column.TOTAL_MORPHS, total_morphs_item),
+        *number_items,
+    ]:
+        item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
+        table.setItem(row, column.value, item)
@@ -1,13 +1,16 @@
 from __future__ import annotations
 
-import os
-import shutil
+import posixpath
 import zipfile
 from collections.abc import Iterator
 from pathlib import Path
+from urllib.parse import unquote
+from xml.etree import ElementTree
 
-import anki
-from aqt import mw
+from anki.utils import strip_html
+
+_EPUB_CONTAINER_NAMESPACE = "urn:oasis:names:tc:opendocument:xmlns:container"
+_EPUB_PACKAGE_NAMESPACE = "http://www.idpf.org/2007/opf"
 
 
 def extract_ass_text(file_path: Path) -> list[str]:
@@ -70,32 +73,55 @@ def extract_vtt_text(file_path: Path) -> list[str]:
     return subtitle_texts
 
 
-def extract_epub_text(epub_path: Path) -> list[str]:
-    assert mw is not None
-
-    # Create a temporary directory to store unzipped contents
-    temp_dir: str = "temp_unzipped_epub"  # relative directory
-
-    if os.path.exists(temp_dir):
-        shutil.rmtree(temp_dir)
-
+def extract_epub_text(epub_path: Path) -> Iterator[str]:
+    """
+    The html documents are read straight from the zip file in the reading
+    order (spine) of the book, one document at a time, so the book never
+    has to be unzipped to disk or held in memory all at once.
+    """
     with zipfile.ZipFile(epub_path) as epub:
-        epub.extractall(temp_dir)
-
-    text_content: list[str] = []
-
-    # Use a generator to yield text lines for better memory efficiency
-    def extract_text() -> Iterator[list[str]]:
-        for _root, _, _files in os.walk(temp_dir):
-            for file in filter(lambda f: f.endswith((".xhtml", ".html")), _files):
-                file_path = Path(_root, file)
-                yield extract_html_text(file_path)
+        for document_name in _get_epub_document_names(epub):
+            content = epub.read(document_name).decode("utf-8")
+            yield strip_html(content)
 
-    for batch in extract_text():
-        text_content.extend(batch)
 
-    shutil.rmtree(temp_dir)
-    return text_content
+def _get_epub_document_names(epub: zipfile.ZipFile) -> list[str]:
+    """
+    Anatomy of epub files:
+    - 'META-INF/container.xml' points to the package (.opf) file
+    - the package file has a 'manifest' with all the files of the book,
+        and a 'spine' that lists the ids of the documents in reading order
+    If the spine can't be read, all the html documents are used instead.
+    """
+    html_documents: list[str] = [
+        name for name in epub.namelist() if name.endswith((".xhtml", ".html"))
+    ]
+
+    try:
+        container = ElementTree.fromstring(epub.read("META-INF/container.xml"))
+        rootfile = container.find(f".//{{{_EPUB_CONTAINER_NAMESPACE}}}rootfile")
+        if rootfile is None:
+            return html_documents
+        package_path: str = rootfile.attrib["full-path"]
+
+        package = ElementTree.fromstring(epub.read(package_path))
+        manifest: dict[str, str] = {
+            item.attrib["id"]: item.attrib["href"]
+            for item in package.iter(f"{{{_EPUB_PACKAGE_NAMESPACE}}}item")
+        }
+        package_dir: str = posixpath.dirname(package_path)
+
+        spine_documents: list[str] = [
+            posixpath.normpath(
+                posixpath.join(package_dir, unquote(manifest[itemref.attrib["idref"]]))
+            )
+            for itemref in package.iter(f"{{{_EPUB_PACKAGE_NAMESPACE}}}itemref")
+        ]
+    except (KeyError, ElementTree.ParseError):
+        return html_documents
+
+    html_documents_set = set(html_documents)
+    return [name for name in spine_documents if name in html_documents_set]
 
 
 def extract_html_text(file_path: Path) -> list[str]:
@@ -104,7 +130,7 @@ def extract_html_text(file_path: Path) -> list[str]:
     """
     with open(file_path, encoding="utf-8") as file:
         content = file.read()
-    content = anki.utils.strip_html(content)
+    content = strip_html(content)
     return [content]
 
 
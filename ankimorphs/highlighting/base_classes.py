@@ -22,12 +22,6 @@ class Injector:
         Returns the closing tag or markup for a specific type of annotation.
         """
 
-    @abstractmethod
-    def inject(self, target: str) -> str:
-        """
-        Injects the markup generated by open, close, and rt into a target string at the specified range.
-        """
-
     def open_len(self) -> int:
         """
         Useful for setting string splice offsets.
@@ -1,8 +1,10 @@
 from __future__ import annotations
 
 import re
+from collections import OrderedDict
 
 import anki
+from anki.models import NotetypeId
 from anki.template import TemplateRenderContext
 
 from .. import ankimorphs_config, ankimorphs_globals, text_preprocessing
@@ -22,6 +24,70 @@ from ..morphemizers.morphemizer import (
     Morphemizer,
 )
 
+################################################################
+#                      HIGHLIGHTING CACHE
+################################################################
+# The am-highlight filters run every time a card is rendered,
+# i.e. both on the question and on the answer side, and again
+# when the card is shown another time. Morphemizing the text and
+# looking up the learning intervals for every render is slow, so
+# we keep:
+#   1. a snapshot of the learning intervals in ankimorphs.db,
+#      which is loaded once, the first time it is needed.
+#   2. a LRU cache of the highlighted output, keyed by the field
+#      text, the filter name, the note type and the snapshot
+#      version.
+#
+# The intervals only change on recalc, so the snapshot is
+# invalidated after recalc, when the settings are saved, and
+# when the profile is opened or closed.
+################################################################
+
+_HIGHLIGHTED_CACHE_MAX_SIZE = 1024
+
+
+class _HighlightingSnapshot:
+    __slots__ = (
+        "version",
+        "lemma_intervals",
+        "inflection_intervals",
+    )
+
+    def __init__(self, version: int) -> None:
+        self.version: int = version
+        # only morphs with an interval above zero are stored,
+        # the rest are unknown and default to zero
+        self.lemma_intervals: dict[str, int] | None = None
+        self.inflection_intervals: dict[tuple[str, str], int] | None = None
+
+    def load_intervals(self) -> None:
+        if self.lemma_intervals is not None:
+            return
+
+        self.lemma_intervals = {}
+        self.inflection_intervals = {}
+
+        with AnkiMorphsDB() as am_db:
+            for (
+                lemma,
+                inflection,
+                lemma_interval,
+                inflection_interval,
+            ) in am_db.get_all_highest_learning_intervals():
+                self.lemma_intervals[lemma] = lemma_interval
+                if inflection_interval > 0:
+                    self.inflection_intervals[(lemma, inflection)] = inflection_interval
+
+
+_snapshot: _HighlightingSnapshot = _HighlightingSnapshot(version=0)
+_highlighted_cache: OrderedDict[tuple[str, str, NotetypeId, int], str] = OrderedDict()
+
+
+def invalidate_highlighting_cache() -> None:
+    global _snapshot
+    _snapshot = _HighlightingSnapshot(version=_snapshot.version + 1)
+    _highlighted_cache.clear()
+
 
 def highlight_morphs_jit(
     field_text: str,
@@ -48,6 +114,14 @@ def highlight_morphs_jit(
     ):
         return field_text
 
+    snapshot: _HighlightingSnapshot = _snapshot
+    cache_key = (field_text, filter_name, context.note().mid, snapshot.version)
+    highlighted_jit_text: str | None = _highlighted_cache.get(cache_key)
+
+    if highlighted_jit_text is not None:
+        _highlighted_cache.move_to_end(cache_key)
+        return highlighted_jit_text
+
     am_config_filter: AnkiMorphsConfigFilter | None = (
         ankimorphs_config.get_matching_filter(context.note())
     )
@@ -62,7 +136,7 @@ def highlight_morphs_jit(
     if not morphemizer:
         return field_text
 
-    am_config = AnkiMorphsConfig()
+    am_config = ankimorphs_config.get_config()
 
     card_morphs: list[Morpheme] = _get_morph_meta_for_text(
         morphemizer, field_text, am_config
@@ -77,6 +151,10 @@ def highlight_morphs_jit(
         ruby_type=ruby_type,
     ).highlighted()
 
+    _highlighted_cache[cache_key] = highlighted_jit_text
+    if len(_highlighted_cache) > _HIGHLIGHTED_CACHE_MAX_SIZE:
+        _highlighted_cache.popitem(last=False)
+
     return highlighted_jit_text
 
 
@@ -99,16 +177,20 @@ def _get_morph_meta_for_text(
     if not morphs:
         return []
 
-    with AnkiMorphsDB() as am_db:
-        for morph in morphs:
-            if am_config.evaluate_morph_inflection:
-                morph.highest_inflection_learning_interval = (
-                    am_db.get_highest_inflection_learning_interval(morph) or 0
-                )
-            else:
-                morph.highest_lemma_learning_interval = (
-                    am_db.get_highest_lemma_learning_interval(morph) or 0
-                )
+    snapshot: _HighlightingSnapshot = _snapshot
+    snapshot.load_intervals()
+    assert snapshot.lemma_intervals is not None
+    assert snapshot.inflection_intervals is not None
+
+    for morph in morphs:
+        if am_config.evaluate_morph_inflection:
+            morph.highest_inflection_learning_interval = (
+                snapshot.inflection_intervals.get((morph.lemma, morph.inflection), 0)
+            )
+        else:
+            morph.highest_lemma_learning_interval = snapshot.lemma_intervals.get(
+                morph.lemma, 0
+            )
 
     return morphs
 
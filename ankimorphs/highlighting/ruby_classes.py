@@ -19,9 +19,6 @@ class Ruby(Range, Injector):
         defines how the rt is injected
         """
 
-    def inject(self, target: str) -> str:
-        return target[: self.start] + str(self) + target[self.end :]
-
     def __str__(self) -> str:
         return f"{self.open()}{self.base}{self.rt()}{self.close()}"
 
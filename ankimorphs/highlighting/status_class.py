@@ -17,18 +17,5 @@ class Status(Range, Injector):
     def close(self) -> str:
         return "</span>"
 
-    def inject(self, target: str) -> str:
-        """
-        Put this morph into the given string.
-        """
-
-        return (
-            target[: self.start]
-            + self.open()
-            + target[self.start : self.end]
-            + self.close()
-            + target[self.end :]
-        )
-
     def __repr__(self) -> str:
         return f"Range: {self.start}-{self.end}. Status: {self.status}, Morph: {self.morph}"
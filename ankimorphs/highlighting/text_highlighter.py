@@ -54,59 +54,92 @@ class TextHighlighter:
         More info: https://docs.ankiweb.net/templates/fields.html?highlight=ruby#ruby-characters
         """
 
-        end = 0
+        # The rubies are removed from the expression, so the positions
+        # of the later rubies are shifted by the removed characters.
+        expression_parts: list[str] = []
+        removed_characters = 0
+        previous_end = 0
 
-        while True:
-            match = ruby_regex.search(self.expression, pos=end)
+        for match in ruby_regex.finditer(self.expression):
+            start = match.start() - removed_characters
+            end = start + len(match.group(1))
 
-            if not match:
-                break
+            self.rubies.append(ruby_type(start, end, match.group(1), match.group(2)))
 
-            end = match.start() + len(match.group(1))
+            expression_parts.append(self.expression[previous_end : match.start()])
+            expression_parts.append(match.group(1))
+            removed_characters += len(match.group()) - len(match.group(1))
+            previous_end = match.end()
 
-            self.rubies.append(
-                ruby_type(match.start(), end, match.group(1), match.group(2))
-            )
-            self.expression = (
-                self.expression[: match.start()]
-                + match.group(1)
-                + self.expression[match.end() :]
-            )
+        if self.rubies:
+            expression_parts.append(self.expression[previous_end:])
+            self.expression = "".join(expression_parts)
 
     def _tag_morphemes(self, expression: str, morphemes: list[Morpheme]) -> None:
         """
         Populate internal deque of found morph locations.
 
         Start with the longest morphemes so that we do not tag parts of morphs, and then miss the
-         bigger ones.
+         bigger ones. A morph can only be tagged where the text has not already been tagged
+         by a longer (or earlier) morph.
 
-        Clear the found morph out of the string and replace it with spaces so that our indexes are
-         correct for subsequent iterations.
+        The occurrences are found by looking up the substrings of the expression in a dict of the
+         morph inflections, which takes one pass per distinct inflection length instead of
+         searching and rebuilding the whole expression for every occurrence of every morph.
         """
 
+        # the first morph with an inflection takes all of its occurrences
+        morph_ranks: dict[str, int] = {}
+        ranked_morphs: list[Morpheme] = []
+
         for morph in sorted(
             morphemes, key=lambda morpheme: len(morpheme.inflection), reverse=True
         ):
-            while True:
-                start = expression.find(morph.inflection)
+            if morph.inflection and morph.inflection not in morph_ranks:
+                morph_ranks[morph.inflection] = len(ranked_morphs)
+                ranked_morphs.append(morph)
+
+        if not ranked_morphs:
+            return
+
+        occurrences_by_rank: list[list[int]] = [[] for _ in ranked_morphs]
+
+        for length in {len(morph.inflection) for morph in ranked_morphs}:
+            starts: list[int] = [
+                start
+                for start in range(len(expression) - length + 1)
+                if expression[start : start + length] in morph_ranks
+            ]
+            for start in starts:
+                occurrences_by_rank[
+                    morph_ranks[expression[start : start + length]]
+                ].append(start)
+
+        tagged = bytearray(len(expression))
+        found_statuses: list[Status] = []
+
+        for rank, starts in enumerate(occurrences_by_rank):
+            if not starts:
+                continue
 
-                if start == -1:
-                    break
+            morph = ranked_morphs[rank]
+            length = len(morph.inflection)
+            learning_status = morph.get_learning_status(
+                self.am_config.evaluate_morph_inflection,
+                self.am_config.interval_for_known_morphs,
+            )
 
-                end = start + len(morph.inflection)
-                learning_status = morph.get_learning_status(
-                    self.am_config.evaluate_morph_inflection,
-                    self.am_config.interval_for_known_morphs,
-                )
+            for start in starts:
+                end = start + length
+                if tagged.find(1, start, end) != -1:
+                    continue  # overlaps a morph that has already been tagged
 
-                self.statuses.append(
+                tagged[start:end] = b"\x01" * length
+                found_statuses.append(
                     Status(start, end, learning_status, morph.inflection)
                 )
-                expression = (
-                    expression[:start] + (" " * (end - start)) + expression[end:]
-                )
 
-        self.statuses = deque(sorted(self.statuses, key=lambda _range: _range.start))
+        self.statuses = deque(sorted(found_statuses, key=lambda _range: _range.start))
 
     def highlighted(self) -> str:
         self._highlighted_expression = self.expression
@@ -190,10 +223,12 @@ class TextHighlighter:
              ['謎','解き'] (scenario 7).
         """
 
+        assert self._highlighted_expression is not None
+        output = _ReversedSegments(self._highlighted_expression)
         ruby: Ruby | None = None
         status: Status | None = None
 
-        while self._highlighted_expression is not None:
+        while True:
 
             if ruby is None and self.rubies:
                 ruby = self.rubies.pop()
@@ -209,7 +244,7 @@ class TextHighlighter:
             if ruby is None:
                 # Ignore is here because (surprisingly) mypy can not tell the
                 # only path that leads here requires status to be non-None.
-                self._highlighted_expression = status.inject(self._highlighted_expression)  # type: ignore[union-attr]
+                output.wrap(status)  # type: ignore[arg-type]
                 status = None
                 continue
 
@@ -221,7 +256,7 @@ class TextHighlighter:
                     ruby.start,
                     ruby.end,
                     ankimorphs_globals.STATUS_UNDEFINED,
-                    self._highlighted_expression[ruby.start : ruby.end],
+                    output.get(ruby.start, ruby.end),
                 )
                 continue
 
@@ -233,28 +268,18 @@ class TextHighlighter:
                         ruby.start,
                         ruby.end,
                         ankimorphs_globals.STATUS_UNDEFINED,
-                        self._highlighted_expression[ruby.start : ruby.end],
+                        output.get(ruby.start, ruby.end),
                     )
 
                     # This is just like scenario 5.
-                    self._highlighted_expression = (
-                        self._highlighted_expression[: temp_status.start]
-                        + temp_status.open()
-                        + self._highlighted_expression[
-                            temp_status.start : temp_status.start
-                            + ruby.start
-                            - temp_status.start
-                        ]
-                        + str(ruby)
-                        + self._highlighted_expression[ruby.end : temp_status.end]
-                        + temp_status.close()
-                        + self._highlighted_expression[temp_status.end :]
+                    output.replace(
+                        temp_status.start,
+                        temp_status.end,
+                        temp_status.open() + str(ruby) + temp_status.close(),
                     )
                     ruby = None
                 else:
-                    self._highlighted_expression = status.inject(
-                        self._highlighted_expression
-                    )
+                    output.wrap(status)
                     status = None
                 continue
 
@@ -262,28 +287,37 @@ class TextHighlighter:
             # OR
             # Scenario 6: The ruby is completely inside the status.
             if ruby.start >= status.start and ruby.end <= status.end:
-                self._highlighted_expression = (
-                    self._highlighted_expression[: status.start]
-                    + status.open()
-                    + self._highlighted_expression[
-                        status.start : status.start + ruby.start - status.start
-                    ]
-                    + str(ruby)
-                    + self._highlighted_expression[ruby.end : status.end]
-                    + status.close()
-                    + self._highlighted_expression[status.end :]
-                )
-
-                # Pull and process rubies until the next ruby is outside of this status.
+                # Pull rubies until the next ruby is outside of this status.
+                status_rubies: list[Ruby] = [ruby]
                 while self.rubies:
                     if self.rubies[-1].end <= status.start:
                         break
-
-                    ruby = self.rubies.pop()
-                    ruby.start += status.open_len()
-                    ruby.end += status.open_len()
-                    self._highlighted_expression = ruby.inject(
-                        self._highlighted_expression
+                    status_rubies.append(self.rubies.pop())
+
+                # A ruby that starts before the status is injected after the status,
+                # it is always the last one pulled since the rubies do not overlap.
+                overlapping_ruby: Ruby | None = None
+                if status_rubies[-1].start < status.start:
+                    overlapping_ruby = status_rubies.pop()
+
+                segments: list[str] = [status.close()]
+                segment_end: int = status.end
+                for status_ruby in status_rubies:
+                    segments.append(output.get(status_ruby.end, segment_end))
+                    segments.append(str(status_ruby))
+                    segment_end = status_ruby.start
+                segments.append(output.get(status.start, segment_end))
+                segments.append(status.open())
+
+                output.replace(status.start, status.end, "".join(reversed(segments)))
+
+                if overlapping_ruby is not None:
+                    overlapping_ruby.start += status.open_len()
+                    overlapping_ruby.end += status.open_len()
+                    output.replace(
+                        overlapping_ruby.start,
+                        overlapping_ruby.end,
+                        str(overlapping_ruby),
                     )
 
                 status = None
@@ -295,13 +329,13 @@ class TextHighlighter:
             # Scenario 8: The ruby starts then status starts, ruby ends, status ends."""
             if ruby.start <= status.start:
                 status.status = ankimorphs_globals.STATUS_UNDEFINED
-                self._highlighted_expression = (
-                    self._highlighted_expression[: ruby.start]
-                    + status.open()
+                output.replace(
+                    ruby.start,
+                    status.end,
+                    status.open()
                     + str(ruby)
-                    + self._highlighted_expression[ruby.end : status.end]
-                    + status.close()
-                    + self._highlighted_expression[status.end :]
+                    + output.get(ruby.end, status.end)
+                    + status.close(),
                 )
 
                 # Pull and process statuses until the next status is outside of this ruby.
@@ -317,3 +351,56 @@ class TextHighlighter:
             # Just in case, to prevent infinite loop, we're disposing of the current pieces
             ruby = None
             status = None
+
+        self._highlighted_expression = str(output)
+
+
+class _ReversedSegments:
+    """
+    The expression is highlighted from the end to the start, so instead of rebuilding the whole
+     string for every status and ruby, the finished segments are collected in reverse order and
+     joined once at the end.
+
+    Everything before 'cursor' is still the original expression, which means that the positions
+     of the statuses and rubies that have not been processed yet are still valid. Replacing text
+     after the cursor, i.e. text that has already been highlighted, requires building the string,
+     but that does not happen with well-formed rubies and statuses.
+    """
+
+    __slots__ = (
+        "_base",
+        "_cursor",
+        "_segments",
+    )
+
+    def __init__(self, expression: str) -> None:
+        self._base: str = expression
+        self._cursor: int = len(expression)
+        self._segments: list[str] = []
+
+    def get(self, start: int, end: int) -> str:
+        if end > self._cursor:
+            self._build()
+        return self._base[start:end]
+
+    def replace(self, start: int, end: int, text: str) -> None:
+        if end > self._cursor:
+            self._build()
+        self._segments.append(text + self._base[end : self._cursor])
+        self._cursor = start
+
+    def wrap(self, status: Status) -> None:
+        self.replace(
+            status.start,
+            status.end,
+            status.open() + self.get(status.start, status.end) + status.close(),
+        )
+
+    def _build(self) -> None:
+        self._base = self._base[: self._cursor] + "".join(reversed(self._segments))
+        self._cursor = len(self._base)
+        self._segments = []
+
+    def __str__(self) -> str:
+        self._build()
+        return self._base
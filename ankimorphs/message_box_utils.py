@@ -60,6 +60,17 @@ def show_discard_message_box(title: str, body: str, parent: QWidget) -> bool:
     return False
 
 
+def show_info_box(title: str, body: str, parent: QWidget) -> int:
+    info_box = QMessageBox(parent)
+    info_box.setWindowTitle(title)
+    info_box.setIcon(QMessageBox.Icon.Information)
+    info_box.setStandardButtons(QMessageBox.StandardButton.Ok)
+    info_box.setText(body)
+    info_box.setTextFormat(Qt.TextFormat.MarkdownText)
+    answer: int = info_box.exec()
+    return answer
+
+
 def show_error_box(title: str, body: str, parent: QWidget) -> int:
     critical_box = QMessageBox(parent)
     critical_box.setWindowTitle(title)
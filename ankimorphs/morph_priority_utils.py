@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import csv
+from collections import OrderedDict
 from pathlib import Path
 from typing import Any
 
@@ -11,6 +12,14 @@ from .ankimorphs_db import AnkiMorphsDB
 from .exceptions import PriorityFileMalformedException, PriorityFileNotFoundException
 from .recalc.card_score import MORPH_UNKNOWN_PENALTY
 
+# the priority files can be huge, so only a few of them are kept in memory
+_MAX_LOADED_PRIORITY_FILES = 4
+
+# (file path, only lemma priorities) -> ((modified time, size), priorities)
+_loaded_morph_priorities: OrderedDict[
+    tuple[str, bool], tuple[tuple[int, int], dict[tuple[str, str], int]]
+] = OrderedDict()
+
 
 class PriorityFileType:
     PriorityFile = "PriorityFile"
@@ -60,12 +69,75 @@ def get_morph_priority(
             only_lemma_priorities=only_lemma_priorities
         )
 
-    return _load_morph_priorities_from_file(
+    return _get_compiled_morph_priorities(
+        am_db=am_db,
         priority_file_name=morph_priority_selection,
         only_lemma_priorities=only_lemma_priorities,
     )
 
 
+def clear_loaded_morph_priorities() -> None:
+    _loaded_morph_priorities.clear()
+
+
+def _get_compiled_morph_priorities(
+    am_db: AnkiMorphsDB,
+    priority_file_name: str,
+    only_lemma_priorities: bool,
+) -> dict[tuple[str, str], int]:
+    # Parsing large priority files takes seconds, so the parsed priorities
+    # are cached both in memory, which shares them between all the note
+    # filters that use the same file, and compiled in ankimorphs.db, which
+    # makes them a single read after a restart. The caches are only valid
+    # as long as the file has the same modified time and size.
+    #
+    # Note: the same dict is returned to every caller, it must not be modified.
+    assert mw is not None
+
+    priority_file_path = Path(
+        mw.pm.profileFolder(),
+        am_globals.PRIORITY_FILES_DIR_NAME,
+        priority_file_name,
+    )
+    try:
+        file_stat = priority_file_path.stat()
+    except FileNotFoundError as exc:
+        raise PriorityFileNotFoundException(str(priority_file_path)) from exc
+
+    file_version: tuple[int, int] = (file_stat.st_mtime_ns, file_stat.st_size)
+    cache_key: tuple[str, bool] = (str(priority_file_path), only_lemma_priorities)
+
+    loaded = _loaded_morph_priorities.get(cache_key)
+    if loaded is not None and loaded[0] == file_version:
+        _loaded_morph_priorities.move_to_end(cache_key)
+        return loaded[1]
+
+    morph_priorities: dict[tuple[str, str], int] | None = (
+        am_db.get_cached_morph_priorities(
+            str(priority_file_path), only_lemma_priorities, *file_version
+        )
+    )
+
+    if morph_priorities is None:
+        morph_priorities = _load_morph_priorities_from_file(
+            priority_file_name=priority_file_name,
+            only_lemma_priorities=only_lemma_priorities,
+        )
+        am_db.insert_cached_morph_priorities(
+            str(priority_file_path),
+            only_lemma_priorities,
+            *file_version,
+            morph_priorities=morph_priorities,
+        )
+
+    _loaded_morph_priorities[cache_key] = (file_version, morph_priorities)
+    _loaded_morph_priorities.move_to_end(cache_key)
+    while len(_loaded_morph_priorities) > _MAX_LOADED_PRIORITY_FILES:
+        _loaded_morph_priorities.popitem(last=False)
+
+    return morph_priorities
+
+
 def _load_morph_priorities_from_file(
     priority_file_name: str, only_lemma_priorities: bool
 ) -> dict[tuple[str, str], int]:
@@ -17,11 +17,9 @@ class MecabMorphemizer(Morphemizer):
         return mecab_wrapper.successful_import
 
     def get_morphemes(self, sentences: list[str]) -> Iterator[list[Morpheme]]:
-        for sentence in sentences:
-            # Remove simple spaces that could be added by other add-ons and break the parsing.
-            if space_char_regex.search(sentence):
-                sentence = space_char_regex.sub("", sentence)
-            yield mecab_wrapper.get_morphemes_mecab(sentence)
+        # Remove simple spaces that could be added by other add-ons and break the parsing.
+        sentences = [space_char_regex.sub("", sentence) for sentence in sentences]
+        yield from mecab_wrapper.get_morphemes_mecab_batch(sentences)
 
     def get_description(self) -> str:
         return "AnkiMorphs: Japanese"
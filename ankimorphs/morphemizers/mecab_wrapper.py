@@ -1,11 +1,14 @@
 from __future__ import annotations
 
+import contextlib
 import functools
 import importlib
 import importlib.util
 import re
 import subprocess
 import sys
+import threading
+from collections.abc import Iterator
 from types import ModuleType
 from typing import IO, Any
 
@@ -37,6 +40,13 @@ _mecab_args = [
 
 successful_import: bool = False
 
+# The number of expressions sent to mecab in a single pipe round-trip
+_MECAB_CHUNK_SIZE = 1000
+
+# mecab is used both on the main thread (highlighting) and in background
+# ops (recalc), the lock prevents the outputs from getting mixed up.
+_mecab_lock = threading.Lock()
+
 
 def setup_mecab() -> None:
     global successful_import
@@ -114,25 +124,50 @@ def _spawn_cmd(cmd: list[str], _startupinfo: Any) -> subprocess.Popen[bytes]:
     )
 
 
-# the cache needs to have a max size to maintain garbage collection
-@functools.lru_cache(maxsize=131072)
-def get_morphemes_mecab(expression: str) -> list[Morpheme]:
+def get_morphemes_mecab_batch(expressions: list[str]) -> Iterator[list[Morpheme]]:
+    """
+    Yields the morphs of the expressions in the same order as the input.
+    The expressions are sent to mecab in chunks, one pipe round-trip per
+    chunk, which is a lot faster than a round-trip for each expression.
+    The morphs of a chunk are yielded before the next chunk is sent, so
+    progress and cancelling work, and the lock is released in between,
+    that way highlighting doesn't have to wait for an entire recalc.
+    """
+    assert _mecab_encoding is not None
+
+    for chunk_start in range(0, len(expressions), _MECAB_CHUNK_SIZE):
+        bytes_expressions: list[bytes] = [
+            _get_mecab_input(expression)
+            for expression in expressions[chunk_start : chunk_start + _MECAB_CHUNK_SIZE]
+        ]
+
+        with _mecab_lock:
+            output_lines: list[bytes] = _interact_batch(bytes_expressions)
+
+        for line in output_lines:
+            actual_morphs: list[Morpheme] = []
+            mecab_morphs: list[str] = str(line.rstrip(b"\r\n"), _mecab_encoding).split(
+                "\r"
+            )
+            for morph_string in mecab_morphs:
+                morph: Morpheme | None = _get_morpheme(morph_string.split("\t"))
+                if morph is not None:
+                    actual_morphs.append(morph)
+            yield actual_morphs
+
+
+def _get_mecab_input(expression: str) -> bytes:
     # HACK: mecab sometimes does not produce the right morphs if there are no extra characters in the expression,
     # so we just add a whitespace and a japanese punctuation mark "。" at the end to prevent the problem.
     expression += " 。"
 
-    # Remove Unicode control codes before sending to MeCab.
+    # Remove Unicode control codes before sending to MeCab. This also removes
+    # any newlines, which guarantees that mecab produces exactly one line of
+    # output per expression.
     expression = _control_chars_re.sub("", expression)
 
-    mecab_morphs: list[str] = _interact(expression).split("\r")
-    actual_morphs: list[Morpheme] = []
-
-    for morph_string in mecab_morphs:
-        morph: Morpheme | None = _get_morpheme(morph_string.split("\t"))
-        if morph is not None:
-            actual_morphs.append(morph)
-
-    return actual_morphs
+    assert _mecab_encoding is not None
+    return expression.encode(_mecab_encoding, errors="ignore") + b"\n"
 
 
 def _get_morpheme(morph_string_parts: list[str]) -> Morpheme | None:
@@ -151,30 +186,59 @@ def _get_morpheme(morph_string_parts: list[str]) -> Morpheme | None:
     return Morpheme(lemma, inflection)
 
 
-def _interact(string_expression: str) -> str:  # Str -> IO Str
+def _interact_batch(bytes_expressions: list[bytes]) -> list[bytes]:
     """
-    "interacts" with 'mecab' command: writes expression to stdin of 'mecab' process and gets all the morpheme
-    info from its stdout.
+    "interacts" with 'mecab' command: writes the expressions to stdin of 'mecab' process and gets
+    all the morpheme info from its stdout, one line per expression.
     """
     mecab_process: subprocess.Popen[bytes] = _spawn_mecab()
 
     assert mecab_process.stdin is not None
     assert mecab_process.stdout is not None
-    assert _mecab_encoding is not None
-
-    bytes_expression = string_expression.encode(_mecab_encoding, errors="ignore")
-
-    # The line terminator is always b'\n' for binary files: https://docs.python.org/3/library/io.html#io.IOBase
-    mecab_process.stdin.write(bytes_expression + b"\n")
-
-    # The buffer will be written out to the underlying RawIOBase object when flush() is called
-    mecab_process.stdin.flush()
-    mecab_process.stdout.flush()
-
-    entire_output: str = ""
-    lines_to_read = len(bytes_expression.split(b"\n"))
-
-    for line in mecab_process.stdout.readlines(lines_to_read):
-        entire_output += str(line.rstrip(b"\r\n"), _mecab_encoding)
 
-    return entire_output
+    mecab_stdin: IO[bytes] = mecab_process.stdin
+    writer_errors: list[Exception] = []
+
+    def write_expressions() -> None:
+        try:
+            # The line terminator is always b'\n' for binary files: https://docs.python.org/3/library/io.html#io.IOBase
+            mecab_stdin.write(b"".join(bytes_expressions))
+            # The buffer will be written out to the underlying RawIOBase object when flush() is called
+            mecab_stdin.flush()
+        except Exception as error:  # pylint:disable=broad-exception-caught
+            # re-raised on the calling thread after the join
+            writer_errors.append(error)
+            # mecab exits when its input is closed, otherwise the
+            # reader would wait forever for the missing output lines.
+            with contextlib.suppress(OSError, ValueError):
+                mecab_stdin.close()
+
+    # Mecab starts writing output before it has read all the input, so if we
+    # wrote everything before reading, then both pipe buffers could fill up
+    # and deadlock. To prevent that we write on a separate thread while the
+    # output is read incrementally here.
+    writer_thread = threading.Thread(target=write_expressions, daemon=True)
+    writer_thread.start()
+
+    output_lines: list[bytes] = []
+    for _ in range(len(bytes_expressions)):
+        line: bytes = mecab_process.stdout.readline()
+        if line == b"":
+            break  # EOF, mecab has exited
+        output_lines.append(line)
+
+    writer_thread.join()
+
+    if len(writer_errors) > 0 or len(output_lines) < len(bytes_expressions):
+        # the process can't be reused, the next call spawns a new one
+        _spawn_mecab.cache_clear()
+        mecab_process.kill()
+
+        if len(writer_errors) > 0:
+            raise writer_errors[0]
+
+        raise RuntimeError(
+            f"mecab exited after {len(output_lines)} of {len(bytes_expressions)} expressions"
+        )
+
+    return output_lines
@@ -6,6 +6,7 @@ from collections.abc import Iterator
 from .. import text_preprocessing
 from ..ankimorphs_config import AnkiMorphsConfig
 from ..morpheme import Morpheme
+from . import morphemizer_cache
 
 
 class Morphemizer(ABC):
@@ -21,10 +22,22 @@ class Morphemizer(ABC):
         Returns a string with the name of the morphemizer.
         """
 
+    def get_model_version(self) -> str:
+        """
+        Returns the version of the underlying model, if any. Cached
+        morphs are discarded when this changes.
+        """
+        return ""
+
     def get_processed_morphs(
         self, am_config: AnkiMorphsConfig, sentences: list[str]
     ) -> Iterator[list[Morpheme]]:
-        for morphs in self.get_morphemes(sentences):
+        morphemizer_key = morphemizer_cache.get_morphemizer_key(
+            self.get_description(), self.get_model_version()
+        )
+        for morphs in morphemizer_cache.get_morphemes_cached(
+            morphemizer_key, self.get_morphemes, sentences
+        ):
             if am_config.preprocess_ignore_names_morphemizer:
                 morphs = self.remove_names_morphemizer(morphs)
             if am_config.preprocess_ignore_names_textfile:
@@ -0,0 +1,363 @@
+from __future__ import annotations
+
+import json
+import sqlite3
+import threading
+import time
+from collections.abc import Callable, Generator, Iterable, Iterator
+from pathlib import Path
+
+from aqt import mw
+
+from .. import ankimorphs_globals
+from ..morpheme import Morpheme
+
+################################################################
+#                    MORPHEMIZER CACHE
+################################################################
+# Morphemizing is by far the most expensive part of recalc, and
+# the in-memory caches of the morphemizers are lost when Anki
+# restarts. To avoid paying the full cost again, the raw output
+# of the morphemizers is stored in a separate sqlite file in the
+# profile folder, keyed by the morphemizer (description + model
+# version) and the processed text.
+#
+# The raw output is stored before any names are filtered out,
+# that way the cache is not affected by the preprocess settings.
+#
+# A separate file is used instead of a table in ankimorphs.db
+# because that db gets dropped when its schema changes, and the
+# cache is also used from the main thread while highlighting.
+################################################################
+
+CACHE_FILE_NAME = "ankimorphs_morphemizer_cache.db"
+
+# A typical entry is a couple hundred bytes, which means the
+# cache file stays around a couple hundred MB at most.
+MAX_CACHE_ENTRIES = 1_000_000
+
+# Texts are looked up and yielded in chunks so that progress can be
+# reported and cancelled. Sqlite versions before 3.32 only allow 999
+# parameters per query, which the lookup queries have to stay under.
+_CHUNK_SIZE = 900
+
+hits: int = 0
+misses: int = 0
+
+# The entries that have been read since the last eviction. Their
+# 'last_used' is only updated right before the cache is trimmed in
+# the background (recalc), that way reading from the cache never has
+# to write to it, e.g. while highlighting on the main thread.
+_used_entries: set[tuple[str, str]] = set()
+_used_entries_lock = threading.Lock()
+
+
+def reset_counters() -> None:
+    global hits, misses
+    hits = 0
+    misses = 0
+
+
+def get_counters_summary() -> str:
+    total = hits + misses
+    hit_percent = round(hits / total * 100, 1) if total > 0 else 0
+    return f"{hits} hits, {misses} misses ({hit_percent}% hit rate)"
+
+
+def get_morphemes_cached(
+    morphemizer_key: str,
+    morphemize: Callable[[list[str]], Iterator[list[Morpheme]]],
+    sentences: list[str],
+) -> Iterator[list[Morpheme]]:
+    """
+    Yields the morphs of the sentences in the same order as the input.
+    Only the sentences that are not in the cache are given to 'morphemize',
+    all of them in a single call so that the morphemizer can spread them
+    out however it wants, e.g. over the spaCy worker processes.
+    """
+    global hits, misses
+
+    cache_path: Path | None = _get_cache_path()
+    if cache_path is None:
+        yield from morphemize(sentences)
+        return
+
+    with MorphemizerCache(cache_path) as cache:
+        missing: list[str] = cache.get_missing_texts(morphemizer_key, sentences)
+        hits += len(sentences) - len(missing)
+        misses += len(missing)
+
+        # The missing sentences are in the order they first occur in, so
+        # 'morphemize' produces them in the same order as they are needed.
+        morphemized: Iterator[list[Morpheme]] = (
+            morphemize(missing) if len(missing) > 0 else iter([])
+        )
+        missing_and_morphs: Iterator[tuple[str, list[Morpheme]]] = zip(
+            missing, morphemized
+        )
+        not_morphemized: set[str] = set(missing)
+
+        try:
+            for chunk_start in range(0, len(sentences), _CHUNK_SIZE):
+                chunk: list[str] = sentences[chunk_start : chunk_start + _CHUNK_SIZE]
+                cached: dict[str, list[Morpheme]] = cache.get_morphs(
+                    morphemizer_key, chunk
+                )
+                new_morphs: dict[str, list[Morpheme]] = _get_new_morphs(
+                    chunk, cached, not_morphemized, missing_and_morphs
+                )
+
+                if len(new_morphs) > 0:
+                    cache.insert_morphs(morphemizer_key, new_morphs)
+                    cached.update(new_morphs)
+
+                for sentence in chunk:
+                    yield _get_morphs_copy(cached, sentence, morphemize)
+        finally:
+            # stops the morphemizer if the receiver stops iterating,
+            # e.g. the spaCy worker processes are terminated.
+            if isinstance(morphemized, Generator):
+                morphemized.close()
+
+
+def update_last_used_and_evict() -> None:
+    """
+    Updates the 'last_used' of the entries that have been read since the
+    last call, and then evicts the least recently used entries if the cache
+    has grown too large. Counting the entries is slow on large caches, so
+    this should only be called from background operations.
+    """
+    global _used_entries
+
+    cache_path: Path | None = _get_cache_path()
+    if cache_path is None:
+        return
+
+    with _used_entries_lock:
+        used_entries = _used_entries
+        _used_entries = set()
+
+    with MorphemizerCache(cache_path) as cache:
+        cache.update_last_used(used_entries)
+        cache.evict_oldest_entries()
+
+
+def _get_new_morphs(
+    chunk: list[str],
+    cached: dict[str, list[Morpheme]],
+    not_morphemized: set[str],
+    missing_and_morphs: Iterator[tuple[str, list[Morpheme]]],
+) -> dict[str, list[Morpheme]]:
+    new_morphs: dict[str, list[Morpheme]] = {}
+
+    for sentence in chunk:
+        if sentence in cached or sentence not in not_morphemized:
+            continue
+        for text, morphs in missing_and_morphs:
+            # the texts that are skipped here have been cached
+            # in the meantime, e.g. while highlighting.
+            not_morphemized.discard(text)
+            if text == sentence:
+                new_morphs[text] = morphs
+                break
+
+    return new_morphs
+
+
+def _get_morphs_copy(
+    cached: dict[str, list[Morpheme]],
+    sentence: str,
+    morphemize: Callable[[list[str]], Iterator[list[Morpheme]]],
+) -> list[Morpheme]:
+    morphs: list[Morpheme] | None = cached.get(sentence)
+    if morphs is None:
+        # the entry was evicted after it was looked up, this is very rare
+        morphs = next(morphemize([sentence]))
+        cached[sentence] = morphs
+    # make copies, the receivers are allowed to modify the morphs
+    return [_copy_morph(morph) for morph in morphs]
+
+
+def _get_cache_path() -> Path | None:
+    # mw is None when the morphemizers are used outside of Anki (tests),
+    # in which case we skip the cache.
+    if mw is None or mw.pm is None:
+        return None
+    return Path(mw.pm.profileFolder(), CACHE_FILE_NAME)
+
+
+def _copy_morph(morph: Morpheme) -> Morpheme:
+    return Morpheme(
+        lemma=morph.lemma,
+        inflection=morph.inflection,
+        part_of_speech=morph.part_of_speech,
+        sub_part_of_speech=morph.sub_part_of_speech,
+    )
+
+
+class MorphemizerCache:
+    def __init__(self, db_path: Path) -> None:
+        # a timeout is needed since the cache can be written from both
+        # the main thread (highlighting new texts) and background ops (recalc).
+        self.con: sqlite3.Connection = sqlite3.connect(db_path, timeout=30)
+        self._timestamp: int = int(time.time())
+        self._create_table()
+
+    def __enter__(self) -> MorphemizerCache:
+        return self
+
+    def __exit__(self, *_: object) -> None:
+        self.con.close()
+
+    def _create_table(self) -> None:
+        with self.con:
+            self.con.execute(
+                """
+                    CREATE TABLE IF NOT EXISTS Morphemizer_Cache
+                    (
+                        morphemizer_key TEXT,
+                        text TEXT,
+                        morphs TEXT,
+                        last_used INTEGER,
+                        PRIMARY KEY (morphemizer_key, text)
+                    )
+                    """
+            )
+            self.con.execute(
+                """
+                    CREATE INDEX IF NOT EXISTS Morphemizer_Cache_Last_Used
+                    ON Morphemizer_Cache (last_used)
+                    """
+            )
+
+    def get_missing_texts(self, morphemizer_key: str, texts: list[str]) -> list[str]:
+        """
+        Returns the texts that are not in the cache, without duplicates
+        and in the order they first occur in.
+        """
+        missing: dict[str, None] = {}  # dict to keep the insertion order
+
+        for chunk_start in range(0, len(texts), _CHUNK_SIZE):
+            chunk: list[str] = texts[chunk_start : chunk_start + _CHUNK_SIZE]
+            placeholders = ",".join(["?"] * len(chunk))
+
+            with self.con:
+                cached_texts: set[str] = {
+                    row[0]
+                    for row in self.con.execute(
+                        f"""
+                            SELECT text
+                            FROM Morphemizer_Cache
+                            WHERE morphemizer_key = ? AND text IN ({placeholders})
+                            """,
+                        (morphemizer_key, *chunk),
+                    )
+                }
+
+            for text in chunk:
+                if text not in cached_texts:
+                    missing[text] = None
+
+        return list(missing)
+
+    def get_morphs(
+        self, morphemizer_key: str, texts: list[str]
+    ) -> dict[str, list[Morpheme]]:
+        placeholders = ",".join(["?"] * len(texts))
+
+        with self.con:
+            rows = self.con.execute(
+                f"""
+                    SELECT text, morphs
+                    FROM Morphemizer_Cache
+                    WHERE morphemizer_key = ? AND text IN ({placeholders})
+                    """,
+                (morphemizer_key, *texts),
+            ).fetchall()
+
+        # the timestamps are used to evict the least recently used entries
+        with _used_entries_lock:
+            _used_entries.update((morphemizer_key, row[0]) for row in rows)
+
+        return {text: _deserialize_morphs(morphs) for text, morphs in rows}
+
+    def insert_morphs(
+        self, morphemizer_key: str, morphs_by_text: dict[str, list[Morpheme]]
+    ) -> None:
+        with self.con:
+            self.con.executemany(
+                """
+                    INSERT OR REPLACE INTO Morphemizer_Cache VALUES (?, ?, ?, ?)
+                    """,
+                [
+                    (morphemizer_key, text, _serialize_morphs(morphs), self._timestamp)
+                    for text, morphs in morphs_by_text.items()
+                ],
+            )
+
+    def update_last_used(self, entries: Iterable[tuple[str, str]]) -> None:
+        """
+        entries: (morphemizer_key, text)
+        """
+        with self.con:
+            self.con.executemany(
+                """
+                    UPDATE Morphemizer_Cache
+                    SET last_used = ?
+                    WHERE morphemizer_key = ? AND text = ? AND last_used != ?
+                    """,
+                [
+                    (self._timestamp, morphemizer_key, text, self._timestamp)
+                    for morphemizer_key, text in entries
+                ],
+            )
+
+    def evict_oldest_entries(self) -> None:
+        with self.con:
+            self.con.execute(
+                """
+                    DELETE FROM Morphemizer_Cache
+                    WHERE rowid IN (
+                        SELECT rowid
+                        FROM Morphemizer_Cache
+                        ORDER BY last_used
+                        LIMIT MAX(0, (SELECT COUNT(*) FROM Morphemizer_Cache) - ?)
+                    )
+                    """,
+                (MAX_CACHE_ENTRIES,),
+            )
+
+
+def get_morphemizer_key(description: str, model_version: str) -> str:
+    # The ankimorphs version is included since the morphemizer wrappers
+    # can change how the raw output is turned into morphs.
+    return f"{description}|{model_version}|{ankimorphs_globals.__version__}"
+
+
+def _serialize_morphs(morphs: list[Morpheme]) -> str:
+    return json.dumps(
+        [
+            [
+                morph.lemma,
+                morph.inflection,
+                morph.part_of_speech,
+                morph.sub_part_of_speech,
+            ]
+            for morph in morphs
+        ],
+        ensure_ascii=False,
+    )
+
+
+def _deserialize_morphs(serialized_morphs: str) -> list[Morpheme]:
+    return [
+        Morpheme(
+            lemma=lemma,
+            inflection=inflection,
+            part_of_speech=part_of_speech,
+            sub_part_of_speech=sub_part_of_speech,
+        )
+        for lemma, inflection, part_of_speech, sub_part_of_speech in json.loads(
+            serialized_morphs
+        )
+    ]
@@ -1,67 +1,51 @@
-import re
 from collections.abc import Iterator
-from typing import Any
 
-from .. import text_preprocessing
 from ..ankimorphs_config import AnkiMorphsConfig
 from ..morpheme import Morpheme
-from ..morphemizers import spacy_wrapper
+from ..morphemizers import spacy_process_pool, spacy_wrapper
 from ..morphemizers.morphemizer import Morphemizer
 
-# matches strings/words entirely made up of punctuations and symbols
-punctuation_and_symbols = re.compile(r"^[\W_]+$", re.UNICODE)
-
 
 class SpacyMorphemizer(Morphemizer):
     def __init__(self, spacy_model: str):
         super().__init__()
         self.spacy_model: str = spacy_model
-        # part of speech tags: https://universaldependencies.org/u/pos/
-        self.excluded_pos = {"X", "SPACE", "SYM", "PUNCT"}
+        self.worker_processes: int = 1
+        self.batch_size: int = 256
 
     def get_processed_morphs(
         self, am_config: AnkiMorphsConfig, sentences: list[str]
     ) -> Iterator[list[Morpheme]]:
+        self.worker_processes = am_config.spacy_worker_processes
+        self.batch_size = am_config.spacy_batch_size
 
-        # creating nlp objects is very expensive so we do it lazily here (cached)
-        nlp: Any = spacy_wrapper.get_nlp(self.spacy_model)
-
-        for doc in nlp.pipe(sentences):
-            morphs: list[Morpheme] = []
-
-            # doc: spacy.tokens.Doc
-            for w in doc:
-
-                if w.pos_ in self.excluded_pos:
-                    continue
-
-                if am_config.preprocess_ignore_names_morphemizer and w.pos_ == "PROPN":
-                    continue
-
-                if am_config.preprocess_ignore_numbers and w.pos_ == "NUM":
-                    continue
-
-                # spaCy can miscategorize text, so we include this as a failsafe.
-                if punctuation_and_symbols.match(w.text):
-                    continue
-
-                morphs.append(
-                    Morpheme(
-                        lemma=w.lemma_,
-                        inflection=w.text,
-                    )
-                )
-
-            if am_config.preprocess_ignore_names_textfile:
-                morphs = text_preprocessing.remove_names_textfile(morphs)
-
+        for morphs in super().get_processed_morphs(am_config, sentences):
+            if am_config.preprocess_ignore_numbers:
+                morphs = [morph for morph in morphs if morph.part_of_speech != "NUM"]
             yield morphs
 
     def get_morphemes(self, sentences: list[str]) -> Iterator[list[Morpheme]]:
         """
-        Use 'get_processed_morphs()' instead of this
+        The part of speech is included so that names and numbers can be
+        filtered out later, see 'get_processed_morphs()'.
         """
-        yield []
+        for morph_tuples in spacy_process_pool.get_morph_tuples(
+            spacy_model=self.spacy_model,
+            sentences=sentences,
+            worker_processes=self.worker_processes,
+            batch_size=self.batch_size,
+        ):
+            yield [
+                Morpheme(
+                    lemma=lemma,
+                    inflection=inflection,
+                    part_of_speech=part_of_speech,
+                )
+                for lemma, inflection, part_of_speech in morph_tuples
+            ]
+
+    def get_model_version(self) -> str:
+        return spacy_wrapper.get_model_version(self.spacy_model)
 
     def init_successful(self) -> bool:
         return spacy_wrapper.successful_import
@@ -0,0 +1,133 @@
+from __future__ import annotations
+
+import multiprocessing
+import re
+from collections.abc import Iterator
+from typing import Any
+
+from anki.utils import is_lin
+
+from ..morphemizers import spacy_wrapper
+
+################################################################
+#                    SPACY PROCESS POOL
+################################################################
+# spaCy releases very little of the GIL, so running nlp.pipe()
+# on the recalc thread only uses a single core. To use more
+# cores we shard the sentences into batches and morphemize them
+# in worker processes. The batches are mapped with 'imap' which
+# streams the results back in the same order as the input.
+#
+# The workers are forked from the Anki process instead of spawned.
+# Spawned processes would have to re-import the add-on, which
+# registers the gui hooks, and the frozen Anki executables can't
+# be used as a python interpreter anyway. A nice side effect of
+# forking is that the workers inherit the nlp that was already
+# loaded by the parent, so the model is only loaded once.
+#
+# Forking is only done on Linux, on Windows and macOS we fall back
+# to morphemizing on the current thread. Windows doesn't have fork,
+# and macOS system libraries are known to crash in forked children
+# of processes that have started threads.
+#
+# Known risk: the pool is also forked from a threaded process on
+# Linux (Qt, the recalc QueryOp thread). The child only gets the
+# forking thread, so a lock that another thread held at the time
+# of the fork is never released in the child. The workers only run
+# spaCy and pickle tuples, so they don't touch the locks of Qt or
+# the add-on, but a lock held inside the python runtime or a native
+# library could still deadlock a worker. This is why the worker
+# processes are opt-in (spacy_worker_processes defaults to 1).
+#
+# The morphemizer cache gives all of its misses to a single
+# 'get_morph_tuples' call, so only one pool is created per note
+# filter in recalc, and all the workers get batches to work on.
+#
+# The workers only send back compact (lemma, inflection, pos)
+# tuples since pickling the spaCy docs is very expensive.
+################################################################
+
+MorphTuple = tuple[str, str, str]
+
+# part of speech tags: https://universaldependencies.org/u/pos/
+EXCLUDED_POS: set[str] = {"X", "SPACE", "SYM", "PUNCT"}
+
+# matches strings/words entirely made up of punctuations and symbols
+punctuation_and_symbols = re.compile(r"^[\W_]+$", re.UNICODE)
+
+_worker_nlp: Any = None  # spacy.Language, only set in the worker processes
+
+
+def can_use_processes(worker_processes: int) -> bool:
+    return (
+        worker_processes > 1
+        and is_lin
+        and "fork" in multiprocessing.get_all_start_methods()
+        and spacy_wrapper.successful_import
+    )
+
+
+def get_morph_tuples(
+    spacy_model: str,
+    sentences: list[str],
+    worker_processes: int,
+    batch_size: int,
+) -> Iterator[list[MorphTuple]]:
+    """
+    Yields the morph tuples of the sentences in the same order as the input.
+    Uses worker processes if possible, otherwise the current thread.
+    """
+    # creating nlp objects is very expensive so we do it lazily here (cached)
+    nlp: Any = spacy_wrapper.get_nlp(spacy_model)
+
+    if not can_use_processes(worker_processes) or len(sentences) <= batch_size:
+        for doc in nlp.pipe(sentences, batch_size=batch_size):
+            yield doc_to_morph_tuples(doc)
+        return
+
+    batches: list[list[str]] = [
+        sentences[batch_start : batch_start + batch_size]
+        for batch_start in range(0, len(sentences), batch_size)
+    ]
+    processes: int = min(worker_processes, len(batches))
+
+    # Exiting the 'with' block terminates the workers, this also happens
+    # if the receiver stops iterating, e.g. when recalc is cancelled.
+    with multiprocessing.get_context("fork").Pool(
+        processes=processes,
+        initializer=_init_worker,
+        initargs=(spacy_model,),
+    ) as pool:
+        for batch_morph_tuples in pool.imap(_morphemize_batch, batches):
+            yield from batch_morph_tuples
+
+
+def doc_to_morph_tuples(doc: Any) -> list[MorphTuple]:
+    morph_tuples: list[MorphTuple] = []
+
+    # doc: spacy.tokens.Doc
+    for w in doc:
+        if w.pos_ in EXCLUDED_POS:
+            continue
+
+        # spaCy can miscategorize text, so we include this as a failsafe.
+        if punctuation_and_symbols.match(w.text):
+            continue
+
+        morph_tuples.append((w.lemma_, w.text, w.pos_))
+
+    return morph_tuples
+
+
+def _init_worker(spacy_model: str) -> None:
+    global _worker_nlp
+    # the nlp is inherited from the parent if it was already loaded there
+    _worker_nlp = spacy_wrapper.get_nlp(spacy_model)
+
+
+def _morphemize_batch(sentences: list[str]) -> list[list[MorphTuple]]:
+    assert _worker_nlp is not None
+    return [
+        doc_to_morph_tuples(doc)
+        for doc in _worker_nlp.pipe(sentences, batch_size=len(sentences))
+    ]
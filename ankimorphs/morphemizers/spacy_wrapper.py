@@ -116,6 +116,16 @@ def get_installed_models() -> list[str]:
     return [f"{model_name}" for model_name in _spacy_utils.get_installed_models()]
 
 
+@functools.cache
+def get_model_version(spacy_model_name: str) -> str:
+    if not successful_import:
+        return ""
+
+    assert _spacy_utils is not None
+    version: str | None = _spacy_utils.get_package_version(spacy_model_name)
+    return version if version is not None else ""
+
+
 # the cache needs to have a max size to maintain garbage collection
 @functools.lru_cache(maxsize=131072)
 def get_nlp(spacy_model_name: str):  # type: ignore[no-untyped-def] # pylint:disable=too-many-branches, too-many-statements
@@ -1,8 +1,19 @@
 from __future__ import annotations
 
+import bisect
+
+from .. import ankimorphs_globals
 from ..ankimorphs_db import AnkiMorphsDB
 from ..exceptions import InvalidBinsException
 
+_STATUS_MISSING = "missing"
+_PROGRESSION_STATUSES = [
+    ankimorphs_globals.STATUS_KNOWN,
+    ankimorphs_globals.STATUS_LEARNING,
+    ankimorphs_globals.STATUS_UNKNOWN,
+    _STATUS_MISSING,
+]
+
 
 class Bins:
     """Bins, used for morph priority."""
@@ -37,31 +48,37 @@ class Bins:
 
 
 class ProgressReport:
-    """Stores lists of know, learning, unknown, and missing morphs."""
-
-    def __init__(self, min_priority: int, max_priority: int) -> None:
+    """Stores the number of known, learning, unknown, and missing morphs."""
+
+    def __init__(  # pylint:disable=too-many-arguments
+        self,
+        min_priority: int,
+        max_priority: int,
+        total_known: int = 0,
+        total_learning: int = 0,
+        total_unknowns: int = 0,
+        total_missing: int = 0,
+    ) -> None:
 
         self.min_priority = min_priority
         self.max_priority = max_priority
 
-        # Morphs are represented as (lemma,inflection/lemma) keys,
-        # identical to morph_priorities
-        self.unique_known: set[tuple[str, str]] = set()
-        self.unique_learning: set[tuple[str, str]] = set()
-        self.unique_unknowns: set[tuple[str, str]] = set()
-        self.unique_missing: set[tuple[str, str]] = set()
+        self.total_known = total_known
+        self.total_learning = total_learning
+        self.total_unknowns = total_unknowns
+        self.total_missing = total_missing
 
     def get_total_known(self) -> int:
-        return len(self.unique_known)
+        return self.total_known
 
     def get_total_learning(self) -> int:
-        return len(self.unique_learning)
+        return self.total_learning
 
     def get_total_unknowns(self) -> int:
-        return len(self.unique_unknowns)
+        return self.total_unknowns
 
     def get_total_missing(self) -> int:
-        return len(self.unique_missing)
+        return self.total_missing
 
     def get_total_morphs(self) -> int:
         return (
@@ -72,117 +89,108 @@ class ProgressReport:
         )
 
 
-def _update_progress_report(
-    progress_report: ProgressReport, morph: tuple[str, str], morph_status: str
-) -> None:
-    """Adds morph and status information to a progress report."""
-    assert morph_status in ["known", "learning", "unknown", "missing"]
-    if morph_status == "known":
-        progress_report.unique_known.add(morph)
-    elif morph_status == "learning":
-        progress_report.unique_learning.add(morph)
-    elif morph_status == "unknown":
-        progress_report.unique_unknowns.add(morph)
-    else:  # morph_status == "missing":
-        progress_report.unique_missing.add(morph)
-
-
-def get_progress_reports(
-    am_db: AnkiMorphsDB,
-    bins: Bins,
-    morph_priorities: dict[tuple[str, str], int],
-    only_lemma_priorities: bool,
-) -> list[ProgressReport]:
-    reports = []
-
-    # This function could be cleaner if the learning status dictionaries were
-    # keyed like the morph_priority dictionaries.
-    morph_learning_statuses: dict[str, str]
-    if only_lemma_priorities:
-        morph_learning_statuses = am_db.get_morph_lemmas_learning_statuses()
-    else:
-        morph_learning_statuses = am_db.get_morph_inflections_learning_statuses()
-
-    for min_priority, max_priority in bins.indexes:
-
-        report = ProgressReport(min_priority, max_priority)
-        morph_priorities_subset = _get_morph_priorities_subset(
-            morph_priorities, min_priority, max_priority
-        )
-
-        for morph in morph_priorities_subset:
+class ProgressionEngine:
+    """
+    Sorts the morph priorities and classifies the status of every morph once,
+    and stores the number of morphs of each status as prefix sums. Any bins
+    (normal or cumulative) can then be calculated with two binary searches
+    per bin, i.e. changing the bins does not require reloading anything.
+    """
 
-            learning_status_key = morph[0] + morph[1]
-            if only_lemma_priorities:
-                learning_status_key = morph[0]  # expect morph=(lemma,lemma)
+    def __init__(
+        self,
+        am_db: AnkiMorphsDB,
+        morph_priorities: dict[tuple[str, str], int],
+        only_lemma_priorities: bool,
+    ) -> None:
+        self.only_lemma_priorities = only_lemma_priorities
 
-            morph_status = "missing"
-            if (
-                learning_status_key in morph_learning_statuses
-            ):  # if the morph is in the database
-                morph_status = morph_learning_statuses[learning_status_key]
-            _update_progress_report(report, morph, morph_status)
-
-        reports.append(report)
-
-    return reports
-
-
-def get_priority_ordered_morph_statuses(
-    am_db: AnkiMorphsDB,
-    bins: Bins,
-    morph_priorities: dict[tuple[str, str], int],
-    only_lemma_priorities: bool,
-) -> list[tuple[int, str, str, str]]:
-    """Returns a list of (priority,lemma,inflection,status) tuples in order of
-    increasing priority"""
-    # (lemma, inflection, and status) in increasing priority order
-    morph_statuses: list[tuple[int, str, str, str]] = []
-
-    morph_priorities = _get_morph_priorities_subset(
-        morph_priorities, bins.min_index, bins.max_index
-    )
-
-    sorted_morph_priorities = dict(
-        sorted(
-            morph_priorities.items(),
-            key=lambda item: item[1],
-        )
-    )
+        morph_learning_statuses: dict[str, str]
+        if only_lemma_priorities:
+            morph_learning_statuses = am_db.get_morph_lemmas_learning_statuses()
+        else:
+            morph_learning_statuses = am_db.get_morph_inflections_learning_statuses()
 
-    morph_learning_statuses: dict[str, str]
-    if only_lemma_priorities:
-        morph_learning_statuses = am_db.get_morph_lemmas_learning_statuses()
-    else:
-        morph_learning_statuses = am_db.get_morph_inflections_learning_statuses()
+        # Morphs are represented as (lemma,inflection/lemma) keys,
+        # identical to morph_priorities
+        self._sorted_morphs: list[tuple[str, str]] = []
+        self._sorted_priorities: list[int] = []
+        self._sorted_statuses: list[str] = []
 
-    for morph in sorted_morph_priorities:
-        priority = sorted_morph_priorities[morph]
-        learning_status_key = morph[0] + morph[1]
-        if only_lemma_priorities:
-            learning_status_key = morph[0]  # expect morph=(lemma,lemma)
+        # _prefix_sums[status][n] is the number of morphs with that
+        # status among the first n morphs in priority order
+        self._prefix_sums: dict[str, list[int]] = {
+            status: [0] for status in _PROGRESSION_STATUSES
+        }
 
-        morph_status = "missing"
-        if (
-            learning_status_key in morph_learning_statuses
-        ):  # if the morph is in the database
-            morph_status = morph_learning_statuses[learning_status_key]
+        for morph, priority in sorted(morph_priorities.items(), key=lambda x: x[1]):
+            learning_status_key = morph[0] + morph[1]
+            if only_lemma_priorities:
+                learning_status_key = morph[0]  # expect morph=(lemma,lemma)
 
-        if only_lemma_priorities:
-            morph_statuses.append((priority, morph[0], "-", morph_status))
-        else:
-            morph_statuses.append((priority, morph[0], morph[1], morph_status))
+            # if the morph is not in the database it is missing
+            morph_status = morph_learning_statuses.get(
+                learning_status_key, _STATUS_MISSING
+            )
 
-    return morph_statuses
+            self._sorted_morphs.append(morph)
+            self._sorted_priorities.append(priority)
+            self._sorted_statuses.append(morph_status)
 
+            for status, prefix_sum in self._prefix_sums.items():
+                prefix_sum.append(prefix_sum[-1] + (status == morph_status))
 
-def _get_morph_priorities_subset(
-    morph_priorities: dict[tuple[str, str], int], min_priority: int, max_priority: int
-) -> dict[tuple[str, str], int]:
-    """Returns morph priorities within a priority range."""
+    def _get_index_range(self, min_priority: int, max_priority: int) -> range:
+        return range(
+            bisect.bisect_left(self._sorted_priorities, min_priority),
+            bisect.bisect_right(self._sorted_priorities, max_priority),
+        )
 
-    def is_in_range(item: tuple[tuple[str, str], int]) -> bool:
-        _, priority = item
-        return min_priority <= priority <= max_priority
+    def _get_count(self, morph_status: str, index_range: range) -> int:
+        prefix_sum = self._prefix_sums[morph_status]
+        return prefix_sum[index_range.stop] - prefix_sum[index_range.start]
+
+    def get_progress_reports(self, bins: Bins) -> list[ProgressReport]:
+        reports = []
+
+        for min_priority, max_priority in bins.indexes:
+            index_range = self._get_index_range(min_priority, max_priority)
+            reports.append(
+                ProgressReport(
+                    min_priority,
+                    max_priority,
+                    total_known=self._get_count(
+                        ankimorphs_globals.STATUS_KNOWN, index_range
+                    ),
+                    total_learning=self._get_count(
+                        ankimorphs_globals.STATUS_LEARNING, index_range
+                    ),
+                    total_unknowns=self._get_count(
+                        ankimorphs_globals.STATUS_UNKNOWN, index_range
+                    ),
+                    total_missing=self._get_count(_STATUS_MISSING, index_range),
+                )
+            )
+
+        return reports
+
+    def get_priority_ordered_morph_statuses(
+        self, bins: Bins
+    ) -> list[tuple[int, str, str, str]]:
+        """Returns a list of (priority,lemma,inflection,status) tuples in order of
+        increasing priority"""
+        morph_statuses: list[tuple[int, str, str, str]] = []
+
+        for index in self._get_index_range(bins.min_index, bins.max_index):
+            morph = self._sorted_morphs[index]
+            inflection = "-" if self.only_lemma_priorities else morph[1]
+            morph_statuses.append(
+                (
+                    self._sorted_priorities[index],
+                    morph[0],
+                    inflection,
+                    self._sorted_statuses[index],
+                )
+            )
 
-    return dict(filter(is_in_range, morph_priorities.items()))
+        return morph_statuses
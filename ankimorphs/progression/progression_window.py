@@ -2,6 +2,7 @@ from __future__ import annotations
 
 from collections.abc import Callable
 from functools import partial
+from pathlib import Path
 
 import aqt
 from aqt import mw
@@ -28,12 +29,7 @@ from ..extra_settings import extra_settings_keys
 from ..extra_settings.ankimorphs_extra_settings import AnkiMorphsExtraSettings
 from ..table_utils import QTableWidgetIntegerItem, QTableWidgetPercentItem
 from ..ui.progression_window_ui import Ui_ProgressionWindow
-from .progression_utils import (
-    Bins,
-    ProgressReport,
-    get_priority_ordered_morph_statuses,
-    get_progress_reports,
-)
+from .progression_utils import Bins, ProgressionEngine, ProgressReport
 
 
 class ProgressionWindow(QMainWindow):  # pylint:disable=too-many-instance-attributes
@@ -68,6 +64,11 @@ class ProgressionWindow(QMainWindow):  # pylint:disable=too-many-instance-attrib
         self.num_numerical_percent_columns = 6
         self.num_morph_columns = 4
 
+        # the engine is reused as long as the priorities and statuses
+        # are the same, e.g. when only the bins are changed.
+        self._progression_engine: ProgressionEngine | None = None
+        self._progression_engine_key: tuple[object, ...] | None = None
+
         self._setup_numerical_percent_table(self.ui.numericalTableWidget)
         self._setup_numerical_percent_table(self.ui.percentTableWidget)
         self._setup_morph_table(self.ui.morphTableWidget)
@@ -219,44 +220,73 @@ class ProgressionWindow(QMainWindow):  # pylint:disable=too-many-instance-attrib
     def _is_lemma_priority_selected(self) -> bool:
         return self.ui.lemmaRadioButton.isChecked()
 
-    def _background_calculate_progress_and_populate_tables(self) -> None:
+    def _get_progression_engine_key(self) -> tuple[object, ...]:
+        # The statuses change when ankimorphs.db changes (recalc), and the
+        # priorities change if the priority file is modified.
         assert mw is not None
 
-        am_db = AnkiMorphsDB()
-        bins = self._get_selected_bins()
+        priority_selection: str = self.ui.morphPriorityCBox.currentText()
+        modified_times: list[int | None] = []
+
+        for path in [
+            Path(mw.pm.profileFolder(), "ankimorphs.db"),
+            Path(
+                mw.pm.profileFolder(),
+                ankimorphs_globals.PRIORITY_FILES_DIR_NAME,
+                priority_selection,
+            ),
+        ]:
+            try:
+                modified_times.append(path.stat().st_mtime_ns)
+            except OSError:
+                modified_times.append(None)
+
+        return (
+            priority_selection,
+            self._is_lemma_priority_selected(),
+            *modified_times,
+        )
+
+    def _get_progression_engine(self) -> ProgressionEngine:
+        engine_key = self._get_progression_engine_key()
+
+        if (
+            self._progression_engine is not None
+            and self._progression_engine_key == engine_key
+        ):
+            return self._progression_engine
+
+        with AnkiMorphsDB() as am_db:
+            morph_priorities = morph_priority_utils.get_morph_priority(
+                am_db=am_db,
+                only_lemma_priorities=self._is_lemma_priority_selected(),
+                morph_priority_selection=self.ui.morphPriorityCBox.currentText(),
+            )
+            self._progression_engine = ProgressionEngine(
+                am_db, morph_priorities, self._is_lemma_priority_selected()
+            )
 
-        morph_priorities = morph_priority_utils.get_morph_priority(
-            am_db=am_db,
-            only_lemma_priorities=self._is_lemma_priority_selected(),
-            morph_priority_selection=self.ui.morphPriorityCBox.currentText(),
-        )
+        self._progression_engine_key = engine_key
+        return self._progression_engine
 
-        mw.taskman.run_on_main(
-            partial(
-                mw.progress.update,
-                label="Calculating binned statistics",
-            )
-        )
+    def _background_calculate_progress_and_populate_tables(self) -> None:
+        assert mw is not None
 
-        reports = get_progress_reports(
-            am_db, bins, morph_priorities, self._is_lemma_priority_selected()
-        )
+        bins = self._get_selected_bins()
+        progression_engine = self._get_progression_engine()
 
         if mw.progress.want_cancel():
-            am_db.con.close()
             raise CancelledOperationException
 
         mw.taskman.run_on_main(
             partial(
                 mw.progress.update,
-                label="Calculating morph statuses",
+                label="Calculating binned statistics",
             )
         )
-        morph_statuses = get_priority_ordered_morph_statuses(
-            am_db, bins, morph_priorities, self._is_lemma_priority_selected()
-        )
 
-        am_db.con.close()
+        reports = progression_engine.get_progress_reports(bins)
+        morph_statuses = progression_engine.get_priority_ordered_morph_statuses(bins)
 
         if mw.progress.want_cancel():
             raise CancelledOperationException
@@ -9,13 +9,15 @@ from collections.abc import Sequence
 from typing import Any
 
 import anki.utils
-from anki.cards import CardId
+from anki.cards import Card, CardId
+from anki.collection import SearchNode
+from anki.consts import CardQueue
 from anki.models import ModelManager, NotetypeDict, NotetypeId
+from anki.notes import Note, NoteId
 from anki.tags import TagManager
 from aqt import mw
 
 from ..ankimorphs_config import AnkiMorphsConfig, AnkiMorphsConfigFilter
-from ..morpheme import Morpheme
 
 
 class AnkiDBRowData:
@@ -60,7 +62,7 @@ class AnkiCardData:  # pylint:disable=too-many-instance-attributes
         "tags",
         "note_id",
         "note_type_id",
-        "morphs",
+        "expression_hash",
     )
 
     def __init__(  # pylint:disable=too-many-arguments
@@ -94,7 +96,7 @@ class AnkiCardData:  # pylint:disable=too-many-instance-attributes
         self.note_type_id = note_type_id
 
         # this is set later in the caching process
-        self.morphs: set[Morpheme] | None = None
+        self.expression_hash: str = ""
 
 
 class AnkiMorphsCardData:
@@ -127,6 +129,135 @@ class AnkiMorphsCardData:
         self.tags: str = data_row[4]
 
 
+class RecalcCardData:
+    """
+    A lightweight copy of the values of an anki card that recalc can modify.
+    This is much cheaper than getting Card objects from the backend, so we
+    only create those for the cards that actually changed.
+    """
+
+    __slots__ = (
+        "card_id",
+        "note_id",
+        "type",
+        "due",
+        "queue",
+        "original_due",
+        "original_queue",
+    )
+
+    def __init__(self, data_row: Sequence[Any]) -> None:
+        assert isinstance(data_row[0], int)
+        self.card_id: CardId = CardId(data_row[0])
+
+        assert isinstance(data_row[1], int)
+        self.note_id: NoteId = NoteId(data_row[1])
+
+        assert isinstance(data_row[2], int)
+        self.type: int = data_row[2]
+
+        assert isinstance(data_row[3], int)
+        self.due: int = data_row[3]
+        self.original_due: int = data_row[3]
+
+        assert isinstance(data_row[4], int)
+        self.queue: int = data_row[4]
+        self.original_queue: int = data_row[4]
+
+    def is_modified(self) -> bool:
+        return self.due != self.original_due or self.queue != self.original_queue
+
+    def to_card(self) -> Card:
+        assert mw is not None
+        card: Card = mw.col.get_card(self.card_id)
+        card.due = self.due
+        card.queue = CardQueue(self.queue)
+        return card
+
+
+class RecalcNoteData:
+    """
+    A lightweight copy of the values of an anki note that recalc can modify,
+    see RecalcCardData.
+    """
+
+    __slots__ = (
+        "note_id",
+        "fields",
+        "tags",
+        "_original_fields",
+        "_original_tags",
+    )
+
+    def __init__(self, note_id: NoteId, fields: list[str], tags: list[str]) -> None:
+        self.note_id: NoteId = note_id
+        self.fields: list[str] = fields
+        self.tags: list[str] = tags
+
+        # make sure to store the values and not references
+        self._original_fields: list[str] = fields.copy()
+        self._original_tags: list[str] = tags.copy()
+
+    def is_modified(self) -> bool:
+        return self.fields != self._original_fields or self.tags != self._original_tags
+
+    def to_note(self) -> Note:
+        assert mw is not None
+        note: Note = mw.col.get_note(self.note_id)
+        note.fields = self.fields
+        note.tags = self.tags
+        return note
+
+
+class RecalcDataRows:
+    """
+    Gets the values recalc needs from all the cards and notes of a note
+    type in a single query, instead of getting the Card and Note objects
+    one by one from the backend.
+    """
+
+    __slots__ = (
+        "_rows",
+        "_tag_manager",
+    )
+
+    def __init__(self, note_type_id: NotetypeId) -> None:
+        assert mw is not None
+        assert mw.col.db is not None
+
+        self._tag_manager = TagManager(mw.col)
+        self._rows: dict[int, Sequence[Any]] = {
+            row[0]: row
+            for row in mw.col.db.all(
+                """
+                SELECT cards.id, cards.nid, cards.type, cards.due, cards.queue, notes.flds, notes.tags
+                FROM cards
+                INNER JOIN notes ON
+                    cards.nid = notes.id
+                WHERE notes.mid = ?
+                """,
+                note_type_id,
+            )
+        }
+
+    def get_card(self, card_id: int) -> RecalcCardData:
+        return RecalcCardData(self._rows[card_id])
+
+    def get_note(self, card_id: int) -> RecalcNoteData:
+        # the cards of a note all have the same note values, so any of
+        # the card ids of the note can be used to get the note.
+        row = self._rows[card_id]
+
+        assert isinstance(row[1], int)
+        assert isinstance(row[5], str)
+        assert isinstance(row[6], str)
+        return RecalcNoteData(
+            note_id=NoteId(row[1]),
+            fields=anki.utils.split_fields(row[5]),
+            tags=self._tag_manager.split(row[6]),
+        )
+
+
 def create_card_data_dict(
     am_config: AnkiMorphsConfig,
     config_filter: AnkiMorphsConfigFilter,
@@ -146,7 +277,9 @@ def create_card_data_dict(
     existing_field_names: list[str] = model_manager.field_names(note_type_dict)
     field_index: int = existing_field_names.index(config_filter.field)
 
-    for anki_row_data in _get_anki_data(am_config, note_type_id, tags).values():
+    for anki_row_data in _get_anki_data(
+        am_config, config_filter.note_type, tags
+    ).values():
         card_data = AnkiCardData(
             am_config=am_config,
             tag_manager=tag_manager,
@@ -160,47 +293,49 @@ def create_card_data_dict(
 
 
 def _get_anki_data(
-    am_config: AnkiMorphsConfig, model_id: NotetypeId, tags_object: dict[str, str]
+    am_config: AnkiMorphsConfig, note_type: str, tags_object: dict[str, str]
 ) -> dict[int, AnkiDBRowData]:
     ################################################################
-    #                        SQL QUERY
+    #                        CARD SEARCH
     ################################################################
-    # This sql query is horrible, partly because of the limitation
-    # in sqlite where you can't really build a query with variable
-    # parameter length (tags in this case)
-    # More info:
-    # https://stackoverflow.com/questions/5766230/select-from-sqlite-table-where-rowid-in-list-using-python-sqlite3-db-api-2-0
+    # The cards are found with a single search, which lets Anki
+    # handle the tags properly (hierarchical tags, special
+    # characters, etc.) and use its own indexes. The values of the
+    # cards and notes are then read with a query by card id.
     #
-    # EXAMPLE FINAL SQL QUERY:
-    #   SELECT cards.id, cards.ivl, cards.type, cards.queue, notes.id, notes.flds, notes.tags
-    #   FROM cards
-    #   INNER JOIN notes ON
-    #       cards.nid = notes.id
-    #   WHERE notes.mid = 1691076536776 AND (cards.queue != -1 OR notes.tags LIKE '% am-known-manually %') AND notes.tags LIKE '% movie %'
+    # SearchNode handles escaping characters for us (e.g. 'am_known' -> 'am\_known').
+    #
+    # EXAMPLE SEARCH STRING:
+    #   note:Basic (-is:suspended OR tag:am-known-manually) tag:movie -tag:music
     ################################################################
 
     assert mw is not None
     assert mw.col.db is not None
 
-    ignore_suspended_cards = ""
+    search_nodes: list[SearchNode] = [SearchNode(note=note_type)]
+
     if am_config.preprocess_ignore_suspended_cards_content:
         # If this part is included, then we don't get cards that are suspended EXCEPT for
         # the cards that were 'set known and skip' and later suspended. We want to always
         # include those cards otherwise we can lose track of known morphs
-        ignore_suspended_cards = f" AND (cards.queue != -1 OR notes.tags LIKE '% {am_config.tag_known_manually} %')"
+        search_nodes.append(
+            mw.col.group_searches(
+                SearchNode(
+                    negated=SearchNode(card_state=SearchNode.CARD_STATE_SUSPENDED)
+                ),
+                SearchNode(tag=am_config.tag_known_manually),
+                joiner="OR",
+            )
+        )
 
-    excluded_tags = tags_object["exclude"]
-    included_tags = tags_object["include"]
-    tags_search_string = ""
+    for _tag in tags_object["include"]:
+        search_nodes.append(SearchNode(tag=_tag))
+    for _tag in tags_object["exclude"]:
+        search_nodes.append(SearchNode(negated=SearchNode(tag=_tag)))
 
-    if len(excluded_tags) > 0:
-        tags_search_string += "".join(
-            [f" AND notes.tags NOT LIKE '% {_tag} %'" for _tag in excluded_tags]
-        )
-    if len(included_tags) > 0:
-        tags_search_string += "".join(
-            [f" AND notes.tags LIKE '% {_tag} %'" for _tag in included_tags]
-        )
+    card_ids: Sequence[int] = mw.col.find_cards(
+        mw.col.build_search_string(*search_nodes)
+    )
 
     result: list[Sequence[Any]] = mw.col.db.all(
         """
@@ -209,7 +344,7 @@ def _get_anki_data(
         INNER JOIN notes ON
             cards.nid = notes.id
         """
-        + f"WHERE notes.mid = {model_id}{ignore_suspended_cards}{tags_search_string}",
+        + f"WHERE cards.id IN {anki.utils.ids2str(card_ids)}",
     )
 
     anki_db_row_data_dict: dict[int, AnkiDBRowData] = {}
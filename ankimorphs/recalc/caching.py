@@ -1,21 +1,49 @@
 from __future__ import annotations
 
 import csv
+import hashlib
+from collections.abc import Iterator
 from pathlib import Path
 from typing import Any
 
 from aqt import mw
 
 from .. import ankimorphs_globals as am_globals
-from .. import progress_utils
+from .. import name_file_utils, progress_utils
 from ..ankimorphs_config import AnkiMorphsConfig, AnkiMorphsConfigFilter
 from ..ankimorphs_db import AnkiMorphsDB
 from ..exceptions import CancelledOperationException, KnownMorphsFileMalformedException
-from ..morphemizers import morphemizer_utils
+from ..morpheme import Morpheme
+from ..morphemizers import morphemizer_cache, morphemizer_utils
 from ..text_preprocessing import get_processed_text
-from . import anki_data_utils
+from . import anki_data_utils, recalc_profiler
 from .anki_data_utils import AnkiCardData
 
+# executemany is only called once this many card-morph pairs have accumulated
+_INSERT_CHUNK_SIZE = 50_000
+
+# The number of cards that had to be morphemized, and the number of unique
+# expressions they had, i.e. the number of texts given to the morphemizers.
+morphemized_cards: int = 0
+unique_expressions: int = 0
+
+
+def reset_counters() -> None:
+    global morphemized_cards, unique_expressions
+    morphemized_cards = 0
+    unique_expressions = 0
+
+
+def get_counters_summary() -> str:
+    duplicates = morphemized_cards - unique_expressions
+    duplicate_percent = (
+        round(duplicates / morphemized_cards * 100, 1) if morphemized_cards > 0 else 0
+    )
+    return (
+        f"{unique_expressions} unique expressions for {morphemized_cards} cards "
+        f"({duplicate_percent}% duplicates)"
+    )
+
 
 def cache_anki_data(  # pylint:disable=too-many-locals, too-many-branches, too-many-statements
     am_config: AnkiMorphsConfig,
@@ -29,127 +57,315 @@ def cache_anki_data(  # pylint:disable=too-many-locals, too-many-branches, too-m
     # of all the things that are happening. Refactoring this into even smaller pieces
     # will in effect lead to spaghetti code.
 
+    global morphemized_cards, unique_expressions
     assert mw is not None
 
     # Rebuilding the entire ankimorphs db every time is faster and much simpler than
-    # updating it since we can bulk queries to the anki db.
+    # updating it since we can bulk queries to the anki db. Morphemizing is the
+    # expensive part, so before dropping the tables we grab the morphs of the previous
+    # recalc and reuse them for the cards whose expression hash has not changed.
     am_db = AnkiMorphsDB()
+    previous_expression_hashes: dict[int, str] = am_db.get_card_expression_hashes()
+    previous_card_morphs: dict[int, set[Morpheme]] | None = {}
+    if len(previous_expression_hashes) > 0:
+        previous_card_morphs = am_db.get_all_card_morphs()
+    if previous_card_morphs is None:
+        # the morphs can't be read from an outdated schema, so nothing is reused
+        previous_expression_hashes = {}
+        previous_card_morphs = {}
     am_db.drop_all_tables()
     am_db.create_all_tables()
 
-    # These lists contain data that will be inserted into ankimorphs.db
-    card_table_data: list[dict[str, Any]] = []
-    morph_table_data: list[dict[str, Any]] = []
-    card_morph_map_table_data: list[dict[str, Any]] = []
+    # The rows are written to ankimorphs.db in chunks as soon as the morphs of a
+    # card are known, that way we never hold all the card/morph pairs in memory.
+    # Only the id and highest learning interval of every unique morph is accumulated,
+    # which is bounded by the vocabulary size and not the collection size.
+    morph_intervals = _MorphIntervals()
+    table_writer = _TableWriter(am_db, morph_intervals)
 
     # We only want to cache the morphs on the note-filters that have 'read' enabled
     for config_filter in read_enabled_config_filters:
-        cards_data_dict: dict[int, AnkiCardData] = (
-            anki_data_utils.create_card_data_dict(
-                am_config,
-                config_filter,
+        with recalc_profiler.stage("Anki DB read") as stage_stats:
+            cards_data_dict: dict[int, AnkiCardData] = (
+                anki_data_utils.create_card_data_dict(
+                    am_config,
+                    config_filter,
+                )
             )
-        )
+            stage_stats.items += len(cards_data_dict)
         card_amount = len(cards_data_dict)
 
         # Batching the text makes spacy much faster, so we flatten the data into the all_text list.
-        # To get back to the card_id for every entry in the all_text list, we create a separate list with the keys.
+        # To get back to the card_ids for every entry in the all_text list, we create a separate list with the keys.
         # These two lists have to be synchronized, i.e., the indexes align, that way they can be used for lookup later.
+        #
+        # All the cards of a note have the same expression, so the expression is only
+        # preprocessed once per note. Different notes can also have the same expression
+        # (e.g. the same sentence mined twice), so every unique expression is only
+        # morphemized once and the resulting morphs are then added to all of its cards.
         all_text: list[str] = []
-        all_keys: list[int] = []
-
-        for key, _card_data in cards_data_dict.items():
-            # Some spaCy models label all capitalized words as proper nouns,
-            # which is pretty bad. To prevent this, we lower case everything.
-            # This in turn makes some models not label proper nouns correctly,
-            # but this is preferable because we also have the 'Mark as Name'
-            # feature that can be used in that case.
-            expression = get_processed_text(am_config, _card_data.expression.lower())
-            all_text.append(expression)
-            all_keys.append(key)
+        all_keys: list[list[int]] = []
+        expression_indices: dict[str, int] = {}
+        note_expressions: dict[int, tuple[str, str]] = {}
+
+        # The hash covers the morphemizer and the preprocess settings, so if any of
+        # those change, then every card gets re-morphemized (a full rebuild).
+        settings_hash = _get_morphemizing_settings_hash(am_config, config_filter)
+
+        with recalc_profiler.stage("Preprocessing") as stage_stats:
+            stage_stats.items += card_amount
+            for counter, (key, _card_data) in enumerate(cards_data_dict.items()):
+                progress_utils.background_update_progress_potentially_cancel(
+                    label=f"Caching {config_filter.note_type} cards<br>card: {counter} of {card_amount}",
+                    counter=counter,
+                    max_value=card_amount,
+                )
+
+                note_expression: tuple[str, str] | None = note_expressions.get(
+                    _card_data.note_id
+                )
+                if note_expression is None:
+                    # Some spaCy models label all capitalized words as proper nouns,
+                    # which is pretty bad. To prevent this, we lower case everything.
+                    # This in turn makes some models not label proper nouns correctly,
+                    # but this is preferable because we also have the 'Mark as Name'
+                    # feature that can be used in that case.
+                    expression = get_processed_text(
+                        am_config, _card_data.expression.lower()
+                    )
+                    note_expression = (
+                        expression,
+                        hashlib.blake2b(
+                            settings_hash + expression.encode(), digest_size=16
+                        ).hexdigest(),
+                    )
+                    note_expressions[_card_data.note_id] = note_expression
+
+                expression, _card_data.expression_hash = note_expression
+
+                if previous_expression_hashes.get(key) == _card_data.expression_hash:
+                    # cards without morphs are not in the card_morph_map table
+                    table_writer.add_card(
+                        am_config,
+                        key,
+                        _card_data,
+                        previous_card_morphs.get(key, set()),
+                    )
+                    continue
+
+                morphemized_cards += 1
+                text_index: int | None = expression_indices.get(expression)
+                if text_index is None:
+                    expression_indices[expression] = len(all_text)
+                    all_text.append(expression)
+                    all_keys.append([key])
+                else:
+                    all_keys[text_index].append(key)
 
         morphemizer = morphemizer_utils.get_morphemizer_by_description(
             config_filter.morphemizer_description
         )
         assert morphemizer is not None
 
-        for index, processed_morphs in enumerate(
-            morphemizer.get_processed_morphs(am_config, all_text)
-        ):
-            progress_utils.background_update_progress_potentially_cancel(
-                label=f"Extracting morphs from<br>{config_filter.note_type} cards<br>card: {index} of {card_amount}",
-                counter=index,
-                max_value=card_amount,
-            )
-            key = all_keys[index]
-            cards_data_dict[key].morphs = set(processed_morphs)
-
-        for counter, card_id in enumerate(cards_data_dict):
-            progress_utils.background_update_progress_potentially_cancel(
-                label=f"Caching {config_filter.note_type} cards<br>card: {counter} of {card_amount}",
-                counter=counter,
-                max_value=card_amount,
-            )
-            card_data: AnkiCardData = cards_data_dict[card_id]
-
-            if card_data.automatically_known_tag or card_data.manually_known_tag:
-                highest_interval = am_config.interval_for_known_morphs
-            elif card_data.type == 1:  # 1: learning
-                # cards in the 'learning' state have an interval of zero, but we don't
-                # want to treat them as 'unknown', so we change the value manually.
-                highest_interval = 1
-            else:
-                highest_interval = card_data.interval
-
-            card_table_data.append(
-                {
-                    "card_id": card_id,
-                    "note_id": card_data.note_id,
-                    "note_type_id": card_data.note_type_id,
-                    "card_type": card_data.type,
-                    "tags": card_data.tags,
-                }
-            )
-
-            if card_data.morphs is None:
-                continue
-
-            for morph in card_data.morphs:
-                morph_table_data.append(
-                    {
-                        "lemma": morph.lemma,
-                        "inflection": morph.inflection,
-                        "highest_lemma_learning_interval": None,  # updates later
-                        "highest_inflection_learning_interval": highest_interval,
-                    }
+        text_amount = len(all_text)
+        unique_expressions += text_amount
+
+        with recalc_profiler.stage(
+            f"Morphemizing {config_filter.note_type}"
+        ) as stage_stats:
+            stage_stats.items += text_amount
+            for index, processed_morphs in enumerate(
+                morphemizer.get_processed_morphs(am_config, all_text)
+            ):
+                progress_utils.background_update_progress_potentially_cancel(
+                    label=f"Extracting morphs from<br>{config_filter.note_type} notes<br>note: {index} of {text_amount}",
+                    counter=index,
+                    max_value=text_amount,
                 )
-                card_morph_map_table_data.append(
-                    {
-                        "card_id": card_id,
-                        "morph_lemma": morph.lemma,
-                        "morph_inflection": morph.inflection,
-                    }
+                morphs: set[Morpheme] = set(processed_morphs)
+                for key in all_keys[index]:
+                    table_writer.add_card(
+                        am_config,
+                        key,
+                        cards_data_dict[key],
+                        morphs,
+                    )
+
+            table_writer.flush()
+
+    # The morphemizer cache is only trimmed here, that way the main thread
+    # never has to wait for it while highlighting.
+    with recalc_profiler.stage("Morphemizer cache eviction"):
+        morphemizer_cache.update_last_used_and_evict()
+
+    with recalc_profiler.stage("Interval updates") as stage_stats:
+        if am_config.read_known_morphs_folder is True:
+            progress_utils.background_update_progress(label="Importing known morphs")
+            for lemma, inflection in _get_morphs_from_files():
+                morph_intervals.update(
+                    lemma, inflection, am_config.interval_for_known_morphs
                 )
 
-    if am_config.read_known_morphs_folder is True:
-        progress_utils.background_update_progress(label="Importing known morphs")
-        morph_table_data += _get_morphs_from_files(am_config)
-
-    progress_utils.background_update_progress(label="Updating learning intervals")
-    _update_learning_intervals(am_config, morph_table_data)
+        progress_utils.background_update_progress(label="Updating learning intervals")
+        lemma_ids, highest_lemma_intervals = _get_learning_intervals_of_lemmas(
+            morph_intervals
+        )
+        stage_stats.items += len(morph_intervals.highest_intervals)
 
     progress_utils.background_update_progress(label="Saving to ankimorphs.db")
-    am_db.insert_many_into_morph_table(morph_table_data)
-    am_db.insert_many_into_card_table(card_table_data)
-    am_db.insert_many_into_card_morph_map_table(card_morph_map_table_data)
+    with recalc_profiler.stage("ankimorphs.db inserts") as stage_stats:
+        am_db.insert_many_into_morph_table(
+            _get_morph_table_rows(
+                am_config, morph_intervals, lemma_ids, highest_lemma_intervals
+            )
+        )
+        am_db.insert_many_into_tag_table(
+            (tag_id, tag) for tag, tag_id in table_writer.tag_ids.items()
+        )
+        am_db.insert_collection_priorities()
+        stage_stats.items += len(morph_intervals.highest_intervals)
     # am_db.print_table("Morphs")
     am_db.con.close()
 
 
-def _get_morphs_from_files(am_config: AnkiMorphsConfig) -> list[dict[str, Any]]:
+class _TableWriter:
+    """
+    Buffers the Cards, Card_Morph_Map and Card_Tags rows and inserts them in chunks
+    """
+
+    __slots__ = (
+        "am_db",
+        "morph_intervals",
+        "card_rows",
+        "card_morph_map_rows",
+        "card_tag_rows",
+        "tag_ids",
+    )
+
+    def __init__(self, am_db: AnkiMorphsDB, morph_intervals: _MorphIntervals) -> None:
+        self.am_db = am_db
+        self.morph_intervals = morph_intervals
+        self.card_rows: list[tuple[int, int, int, int, str, str]] = []
+        self.card_morph_map_rows: list[tuple[int, int]] = []
+        self.card_tag_rows: list[tuple[int, int]] = []
+        # the tags are few, so they are only inserted once all the cards are added
+        self.tag_ids: dict[str, int] = {}
+
+    def add_card(
+        self,
+        am_config: AnkiMorphsConfig,
+        card_id: int,
+        card_data: AnkiCardData,
+        morphs: set[Morpheme],
+    ) -> None:
+        highest_interval: int = _get_highest_interval(am_config, card_data)
+
+        self.card_rows.append(
+            (
+                card_id,
+                card_data.note_id,
+                card_data.note_type_id,
+                card_data.type,
+                card_data.tags,
+                card_data.expression_hash,
+            )
+        )
+
+        for morph in morphs:
+            morph_id: int = self.morph_intervals.update(
+                morph.lemma, morph.inflection, highest_interval
+            )
+            self.card_morph_map_rows.append((card_id, morph_id))
+
+        for tag in card_data.tags.split():
+            tag_id: int = self.tag_ids.setdefault(tag, len(self.tag_ids))
+            self.card_tag_rows.append((card_id, tag_id))
+
+        if len(self.card_morph_map_rows) >= _INSERT_CHUNK_SIZE:
+            self.flush()
+
+    def flush(self) -> None:
+        with recalc_profiler.stage("ankimorphs.db inserts") as stage_stats:
+            self.am_db.insert_many_into_card_table(self.card_rows)
+            self.am_db.insert_many_into_card_morph_map_table(self.card_morph_map_rows)
+            self.am_db.insert_many_into_card_tags_table(self.card_tag_rows)
+            stage_stats.items += len(self.card_rows)
+        self.card_rows.clear()
+        self.card_morph_map_rows.clear()
+        self.card_tag_rows.clear()
+
+
+def _get_highest_interval(am_config: AnkiMorphsConfig, card_data: AnkiCardData) -> int:
+    if card_data.automatically_known_tag or card_data.manually_known_tag:
+        return am_config.interval_for_known_morphs
+    if card_data.type == 1:  # 1: learning
+        # cards in the 'learning' state have an interval of zero, but we don't
+        # want to treat them as 'unknown', so we change the value manually.
+        return 1
+    return card_data.interval
+
+
+class _MorphIntervals:
+    """
+    Gives every unique morph an id and keeps track of its highest inflection
+    learning interval. The id is the index of the interval in the list.
+    """
+
+    __slots__ = (
+        "morph_ids",
+        "highest_intervals",
+    )
+
+    def __init__(self) -> None:
+        self.morph_ids: dict[tuple[str, str], int] = {}
+        self.highest_intervals: list[int] = []
+
+    def update(self, lemma: str, inflection: str, interval: int) -> int:
+        key = (lemma, inflection)
+        morph_id: int | None = self.morph_ids.get(key)
+
+        if morph_id is None:
+            morph_id = len(self.highest_intervals)
+            self.morph_ids[key] = morph_id
+            self.highest_intervals.append(interval)
+        elif interval > self.highest_intervals[morph_id]:
+            self.highest_intervals[morph_id] = interval
+
+        return morph_id
+
+
+def _get_morphemizing_settings_hash(
+    am_config: AnkiMorphsConfig, config_filter: AnkiMorphsConfigFilter
+) -> bytes:
+    # Anything that changes the morphs extracted from an expression has to be
+    # included here, otherwise outdated morphs would be reused.
+    settings_hash = hashlib.blake2b(digest_size=16)
+
+    settings: list[str] = [
+        config_filter.morphemizer_description,
+        str(am_config.preprocess_ignore_bracket_contents),
+        str(am_config.preprocess_ignore_round_bracket_contents),
+        str(am_config.preprocess_ignore_slim_round_bracket_contents),
+        str(am_config.preprocess_ignore_numbers),
+        str(am_config.preprocess_ignore_custom_characters),
+        am_config.preprocess_custom_characters_to_ignore,
+        str(am_config.preprocess_ignore_names_morphemizer),
+        str(am_config.preprocess_ignore_names_textfile),
+    ]
+
+    if am_config.preprocess_ignore_names_textfile:
+        settings += sorted(name_file_utils.get_names_from_file())
+
+    for setting in settings:
+        settings_hash.update(setting.encode())
+        settings_hash.update(b"\0")
+
+    return settings_hash.digest()
+
+
+def _get_morphs_from_files() -> Iterator[tuple[str, str]]:
     assert mw is not None
 
-    morphs_from_files: list[dict[str, Any]] = []
     input_files: list[Path] = _get_known_morphs_files()
 
     for input_file in input_files:
@@ -171,16 +387,14 @@ def _get_morphs_from_files(am_config: AnkiMorphsConfig) -> list[dict[str, Any]]:
             )
 
             if inflection_column_index == -1:
-                morphs_from_files += _get_morphs_from_minimum_format(
-                    am_config, morph_reader, lemma_column_index
+                yield from _get_morphs_from_minimum_format(
+                    morph_reader, lemma_column_index
                 )
             else:
-                morphs_from_files += _get_morphs_from_full_format(
-                    am_config, morph_reader, lemma_column_index, inflection_column_index
+                yield from _get_morphs_from_full_format(
+                    morph_reader, lemma_column_index, inflection_column_index
                 )
 
-    return morphs_from_files
-
 
 def _get_known_morphs_files() -> list[Path]:
     assert mw is not None
@@ -222,84 +436,59 @@ def _get_lemma_and_inflection_columns(
 
 
 def _get_morphs_from_minimum_format(
-    am_config: AnkiMorphsConfig, morph_reader: Any, lemma_column: int
-) -> list[dict[str, Any]]:
-    morphs_from_files: list[dict[str, Any]] = []
-
+    morph_reader: Any, lemma_column: int
+) -> Iterator[tuple[str, str]]:
     for row in morph_reader:
         lemma: str = row[lemma_column]
-        morphs_from_files.append(
-            {
-                "lemma": lemma,
-                "inflection": lemma,
-                "highest_lemma_learning_interval": am_config.interval_for_known_morphs,
-                "highest_inflection_learning_interval": am_config.interval_for_known_morphs,
-            }
-        )
-    return morphs_from_files
+        yield lemma, lemma
 
 
 def _get_morphs_from_full_format(
-    am_config: AnkiMorphsConfig,
     morph_reader: Any,
     lemma_column: int,
     inflection_column: int,
-) -> list[dict[str, Any]]:
-    morphs_from_files: list[dict[str, Any]] = []
-
+) -> Iterator[tuple[str, str]]:
     for row in morph_reader:
         lemma: str = row[lemma_column]
         inflection: str = row[inflection_column]
-        morphs_from_files.append(
-            {
-                "lemma": lemma,
-                "inflection": inflection,
-                "highest_lemma_learning_interval": am_config.interval_for_known_morphs,
-                "highest_inflection_learning_interval": am_config.interval_for_known_morphs,
-            }
-        )
-    return morphs_from_files
-
+        yield lemma, inflection
 
-def _update_learning_intervals(
-    am_config: AnkiMorphsConfig, morph_table_data: list[dict[str, Any]]
-) -> None:
-    learning_intervals_of_lemmas: dict[str, int] = _get_learning_intervals_of_lemmas(
-        morph_table_data
-    )
 
-    if am_config.evaluate_morph_lemma:
-        # update both the lemma and inflection intervals
-        for morph_data_dict in morph_table_data:
-            lemma = morph_data_dict["lemma"]
-            morph_data_dict["highest_lemma_learning_interval"] = (
-                learning_intervals_of_lemmas[lemma]
-            )
-            morph_data_dict["highest_inflection_learning_interval"] = (
-                learning_intervals_of_lemmas[lemma]
-            )
-    else:
-        # only update lemma intervals
-        for morph_data_dict in morph_table_data:
-            lemma = morph_data_dict["lemma"]
-            morph_data_dict["highest_lemma_learning_interval"] = (
-                learning_intervals_of_lemmas[lemma]
-            )
+def _get_morph_table_rows(
+    am_config: AnkiMorphsConfig,
+    morph_intervals: _MorphIntervals,
+    lemma_ids: dict[str, int],
+    highest_lemma_intervals: list[int],
+) -> Iterator[tuple[int, int, str, str, int, int]]:
+    for (lemma, inflection), morph_id in morph_intervals.morph_ids.items():
+        lemma_id = lemma_ids[lemma]
+        lemma_interval = highest_lemma_intervals[lemma_id]
+        if am_config.evaluate_morph_lemma:
+            # the inflections get the same interval as their lemma
+            inflection_interval = lemma_interval
+        else:
+            inflection_interval = morph_intervals.highest_intervals[morph_id]
+        yield morph_id, lemma_id, lemma, inflection, lemma_interval, inflection_interval
 
 
 def _get_learning_intervals_of_lemmas(
-    morph_table_data: list[dict[str, Any]],
-) -> dict[str, int]:
-    learning_intervals_of_lemmas: dict[str, int] = {}
-
-    for morph_data_dict in morph_table_data:
-        lemma = morph_data_dict["lemma"]
-        inflection_interval = morph_data_dict["highest_inflection_learning_interval"]
-
-        if lemma in learning_intervals_of_lemmas:
-            if inflection_interval > learning_intervals_of_lemmas[lemma]:
-                learning_intervals_of_lemmas[lemma] = inflection_interval
-        else:
-            learning_intervals_of_lemmas[lemma] = inflection_interval
-
-    return learning_intervals_of_lemmas
+    morph_intervals: _MorphIntervals,
+) -> tuple[dict[str, int], list[int]]:
+    """
+    Returns the lemma ids and the highest learning interval of every lemma
+    (indexed by the lemma id).
+    """
+    lemma_ids: dict[str, int] = {}
+    learning_intervals_of_lemmas: list[int] = []
+
+    for (lemma, _), morph_id in morph_intervals.morph_ids.items():
+        inflection_interval = morph_intervals.highest_intervals[morph_id]
+        lemma_id: int | None = lemma_ids.get(lemma)
+
+        if lemma_id is None:
+            lemma_ids[lemma] = len(learning_intervals_of_lemmas)
+            learning_intervals_of_lemmas.append(inflection_interval)
+        elif inflection_interval > learning_intervals_of_lemmas[lemma_id]:
+            learning_intervals_of_lemmas[lemma_id] = inflection_interval
+
+    return lemma_ids, learning_intervals_of_lemmas
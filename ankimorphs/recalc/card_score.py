@@ -1,7 +1,6 @@
 import math
 
 from ..ankimorphs_config import AnkiMorphsConfig
-from .card_morphs_metrics import CardMorphsMetrics
 
 # Anki stores the 'due' value of cards as a 32-bit integer
 # on the backend, with '2147483647' being the max value before
@@ -23,88 +22,18 @@ MORPH_UNKNOWN_PENALTY: int = 1_000_000
 #######################################
 
 
-class CardScore:
-    __slots__ = (
-        "score",
-        "terms",
-    )
-
-    def __init__(
-        self, am_config: AnkiMorphsConfig, card_morph_metrics: CardMorphsMetrics
-    ) -> None:
-        self.score = _DEFAULT_SCORE
-        self.terms = "N/A"
-
-        if len(card_morph_metrics.all_morphs) == 0:
-            return
-
-        if am_config.recalc_move_known_new_cards_to_the_end:
-            if len(card_morph_metrics.unknown_morphs) == 0:
-                # Move stale cards to the end of the queue
-                return
-
-        all_morphs_target_difference: int = _get_all_morphs_target_difference(
-            am_config=am_config,
-            num_morphs=len(card_morph_metrics.all_morphs),
-        )
-
-        learning_morphs_target_difference: int = _get_learning_morphs_target_difference(
-            am_config=am_config,
-            num_morphs=card_morph_metrics.num_learning_morphs,
-        )
-
-        all_morphs_total_priority_score = (
-            am_config.algorithm_total_priority_all_morphs_weight
-            * card_morph_metrics.total_priority_all_morphs
-        )
-        unknown_morphs_total_priority_score = (
-            am_config.algorithm_total_priority_unknown_morphs_weight
-            * card_morph_metrics.total_priority_unknown_morphs
-        )
-        learning_morphs_total_priority_score = (
-            am_config.algorithm_total_priority_learning_morphs_weight
-            * card_morph_metrics.total_priority_learning_morphs
-        )
-
-        all_morphs_avg_priority_score = (
-            am_config.algorithm_average_priority_all_morphs_weight
-            * card_morph_metrics.avg_priority_all_morphs
-        )
-        learning_morphs_avg_priority_score = (
-            am_config.algorithm_average_priority_learning_morphs_weight
-            * card_morph_metrics.avg_priority_learning_morphs
-        )
-
-        leaning_morphs_target_difference_score = (
-            am_config.algorithm_learning_morphs_target_difference_weight
-            * learning_morphs_target_difference
-        )
-        all_morphs_target_difference_score = (
-            am_config.algorithm_all_morphs_target_difference_weight
-            * all_morphs_target_difference
-        )
-
-        tuning: int = (
-            all_morphs_total_priority_score
-            + unknown_morphs_total_priority_score
-            + learning_morphs_total_priority_score
-            + all_morphs_avg_priority_score
-            + learning_morphs_avg_priority_score
-            + leaning_morphs_target_difference_score
-            + all_morphs_target_difference_score
-        )
-
-        unknown_morphs_amount_score = (
-            len(card_morph_metrics.unknown_morphs) * MORPH_UNKNOWN_PENALTY
-        )
-
-        _score = unknown_morphs_amount_score + min(tuning, MORPH_UNKNOWN_PENALTY - 1)
-
-        # cap score to prevent 32-bit integer overflow
-        self.score = min(_score, _DEFAULT_SCORE)
-
-        # Note: we have a whitespace before the <br> tags to avoid bugs
-        self.terms = f"""
+def get_score_terms(  # pylint:disable=too-many-arguments
+    unknown_morphs_amount_score: int,
+    all_morphs_total_priority_score: int,
+    unknown_morphs_total_priority_score: int,
+    learning_morphs_total_priority_score: int,
+    all_morphs_avg_priority_score: int,
+    learning_morphs_avg_priority_score: int,
+    leaning_morphs_target_difference_score: int,
+    all_morphs_target_difference_score: int,
+) -> str:
+    # Note: we have a whitespace before the <br> tags to avoid bugs
+    return f"""
                 unknown_morphs_amount_score: {unknown_morphs_amount_score}, <br>
                 all_morphs_total_priority_score: {all_morphs_total_priority_score}, <br>
                 unknown_morphs_total_priority_score: {unknown_morphs_total_priority_score}, <br>
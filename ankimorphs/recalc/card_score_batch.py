@@ -0,0 +1,328 @@
+from __future__ import annotations
+
+from array import array
+from collections.abc import Iterable
+
+from ..ankimorphs_config import AnkiMorphsConfig
+from ..morpheme import Morpheme
+from .card_score import (
+    _DEFAULT_SCORE,
+    MORPH_UNKNOWN_PENALTY,
+    _get_all_morphs_target_difference,
+    _get_learning_morphs_target_difference,
+    get_score_terms,
+)
+
+################################################################
+#                      BATCH CARD SCORES
+################################################################
+# Scoring the cards one at a time means that the same morph
+# priorities and intervals get looked up over and over again,
+# and the config attributes are accessed millions of times on
+# big collections.
+#
+# Here we instead give every distinct morph an index and store
+# its priority and learning status in flat arrays. The morphs of
+# the cards are stored CSR-style (compressed sparse row), i.e.
+# the morph indices of card 'n' are:
+#   morph_indices[offsets[n]:offsets[n+1]]
+# All the scores are then computed in a single pass over these
+# arrays, with the weights and target differences hoisted out
+# of the loop.
+#
+# The arithmetic is done in exactly the same order as in the
+# card by card reference implementation in algorithm_test.py,
+# so the scores are identical.
+################################################################
+
+_STATUS_UNKNOWN: int = 0
+_STATUS_LEARNING: int = 1
+_STATUS_KNOWN: int = 2
+
+
+class CardScoresBatch:  # pylint:disable=too-many-instance-attributes
+    __slots__ = (
+        "_am_config",
+        "_card_morph_map_cache",
+        "_card_indices",
+        "_offsets",
+        "_morph_indices",
+        "_morph_statuses",
+        "scores",
+        "num_unknown_morphs",
+        "num_learning_morphs",
+        "_total_priorities_all_morphs",
+        "_total_priorities_unknown_morphs",
+        "_total_priorities_learning_morphs",
+    )
+
+    def __init__(
+        self,
+        am_config: AnkiMorphsConfig,
+        card_ids: Iterable[int],
+        card_morph_map_cache: dict[int, list[Morpheme]],
+        morph_priorities: dict[tuple[str, str], int],
+    ) -> None:
+        self._am_config = am_config
+        self._card_morph_map_cache = card_morph_map_cache
+        self._card_indices: dict[int, int] = {}
+        self._offsets: array[int] = array("q", [0])
+        self._morph_indices: array[int] = array("q")
+        self._morph_statuses: array[int] = array("b")
+
+        morph_priority_array: array[int] = array("q")
+        self._build_arrays(card_ids, morph_priorities, morph_priority_array)
+
+        self.scores: list[int] = []
+        self.num_unknown_morphs: list[int] = []
+        self.num_learning_morphs: list[int] = []
+        self._total_priorities_all_morphs: list[int] = []
+        self._total_priorities_unknown_morphs: list[int] = []
+        self._total_priorities_learning_morphs: list[int] = []
+
+        self._compute_scores(morph_priority_array)
+
+    def _build_arrays(
+        self,
+        card_ids: Iterable[int],
+        morph_priorities: dict[tuple[str, str], int],
+        morph_priority_array: array[int],
+    ) -> None:
+        am_config = self._am_config
+        default_morph_priority = len(morph_priorities) + 1
+        interval_for_known_morphs = am_config.interval_for_known_morphs
+        evaluate_morph_inflection = am_config.evaluate_morph_inflection
+
+        # this is a composite key consisting of either:
+        # - (morph.lemma, morph.lemma)
+        # - (morph.lemma, morph.inflection)
+        # which is the same key that is used for the priorities
+        morph_key_indices: dict[tuple[str, str], int] = {}
+
+        for card_id in card_ids:
+            if card_id in self._card_indices:
+                continue
+            self._card_indices[card_id] = len(self._offsets) - 1
+
+            # cards without morphs just get an empty row
+            for morph in self._card_morph_map_cache.get(card_id, []):
+                if evaluate_morph_inflection:
+                    key = (morph.lemma, morph.inflection)
+                    learning_interval = morph.highest_inflection_learning_interval
+                else:
+                    key = (morph.lemma, morph.lemma)
+                    learning_interval = morph.highest_lemma_learning_interval
+
+                morph_index = morph_key_indices.get(key)
+                if morph_index is None:
+                    assert learning_interval is not None
+                    morph_index = len(morph_priority_array)
+                    morph_key_indices[key] = morph_index
+                    morph_priority_array.append(
+                        morph_priorities.get(key, default_morph_priority)
+                    )
+                    if learning_interval == 0:
+                        self._morph_statuses.append(_STATUS_UNKNOWN)
+                    elif learning_interval < interval_for_known_morphs:
+                        self._morph_statuses.append(_STATUS_LEARNING)
+                    else:
+                        self._morph_statuses.append(_STATUS_KNOWN)
+
+                self._morph_indices.append(morph_index)
+
+            self._offsets.append(len(self._morph_indices))
+
+    def _compute_scores(  # pylint:disable=too-many-locals, too-many-statements
+        self, morph_priority_array: array[int]
+    ) -> None:
+        am_config = self._am_config
+        move_known_to_the_end = am_config.recalc_move_known_new_cards_to_the_end
+
+        all_total_weight = am_config.algorithm_total_priority_all_morphs_weight
+        unknown_total_weight = am_config.algorithm_total_priority_unknown_morphs_weight
+        learning_total_weight = (
+            am_config.algorithm_total_priority_learning_morphs_weight
+        )
+        all_avg_weight = am_config.algorithm_average_priority_all_morphs_weight
+        learning_avg_weight = (
+            am_config.algorithm_average_priority_learning_morphs_weight
+        )
+        learning_target_weight = (
+            am_config.algorithm_learning_morphs_target_difference_weight
+        )
+        all_target_weight = am_config.algorithm_all_morphs_target_difference_weight
+
+        # the target differences only depend on the number of morphs,
+        # so we only have to compute them once for each number.
+        all_target_differences: dict[int, int] = {}
+        learning_target_differences: dict[int, int] = {}
+
+        offsets = self._offsets
+        morph_indices = self._morph_indices
+        morph_statuses = self._morph_statuses
+
+        for row in range(len(offsets) - 1):
+            total_priority_all_morphs: int = 0
+            total_priority_unknown_morphs: int = 0
+            total_priority_learning_morphs: int = 0
+            num_unknown_morphs: int = 0
+            num_learning_morphs: int = 0
+
+            row_start = offsets[row]
+            row_end = offsets[row + 1]
+
+            for morph_index in morph_indices[row_start:row_end]:
+                morph_priority = morph_priority_array[morph_index]
+                total_priority_all_morphs += morph_priority
+                status = morph_statuses[morph_index]
+                if status == _STATUS_UNKNOWN:
+                    num_unknown_morphs += 1
+                    total_priority_unknown_morphs += morph_priority
+                elif status == _STATUS_LEARNING:
+                    num_learning_morphs += 1
+                    total_priority_learning_morphs += morph_priority
+
+            self.num_unknown_morphs.append(num_unknown_morphs)
+            self.num_learning_morphs.append(num_learning_morphs)
+            self._total_priorities_all_morphs.append(total_priority_all_morphs)
+            self._total_priorities_unknown_morphs.append(total_priority_unknown_morphs)
+            self._total_priorities_learning_morphs.append(
+                total_priority_learning_morphs
+            )
+
+            num_morphs = row_end - row_start
+
+            if num_morphs == 0:
+                self.scores.append(_DEFAULT_SCORE)
+                continue
+
+            if move_known_to_the_end and num_unknown_morphs == 0:
+                # Move stale cards to the end of the queue
+                self.scores.append(_DEFAULT_SCORE)
+                continue
+
+            all_morphs_target_difference = all_target_differences.get(num_morphs)
+            if all_morphs_target_difference is None:
+                all_morphs_target_difference = _get_all_morphs_target_difference(
+                    am_config=am_config, num_morphs=num_morphs
+                )
+                all_target_differences[num_morphs] = all_morphs_target_difference
+
+            learning_morphs_target_difference = learning_target_differences.get(
+                num_learning_morphs
+            )
+            if learning_morphs_target_difference is None:
+                learning_morphs_target_difference = (
+                    _get_learning_morphs_target_difference(
+                        am_config=am_config, num_morphs=num_learning_morphs
+                    )
+                )
+                learning_target_differences[num_learning_morphs] = (
+                    learning_morphs_target_difference
+                )
+
+            avg_priority_all_morphs = int(total_priority_all_morphs / num_morphs)
+            avg_priority_learning_morphs = 0
+            if num_learning_morphs > 0:
+                avg_priority_learning_morphs = int(
+                    total_priority_learning_morphs / num_learning_morphs
+                )
+
+            # the terms are added in the same order as in the reference implementation
+            tuning: int = (
+                all_total_weight * total_priority_all_morphs
+                + unknown_total_weight * total_priority_unknown_morphs
+                + learning_total_weight * total_priority_learning_morphs
+                + all_avg_weight * avg_priority_all_morphs
+                + learning_avg_weight * avg_priority_learning_morphs
+                + learning_target_weight * learning_morphs_target_difference
+                + all_target_weight * all_morphs_target_difference
+            )
+
+            _score = num_unknown_morphs * MORPH_UNKNOWN_PENALTY + min(
+                tuning, MORPH_UNKNOWN_PENALTY - 1
+            )
+
+            # cap score to prevent 32-bit integer overflow
+            self.scores.append(min(_score, _DEFAULT_SCORE))
+
+    def get_index(self, card_id: int) -> int:
+        return self._card_indices[card_id]
+
+    def get_all_morphs(self, card_id: int) -> list[Morpheme]:
+        return self._card_morph_map_cache.get(card_id, [])
+
+    def get_unknown_morphs(self, card_id: int) -> list[Morpheme]:
+        row = self._card_indices[card_id]
+        row_start = self._offsets[row]
+        morph_statuses = self._morph_statuses
+
+        # the morph indices of a row have the same order as the morphs in the cache
+        return [
+            morph
+            for morph, morph_index in zip(
+                self.get_all_morphs(card_id),
+                self._morph_indices[row_start : self._offsets[row + 1]],
+            )
+            if morph_statuses[morph_index] == _STATUS_UNKNOWN
+        ]
+
+    def get_terms(self, card_id: int) -> str:
+        """
+        The terms are only needed for the score terms extra field, so
+        instead of formatting them for every card we do it on demand.
+        """
+        am_config = self._am_config
+        row = self._card_indices[card_id]
+        num_morphs = self._offsets[row + 1] - self._offsets[row]
+        num_unknown_morphs = self.num_unknown_morphs[row]
+        num_learning_morphs = self.num_learning_morphs[row]
+
+        if num_morphs == 0:
+            return "N/A"
+
+        if am_config.recalc_move_known_new_cards_to_the_end:
+            if num_unknown_morphs == 0:
+                return "N/A"
+
+        avg_priority_learning_morphs = 0
+        if num_learning_morphs > 0:
+            avg_priority_learning_morphs = int(
+                self._total_priorities_learning_morphs[row] / num_learning_morphs
+            )
+
+        return get_score_terms(
+            unknown_morphs_amount_score=num_unknown_morphs * MORPH_UNKNOWN_PENALTY,
+            all_morphs_total_priority_score=(
+                am_config.algorithm_total_priority_all_morphs_weight
+                * self._total_priorities_all_morphs[row]
+            ),
+            unknown_morphs_total_priority_score=(
+                am_config.algorithm_total_priority_unknown_morphs_weight
+                * self._total_priorities_unknown_morphs[row]
+            ),
+            learning_morphs_total_priority_score=(
+                am_config.algorithm_total_priority_learning_morphs_weight
+                * self._total_priorities_learning_morphs[row]
+            ),
+            all_morphs_avg_priority_score=(
+                am_config.algorithm_average_priority_all_morphs_weight
+                * int(self._total_priorities_all_morphs[row] / num_morphs)
+            ),
+            learning_morphs_avg_priority_score=(
+                am_config.algorithm_average_priority_learning_morphs_weight
+                * avg_priority_learning_morphs
+            ),
+            leaning_morphs_target_difference_score=(
+                am_config.algorithm_learning_morphs_target_difference_weight
+                * _get_learning_morphs_target_difference(
+                    am_config=am_config, num_morphs=num_learning_morphs
+                )
+            ),
+            all_morphs_target_difference_score=(
+                am_config.algorithm_all_morphs_target_difference_weight
+                * _get_all_morphs_target_difference(
+                    am_config=am_config, num_morphs=num_morphs
+                )
+            ),
+        )
@@ -1,7 +1,6 @@
 from __future__ import annotations
 
 from anki.models import FieldDict, ModelManager, NotetypeDict
-from anki.notes import Note
 from aqt import mw
 
 from .. import ankimorphs_config
@@ -9,6 +8,7 @@ from .. import ankimorphs_globals as am_globals
 from ..ankimorphs_config import AnkiMorphsConfig, AnkiMorphsConfigFilter
 from ..highlighting.text_highlighter import TextHighlighter
 from ..morpheme import Morpheme
+from .anki_data_utils import RecalcNoteData
 
 
 def new_extra_fields_are_selected() -> bool:
@@ -80,7 +80,7 @@ def add_extra_fields_to_note_type(
 def update_all_morphs_field(
     am_config: AnkiMorphsConfig,
     field_name_dict: dict[str, tuple[int, FieldDict]],
-    note: Note,
+    note: RecalcNoteData,
     all_morphs: list[Morpheme],
 ) -> None:
     all_morphs_string: str = _get_string_of_morphs(am_config, all_morphs)
@@ -90,7 +90,7 @@ def update_all_morphs_field(
 
 def update_all_morphs_count_field(
     field_name_dict: dict[str, tuple[int, FieldDict]],
-    note: Note,
+    note: RecalcNoteData,
     all_morphs: list[Morpheme],
 ) -> None:
     index: int = field_name_dict[am_globals.EXTRA_FIELD_ALL_MORPHS_COUNT][0]
@@ -100,7 +100,7 @@ def update_all_morphs_count_field(
 def update_unknown_morphs_field(
     am_config: AnkiMorphsConfig,
     field_name_dict: dict[str, tuple[int, FieldDict]],
-    note: Note,
+    note: RecalcNoteData,
     unknown_morphs: list[Morpheme],
 ) -> None:
     unknowns_string: str = _get_string_of_morphs(am_config, unknown_morphs)
@@ -125,7 +125,7 @@ def _get_string_of_morphs(
 
 def update_unknown_morphs_count_field(
     field_name_dict: dict[str, tuple[int, FieldDict]],
-    note: Note,
+    note: RecalcNoteData,
     unknown_morphs: list[Morpheme],
 ) -> None:
     index: int = field_name_dict[am_globals.EXTRA_FIELD_UNKNOWN_MORPHS_COUNT][0]
@@ -134,7 +134,7 @@ def update_unknown_morphs_count_field(
 
 def update_score_field(
     field_name_dict: dict[str, tuple[int, FieldDict]],
-    note: Note,
+    note: RecalcNoteData,
     score: int,
 ) -> None:
     index: int = field_name_dict[am_globals.EXTRA_FIELD_SCORE][0]
@@ -144,7 +144,7 @@ def update_score_field(
 def update_study_morphs_field(
     am_config: AnkiMorphsConfig,
     field_name_dict: dict[str, tuple[int, FieldDict]],
-    note: Note,
+    note: RecalcNoteData,
     unknowns: list[Morpheme],
 ) -> None:
     unknowns_string: str = _get_string_of_morphs(am_config, unknowns)
@@ -154,7 +154,7 @@ def update_study_morphs_field(
 
 def update_score_terms_field(
     field_name_dict: dict[str, tuple[int, FieldDict]],
-    note: Note,
+    note: RecalcNoteData,
     score_terms: str,
 ) -> None:
     index: int = field_name_dict[am_globals.EXTRA_FIELD_SCORE_TERMS][0]
@@ -165,7 +165,7 @@ def update_highlighted_field(
     am_config: AnkiMorphsConfig,
     config_filter: AnkiMorphsConfigFilter,
     field_name_dict: dict[str, tuple[int, FieldDict]],
-    note: Note,
+    note: RecalcNoteData,
     card_morphs: list[Morpheme],
 ) -> None:
     expression_field_index: int = field_name_dict[config_filter.field][0]
@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+import heapq
+
+from anki.cards import CardId
+
+from ..ankimorphs_config import AnkiMorphsConfig
+from ..morpheme import Morpheme
+from .anki_data_utils import RecalcCardData
+from .card_score import _DEFAULT_SCORE
+
+################################################################
+#                      NEW CARD OFFSETS
+################################################################
+# This essentially replaces the need for the "skip" options,
+# which in turn makes reviewing cards on mobile a viable
+# alternative.
+#
+# Cards that only have a single unknown morph are grouped by
+# that morph while the cards are scored. For each morph, only
+# the card with the earliest due keeps its due, the rest of the
+# cards in the group are pushed back by the due offset. Only the
+# morphs with the earliest cards are offset, limited by the
+# 'recalc_number_of_morphs_to_offset' setting.
+#
+# Note: the cards have not been updated in the collection yet,
+# so the earliest due is based on the due from before this
+# recalc (original_due), while the offset is added to the new
+# due.
+################################################################
+
+
+class NewCardOffsets:
+    __slots__ = (
+        "_evaluate_morph_inflection",
+        "_earliest_due_card_for_unknown_morph",
+        "_cards_with_morph",
+    )
+
+    def __init__(self, am_config: AnkiMorphsConfig) -> None:
+        self._evaluate_morph_inflection: bool = am_config.evaluate_morph_inflection
+        self._earliest_due_card_for_unknown_morph: dict[str, RecalcCardData] = {}
+        self._cards_with_morph: dict[str, list[RecalcCardData]] = {}
+
+    def add_card(self, card: RecalcCardData, unknown_morphs: list[Morpheme]) -> None:
+        if len(unknown_morphs) == 0:
+            return
+
+        unknown_morph: str | None = None
+        for morph in unknown_morphs:
+            morph_key = (
+                morph.inflection if self._evaluate_morph_inflection else morph.lemma
+            )
+            if unknown_morph is None:
+                unknown_morph = morph_key
+            elif unknown_morph != morph_key:
+                # we don't want to do anything to cards that have multiple unknown morphs
+                return
+
+        assert unknown_morph is not None
+
+        earliest_due_card = self._earliest_due_card_for_unknown_morph.get(unknown_morph)
+        if earliest_due_card is None:
+            self._earliest_due_card_for_unknown_morph[unknown_morph] = card
+            self._cards_with_morph[unknown_morph] = [card]
+            return
+
+        if earliest_due_card.original_due > card.original_due:
+            self._earliest_due_card_for_unknown_morph[unknown_morph] = card
+        self._cards_with_morph[unknown_morph].append(card)
+
+    def apply_offsets(
+        self,
+        am_config: AnkiMorphsConfig,
+        modified_cards: dict[CardId, RecalcCardData],
+    ) -> int:
+        """
+        Adds the offset cards to modified_cards, and removes the cards
+        that end up with the due they already had. Returns the number
+        of offset cards.
+        """
+        # we only need the top x morphs, so there is no point in sorting all of them.
+        # Note: the morph at index x is also offset, which is how it has always been.
+        earliest_due_cards: list[tuple[str, RecalcCardData]] = heapq.nsmallest(
+            am_config.recalc_number_of_morphs_to_offset + 1,
+            self._earliest_due_card_for_unknown_morph.items(),
+            key=lambda item: item[1].original_due,
+        )
+
+        offset_cards: int = 0
+
+        for unknown_morph, earliest_due_card in earliest_due_cards:
+            for card in self._cards_with_morph[unknown_morph]:
+                if card is earliest_due_card:
+                    continue
+
+                # limit to _DEFAULT_SCORE to prevent integer overflow
+                card.due = min(card.due + am_config.recalc_due_offset, _DEFAULT_SCORE)
+                offset_cards += 1
+
+                # the card might have been offset to the due it already had
+                # in a previous recalc, then there is nothing to update.
+                if card.is_modified():
+                    modified_cards[card.card_id] = card
+                elif card.card_id in modified_cards:
+                    del modified_cards[card.card_id]
+
+        return offset_cards
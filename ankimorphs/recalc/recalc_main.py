@@ -2,11 +2,12 @@ from __future__ import annotations
 
 import time
 from pathlib import Path
+from typing import Any
 
-from anki.cards import Card, CardId
+from anki.cards import CardId
 from anki.consts import CARD_TYPE_NEW
-from anki.models import FieldDict, ModelManager, NotetypeDict
-from anki.notes import Note
+from anki.models import FieldDict, ModelManager, NotetypeDict, NotetypeId
+from anki.notes import NoteId
 from aqt import mw
 from aqt.operations import QueryOp
 from aqt.utils import tooltip
@@ -30,13 +31,19 @@ from ..exceptions import (
     PriorityFileMalformedException,
     PriorityFileNotFoundException,
 )
+from ..highlighting.highlight_just_in_time import invalidate_highlighting_cache
 from ..morph_priority_utils import get_morph_priority
 from ..morpheme import Morpheme
-from ..morphemizers import morphemizer_utils
-from . import caching, extra_field_utils
-from .anki_data_utils import AnkiMorphsCardData
-from .card_morphs_metrics import CardMorphsMetrics
-from .card_score import _DEFAULT_SCORE, CardScore
+from ..morphemizers import morphemizer_cache, morphemizer_utils
+from . import caching, extra_field_utils, recalc_profiler
+from .anki_data_utils import (
+    AnkiMorphsCardData,
+    RecalcCardData,
+    RecalcDataRows,
+    RecalcNoteData,
+)
+from .card_score_batch import CardScoresBatch
+from .new_card_offsets import NewCardOffsets
 
 
 def recalc() -> None:
@@ -84,7 +91,7 @@ def recalc() -> None:
         op=lambda _: _recalc_background_op(
             read_enabled_config_filters, modify_enabled_config_filters
         ),
-        success=lambda _: _on_success(_start_time),
+        success=lambda profile_report: _on_success(_start_time, profile_report),
     )
     operation.failure(_on_failure)
     operation.with_progress().run_in_background()
@@ -151,10 +158,14 @@ def _check_selected_settings_for_errors(
 def _recalc_background_op(
     read_enabled_config_filters: list[AnkiMorphsConfigFilter],
     modify_enabled_config_filters: list[AnkiMorphsConfigFilter],
-) -> None:
+) -> dict[str, Any] | None:
     am_config = AnkiMorphsConfig()
+    recalc_profiler.start(enabled=am_config.recalc_profiling)
+    morphemizer_cache.reset_counters()
+    caching.reset_counters()
     caching.cache_anki_data(am_config, read_enabled_config_filters)
     _update_cards_and_notes(am_config, modify_enabled_config_filters)
+    return recalc_profiler.finish()
 
 
 def _update_cards_and_notes(  # pylint:disable=too-many-locals, too-many-statements, too-many-branches
@@ -167,13 +178,19 @@ def _update_cards_and_notes(  # pylint:disable=too-many-locals, too-many-stateme
 
     am_db = AnkiMorphsDB()
     model_manager: ModelManager = mw.col.models
-    card_morph_map_cache: dict[int, list[Morpheme]] = am_db.get_card_morph_map_cache()
-    handled_cards: dict[CardId, None] = {}  # we only care about the key lookup
-    modified_cards: dict[CardId, Card] = {}
-    modified_notes: list[Note] = []
+    with recalc_profiler.stage("get_card_morph_map_cache") as stage_stats:
+        card_morph_map_cache: dict[int, list[Morpheme]] = (
+            am_db.get_card_morph_map_cache()
+        )
+        stage_stats.items += len(card_morph_map_cache)
+    handled_cards: dict[CardId, RecalcCardData] = {}
+    modified_cards: dict[CardId, RecalcCardData] = {}
+    modified_notes: dict[NoteId, RecalcNoteData] = {}
+    new_card_offsets: NewCardOffsets | None = None
+    if am_config.recalc_offset_new_cards:
+        new_card_offsets = NewCardOffsets(am_config)
 
     # clear relevant caches between recalcs
-    am_db.get_morph_priorities_from_collection.cache_clear()
     Morpheme.get_learning_status.cache_clear()
 
     for config_filter in modify_enabled_config_filters:
@@ -188,267 +205,266 @@ def _update_cards_and_notes(  # pylint:disable=too-many-locals, too-many-stateme
             only_lemma_priorities=am_config.evaluate_morph_lemma,
             morph_priority_selection=config_filter.morph_priority_selection,
         )
+        note_type_id: NotetypeId | None = model_manager.id_for_name(
+            config_filter.note_type
+        )
+        assert note_type_id is not None
         cards_data_dict: dict[CardId, AnkiMorphsCardData] = (
             am_db.get_am_cards_data_dict(
-                note_type_id=model_manager.id_for_name(config_filter.note_type),
+                note_type_id=note_type_id,
                 include_tags=config_filter.tags["include"],
                 exclude_tags=config_filter.tags["exclude"],
             )
         )
         card_amount = len(cards_data_dict)
 
-        for counter, card_id in enumerate(cards_data_dict):
-            progress_utils.background_update_progress_potentially_cancel(
-                label=f"Updating {config_filter.note_type} cards<br>card: {counter} of {card_amount}",
-                counter=counter,
-                max_value=card_amount,
+        progress_utils.background_update_progress(
+            label=f"Scoring {config_filter.note_type} cards"
+        )
+        with recalc_profiler.stage("Scoring") as stage_stats:
+            card_scores = CardScoresBatch(
+                am_config=am_config,
+                card_ids=(
+                    card_id
+                    for card_id in cards_data_dict
+                    if card_id not in handled_cards
+                ),
+                card_morph_map_cache=card_morph_map_cache,
+                morph_priorities=morph_priorities,
             )
-
+            stage_stats.items += len(card_scores.scores)
+
+        with recalc_profiler.stage("Anki DB read") as stage_stats:
+            # this has to happen after the extra fields have been added to the note type
+            recalc_data_rows = RecalcDataRows(note_type_id)
+            stage_stats.items += card_amount
+
+        # The cards of a note all have the same morphs, so the note-level outputs
+        # (tags and extra fields) are computed per note, see _get_updated_note,
+        # while the card-level outputs (due and queue) are still computed per card.
+        card_ids_by_note: dict[int, list[CardId]] = {}
+        for card_id, am_card_data in cards_data_dict.items():
             # check if the card has already been handled in a previous note filter
-            if card_id in handled_cards:
-                continue
-
-            card: Card = mw.col.get_card(card_id)
-            note: Note = card.note()
-
-            # make sure to get the values and not references
-            original_due: int = int(card.due)
-            original_queue: int = int(card.queue)  # queue: suspended, buried, etc.
-            original_fields: list[str] = note.fields.copy()
-            original_tags: list[str] = note.tags.copy()
-
-            cards_morph_metrics = CardMorphsMetrics(
-                am_config,
-                card_id,
-                card_morph_map_cache,
-                morph_priorities,
-            )
+            if card_id not in handled_cards:
+                card_ids_by_note.setdefault(am_card_data.note_id, []).append(card_id)
+
+        with recalc_profiler.stage("Tag and field updates") as stage_stats:
+            stage_stats.items += card_amount
+            counter: int = 0
+            for note_card_ids in card_ids_by_note.values():
+                for card_id in note_card_ids:
+                    progress_utils.background_update_progress_potentially_cancel(
+                        label=f"Updating {config_filter.note_type} cards<br>card: {counter} of {card_amount}",
+                        counter=counter,
+                        max_value=card_amount,
+                    )
+                    counter += 1
 
-            if card.type == CARD_TYPE_NEW:
-                score_values = CardScore(am_config, cards_morph_metrics)
-                card.due = score_values.score
+                    card: RecalcCardData = recalc_data_rows.get_card(card_id)
+                    card_index: int = card_scores.get_index(card_id)
+                    num_unknowns: int = card_scores.num_unknown_morphs[card_index]
 
-                tags_and_queue_utils.update_tags_and_queue_of_new_cards(
-                    am_config=am_config,
-                    note=note,
-                    card=card,
-                    unknowns=len(cards_morph_metrics.unknown_morphs),
-                    has_learning_morphs=cards_morph_metrics.has_learning_morphs,
-                )
+                    if card.type == CARD_TYPE_NEW:
+                        card.due = card_scores.scores[card_index]
+                        tags_and_queue_utils.update_queue_of_new_card(
+                            am_config=am_config,
+                            card=card,
+                            unknowns=num_unknowns,
+                        )
 
-                if config_filter.extra_study_morphs:
-                    extra_field_utils.update_study_morphs_field(
-                        am_config=am_config,
-                        field_name_dict=field_name_dict,
-                        note=note,
-                        unknowns=cards_morph_metrics.unknown_morphs,
-                    )
+                    # we only want anki to update the cards that have actually changed
+                    if card.is_modified():
+                        modified_cards[card_id] = card
 
-                if config_filter.extra_all_morphs:
-                    extra_field_utils.update_all_morphs_field(
-                        am_config=am_config,
-                        field_name_dict=field_name_dict,
-                        note=note,
-                        all_morphs=cards_morph_metrics.all_morphs,
-                    )
-                if config_filter.extra_all_morphs_count:
-                    extra_field_utils.update_all_morphs_count_field(
-                        field_name_dict=field_name_dict,
-                        note=note,
-                        all_morphs=cards_morph_metrics.all_morphs,
-                    )
-
-                if config_filter.extra_score:
-                    extra_field_utils.update_score_field(
-                        field_name_dict=field_name_dict,
-                        note=note,
-                        score=score_values.score,
-                    )
-                if config_filter.extra_score_terms:
-                    extra_field_utils.update_score_terms_field(
-                        field_name_dict=field_name_dict,
-                        note=note,
-                        score_terms=score_values.terms,
-                    )
-            else:
-                # not new cards
-                tags_and_queue_utils.update_tags_of_review_cards(
-                    am_config=am_config,
-                    note=note,
-                    has_learning_morphs=cards_morph_metrics.has_learning_morphs,
-                )
+                    if new_card_offsets is not None and num_unknowns > 0:
+                        new_card_offsets.add_card(
+                            card, card_scores.get_unknown_morphs(card_id)
+                        )
 
-            # always update these regardless of the state of the card
-            if config_filter.extra_unknown_morphs:
-                extra_field_utils.update_unknown_morphs_field(
-                    am_config=am_config,
-                    field_name_dict=field_name_dict,
-                    note=note,
-                    unknown_morphs=cards_morph_metrics.unknown_morphs,
-                )
-            if config_filter.extra_unknown_morphs_count:
-                extra_field_utils.update_unknown_morphs_count_field(
-                    field_name_dict=field_name_dict,
-                    note=note,
-                    unknown_morphs=cards_morph_metrics.unknown_morphs,
-                )
+                    handled_cards[card_id] = card  # this marks the card as handled
 
-            if config_filter.extra_highlighted:
-                extra_field_utils.update_highlighted_field(
+                note: RecalcNoteData | None = _get_updated_note(
                     am_config=am_config,
                     config_filter=config_filter,
                     field_name_dict=field_name_dict,
-                    note=note,
-                    card_morphs=cards_morph_metrics.all_morphs,
+                    recalc_data_rows=recalc_data_rows,
+                    note_cards=[handled_cards[card_id] for card_id in note_card_ids],
+                    card_scores=card_scores,
                 )
 
-            # we only want anki to update the cards and notes that have actually changed
-            if card.due != original_due or card.queue != original_queue:
-                modified_cards[card_id] = card
-
-            if original_fields != note.fields or original_tags != note.tags:
-                modified_notes.append(note)
-
-            handled_cards[card_id] = None  # this marks the card as handled
+                # we only want anki to update the notes that have actually changed
+                if note is not None:
+                    modified_notes[note.note_id] = note
 
     am_db.con.close()
 
-    if am_config.recalc_offset_new_cards:
-        modified_cards = _add_offsets_to_new_cards(
-            am_config=am_config,
-            card_morph_map_cache=card_morph_map_cache,
-            already_modified_cards=modified_cards,
-            handled_cards=handled_cards,
-        )
+    if new_card_offsets is not None:
+        progress_utils.background_update_progress(label="Applying offsets")
+        with recalc_profiler.stage("Offsetting") as stage_stats:
+            stage_stats.items += new_card_offsets.apply_offsets(
+                am_config=am_config, modified_cards=modified_cards
+            )
 
+    # Only the cards and notes that actually changed are loaded from the backend
     progress_utils.background_update_progress(label="Inserting into Anki collection")
-    mw.col.update_cards(list(modified_cards.values()))
-    mw.col.update_notes(modified_notes)
+    with recalc_profiler.stage("update_cards/update_notes") as stage_stats:
+        mw.col.update_cards([card.to_card() for card in modified_cards.values()])
+        mw.col.update_notes([note.to_note() for note in modified_notes.values()])
+        stage_stats.items += len(modified_cards) + len(modified_notes)
 
 
-def _add_offsets_to_new_cards(
+def _get_updated_note(  # pylint:disable=too-many-arguments
     am_config: AnkiMorphsConfig,
-    card_morph_map_cache: dict[int, list[Morpheme]],
-    already_modified_cards: dict[CardId, Card],
-    handled_cards: dict[CardId, None],
-) -> dict[CardId, Card]:
-    # This essentially replaces the need for the "skip" options, which in turn
-    # makes reviewing cards on mobile a viable alternative.
-    assert mw is not None
-
-    earliest_due_card_for_unknown_morph: dict[str, Card] = {}
-    cards_with_morph: dict[str, set[CardId]] = {}  # a set has faster lookup than a list
-
-    card_amount = len(handled_cards)
-    for counter, card_id in enumerate(handled_cards):
-        progress_utils.background_update_progress_potentially_cancel(
-            label=f"Potentially offsetting cards<br>card: {counter} of {card_amount}",
-            counter=counter,
-            max_value=card_amount,
-        )
-
-        if am_config.evaluate_morph_inflection:
-            card_unknown_morphs = CardMorphsMetrics.get_unknown_inflections(
-                card_morph_map_cache=card_morph_map_cache,
-                card_id=card_id,
-            )
-        else:
-            card_unknown_morphs = CardMorphsMetrics.get_unknown_lemmas(
-                card_morph_map_cache=card_morph_map_cache,
-                card_id=card_id,
+    config_filter: AnkiMorphsConfigFilter,
+    field_name_dict: dict[str, tuple[int, FieldDict]],
+    recalc_data_rows: RecalcDataRows,
+    note_cards: list[RecalcCardData],
+    card_scores: CardScoresBatch,
+) -> RecalcNoteData | None:
+    # Every card of a note updates the note as if it was the only card of the
+    # note, and the last card (in card id order) whose update changes the note
+    # decides the values the note gets. If none of the cards change the note,
+    # then None is returned.
+    #
+    # The cards of a note all have the same morphs, so the update only depends on
+    # whether the card is new or not, which means the note has to be updated at
+    # most twice: once for the new cards and once for the other cards.
+    updated_notes: dict[bool, RecalcNoteData] = {}
+
+    for card in reversed(note_cards):
+        card_is_new: bool = card.type == CARD_TYPE_NEW
+        note: RecalcNoteData | None = updated_notes.get(card_is_new)
+
+        if note is None:
+            note = recalc_data_rows.get_note(card.card_id)
+            _update_note(
+                am_config=am_config,
+                config_filter=config_filter,
+                field_name_dict=field_name_dict,
+                note=note,
+                card_id=card.card_id,
+                card_is_new=card_is_new,
+                card_scores=card_scores,
             )
+            updated_notes[card_is_new] = note
 
-        # we don't want to do anything to cards that have multiple unknown morphs
-        if len(card_unknown_morphs) == 1:
-            unknown_morph = card_unknown_morphs.pop()
-            card = mw.col.get_card(card_id)
-
-            if unknown_morph not in earliest_due_card_for_unknown_morph:
-                earliest_due_card_for_unknown_morph[unknown_morph] = card
-            elif earliest_due_card_for_unknown_morph[unknown_morph].due > card.due:
-                earliest_due_card_for_unknown_morph[unknown_morph] = card
-
-            if unknown_morph not in cards_with_morph:
-                cards_with_morph[unknown_morph] = {card_id}
-            else:
-                cards_with_morph[unknown_morph].add(card_id)
-
-    progress_utils.background_update_progress(label="Applying offsets")
+        if note.is_modified():
+            return note
 
-    # sort so we can limit to the top x unknown morphs
-    earliest_due_card_for_unknown_morph = dict(
-        sorted(
-            earliest_due_card_for_unknown_morph.items(), key=lambda item: item[1].due
-        )
-    )
-    modified_offset_cards: dict[CardId, Card] = _apply_offsets(
-        am_config=am_config,
-        already_modified_cards=already_modified_cards,
-        earliest_due_card_for_unknown_morph=earliest_due_card_for_unknown_morph,
-        cards_with_morph=cards_with_morph,
-    )
-
-    # combine the "lists" of cards we want to modify
-    already_modified_cards.update(modified_offset_cards)
-    return already_modified_cards
+    return None
 
 
-def _apply_offsets(
+def _update_note(  # pylint:disable=too-many-arguments
     am_config: AnkiMorphsConfig,
-    already_modified_cards: dict[CardId, Card],
-    earliest_due_card_for_unknown_morph: dict[str, Card],
-    cards_with_morph: dict[str, set[CardId]],
-) -> dict[CardId, Card]:
-    assert mw is not None
-
-    modified_offset_cards: dict[CardId, Card] = {}
+    config_filter: AnkiMorphsConfigFilter,
+    field_name_dict: dict[str, tuple[int, FieldDict]],
+    note: RecalcNoteData,
+    card_id: CardId,
+    card_is_new: bool,
+    card_scores: CardScoresBatch,
+) -> None:
+    card_index: int = card_scores.get_index(card_id)
+    num_unknowns: int = card_scores.num_unknown_morphs[card_index]
+    has_learning_morphs: bool = card_scores.num_learning_morphs[card_index] > 0
 
-    for counter, _unknown_morph in enumerate(earliest_due_card_for_unknown_morph):
-        if counter > am_config.recalc_number_of_morphs_to_offset:
-            break
+    if card_is_new:
+        tags_and_queue_utils.update_tags_of_new_cards(
+            am_config=am_config,
+            note=note,
+            unknowns=num_unknowns,
+            has_learning_morphs=has_learning_morphs,
+        )
 
-        earliest_due_card = earliest_due_card_for_unknown_morph[_unknown_morph]
-        all_new_cards_with_morph = cards_with_morph[_unknown_morph]
-        all_new_cards_with_morph.remove(earliest_due_card.id)
+        if config_filter.extra_study_morphs:
+            extra_field_utils.update_study_morphs_field(
+                am_config=am_config,
+                field_name_dict=field_name_dict,
+                note=note,
+                unknowns=card_scores.get_unknown_morphs(card_id),
+            )
 
-        for card_id in all_new_cards_with_morph:
-            _card = mw.col.get_card(card_id)
-            score_and_offset: int | None = None
+        if config_filter.extra_all_morphs:
+            extra_field_utils.update_all_morphs_field(
+                am_config=am_config,
+                field_name_dict=field_name_dict,
+                note=note,
+                all_morphs=card_scores.get_all_morphs(card_id),
+            )
+        if config_filter.extra_all_morphs_count:
+            extra_field_utils.update_all_morphs_count_field(
+                field_name_dict=field_name_dict,
+                note=note,
+                all_morphs=card_scores.get_all_morphs(card_id),
+            )
 
-            # we don't want to offset the card due if it has already been offset previously
-            if card_id in already_modified_cards:
-                # limit to _DEFAULT_SCORE to prevent integer overflow
-                score_and_offset = min(
-                    already_modified_cards[card_id].due + am_config.recalc_due_offset,
-                    _DEFAULT_SCORE,
-                )
-                if _card.due == score_and_offset:
-                    del already_modified_cards[card_id]
-                    continue
-
-            if score_and_offset is None:
-                score_and_offset = min(
-                    _card.due + am_config.recalc_due_offset,
-                    _DEFAULT_SCORE,
-                )
+        if config_filter.extra_score:
+            extra_field_utils.update_score_field(
+                field_name_dict=field_name_dict,
+                note=note,
+                score=card_scores.scores[card_index],
+            )
+        if config_filter.extra_score_terms:
+            extra_field_utils.update_score_terms_field(
+                field_name_dict=field_name_dict,
+                note=note,
+                score_terms=card_scores.get_terms(card_id),
+            )
+    else:
+        # not new cards
+        tags_and_queue_utils.update_tags_of_review_cards(
+            am_config=am_config,
+            note=note,
+            has_learning_morphs=has_learning_morphs,
+        )
 
-            _card.due = score_and_offset
-            modified_offset_cards[card_id] = _card
+    # always update these regardless of the state of the card
+    if config_filter.extra_unknown_morphs:
+        extra_field_utils.update_unknown_morphs_field(
+            am_config=am_config,
+            field_name_dict=field_name_dict,
+            note=note,
+            unknown_morphs=card_scores.get_unknown_morphs(card_id),
+        )
+    if config_filter.extra_unknown_morphs_count:
+        extra_field_utils.update_unknown_morphs_count_field(
+            field_name_dict=field_name_dict,
+            note=note,
+            unknown_morphs=card_scores.get_unknown_morphs(card_id),
+        )
 
-    return modified_offset_cards
+    if config_filter.extra_highlighted:
+        extra_field_utils.update_highlighted_field(
+            am_config=am_config,
+            config_filter=config_filter,
+            field_name_dict=field_name_dict,
+            note=note,
+            card_morphs=card_scores.get_all_morphs(card_id),
+        )
 
 
-def _on_success(_start_time: float) -> None:
+def _on_success(_start_time: float, profile_report: dict[str, Any] | None) -> None:
     # This function runs on the main thread.
     assert mw is not None
     assert mw.progress is not None
 
     mw.toolbar.draw()  # updates stats
     mw.progress.finish()
+    invalidate_highlighting_cache()
 
     tooltip("Finished Recalc", parent=mw)
     end_time: float = time.time()
     print(f"Recalc duration: {round(end_time - _start_time, 3)} seconds")
+    print(f"Morphemizer cache: {morphemizer_cache.get_counters_summary()}")
+    print(f"Morphemized expressions: {caching.get_counters_summary()}")
+
+    if profile_report is not None:
+        message_box_utils.show_info_box(
+            title="AnkiMorphs Recalc Profile",
+            body=recalc_profiler.get_summary_table(profile_report)
+            + f"\n\nMorphemized expressions: {caching.get_counters_summary()}"
+            + f"\n\nThe full report was saved to: {recalc_profiler.REPORT_FILE_NAME}",
+            parent=mw,
+        )
 
 
 def _on_failure(  # pylint:disable=too-many-branches
@@ -471,6 +487,7 @@ def _on_failure(  # pylint:disable=too-many-branches
 
     if not before_query_op:
         mw.progress.finish()
+        recalc_profiler.stop()
 
     if isinstance(error, CancelledOperationException):
         tooltip("Cancelled Recalc")
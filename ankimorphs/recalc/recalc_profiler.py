@@ -0,0 +1,194 @@
+from __future__ import annotations
+
+import json
+import time
+import tracemalloc
+from collections.abc import Iterator
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any
+
+from aqt import mw
+
+################################################################
+#                      RECALC PROFILER
+################################################################
+# Records the wall time, CPU time, peak memory and number of
+# processed items of the different recalc stages. Profiling is
+# enabled with the 'recalc_profiling' config option, when it is
+# disabled the stages are no-ops.
+#
+# Stages can be nested, e.g. the ankimorphs.db inserts happen
+# while morphemizing, and the outer stage then includes the
+# time and memory of the inner stage.
+#
+# Peak memory is measured with tracemalloc, which only sees the
+# memory allocated by python, i.e. not the memory used by the
+# morphemizer libraries or subprocesses.
+################################################################
+
+REPORT_FILE_NAME = "ankimorphs_recalc_profile.json"
+
+_enabled: bool = False
+_stages: dict[str, StageStats] = {}
+_active_stages: list[StageStats] = []
+_start_wall_time: float = 0.0
+_start_cpu_time: float = 0.0
+
+
+class StageStats:
+    __slots__ = (
+        "name",
+        "calls",
+        "items",
+        "wall_time",
+        "cpu_time",
+        "peak_memory",
+        "running_peak_memory",
+    )
+
+    def __init__(self, name: str) -> None:
+        self.name: str = name
+        self.calls: int = 0
+        self.items: int = 0
+        self.wall_time: float = 0.0
+        self.cpu_time: float = 0.0
+        self.peak_memory: int = 0  # bytes
+        self.running_peak_memory: int = 0
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "name": self.name,
+            "calls": self.calls,
+            "items": self.items,
+            "wall_time": round(self.wall_time, 4),
+            "cpu_time": round(self.cpu_time, 4),
+            "peak_memory": self.peak_memory,
+        }
+
+
+def start(enabled: bool) -> None:
+    global _enabled
+    global _start_wall_time
+    global _start_cpu_time
+
+    _enabled = enabled
+    _stages.clear()
+    _active_stages.clear()
+
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+    if _enabled:
+        tracemalloc.start()
+
+    _start_wall_time = time.perf_counter()
+    _start_cpu_time = time.process_time()
+
+
+@contextmanager
+def stage(name: str) -> Iterator[StageStats]:
+    """
+    Measures the code in the 'with' block. The yielded stats can be used to
+    add the number of processed items, e.g.: stats.items += len(cards)
+    """
+    if not _enabled:
+        yield StageStats(name)
+        return
+
+    stats: StageStats | None = _stages.get(name)
+    if stats is None:
+        stats = StageStats(name)
+        _stages[name] = stats
+
+    # the outer stage has to keep track of the peak before we reset it
+    current_peak_memory = tracemalloc.get_traced_memory()[1]
+    if len(_active_stages) > 0:
+        outer_stats = _active_stages[-1]
+        outer_stats.running_peak_memory = max(
+            outer_stats.running_peak_memory, current_peak_memory
+        )
+    tracemalloc.reset_peak()
+
+    stats.running_peak_memory = 0
+    _active_stages.append(stats)
+    start_wall_time = time.perf_counter()
+    start_cpu_time = time.process_time()
+
+    try:
+        yield stats
+    finally:
+        stats.calls += 1
+        stats.wall_time += time.perf_counter() - start_wall_time
+        stats.cpu_time += time.process_time() - start_cpu_time
+
+        peak_memory = max(tracemalloc.get_traced_memory()[1], stats.running_peak_memory)
+        stats.peak_memory = max(stats.peak_memory, peak_memory)
+        _active_stages.pop()
+
+        if len(_active_stages) > 0:
+            outer_stats = _active_stages[-1]
+            outer_stats.running_peak_memory = max(
+                outer_stats.running_peak_memory, peak_memory
+            )
+
+
+def get_report() -> dict[str, Any]:
+    return {
+        "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "total_wall_time": round(time.perf_counter() - _start_wall_time, 4),
+        "total_cpu_time": round(time.process_time() - _start_cpu_time, 4),
+        "stages": [stats.to_dict() for stats in _stages.values()],
+    }
+
+
+def stop() -> None:
+    global _enabled
+    _enabled = False
+    _active_stages.clear()
+
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+
+def finish() -> dict[str, Any] | None:
+    """
+    Writes the report to the profile folder and returns it,
+    returns None if profiling is disabled.
+    """
+    assert mw is not None
+
+    if not _enabled:
+        return None
+
+    report = get_report()
+    stop()
+
+    report_path = Path(mw.pm.profileFolder(), REPORT_FILE_NAME)
+    with report_path.open("w", encoding="utf-8") as file:
+        json.dump(report, file, ensure_ascii=False, indent=4)
+
+    return report
+
+
+def get_summary_table(report: dict[str, Any]) -> str:
+    # markdown table, the message boxes can render those
+    lines: list[str] = [
+        "| Stage | Calls | Items | Wall time (s) | CPU time (s) | Peak memory (MB) |",
+        "|:--|--:|--:|--:|--:|--:|",
+    ]
+    for stage_dict in report["stages"]:
+        lines.append(
+            f"| {stage_dict['name']} "
+            f"| {stage_dict['calls']} "
+            f"| {stage_dict['items']} "
+            f"| {stage_dict['wall_time']:.3f} "
+            f"| {stage_dict['cpu_time']:.3f} "
+            f"| {stage_dict['peak_memory'] / 1_000_000:.1f} |"
+        )
+    lines.append(
+        f"| **Total** | | "
+        f"| **{report['total_wall_time']:.3f}** "
+        f"| **{report['total_cpu_time']:.3f}** | |"
+    )
+    return "\n".join(lines)
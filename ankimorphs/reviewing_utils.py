@@ -18,6 +18,7 @@ from .ankimorphs_config import AnkiMorphsConfig
 from .ankimorphs_db import AnkiMorphsDB
 from .browser_utils import browse_same_morphs
 from .exceptions import CancelledOperationException, CardQueueEmptyException
+from .seen_morphs_index import seen_morphs_index
 
 SET_KNOWN_AND_SKIP_UNDO = "Set known and skip"
 ANKIMORPHS_UNDO = "AnkiMorphs custom undo"
@@ -60,7 +61,7 @@ def am_next_card() -> None:
         mw.moveToState("overview")
         return
 
-    am_config = AnkiMorphsConfig()
+    am_config = ankimorphs_config.get_config()
     skipped_cards = SkippedCards()
 
     operation = QueryOp(
@@ -291,7 +292,7 @@ def am_reviewer_shortcut_keys(
         list[tuple[str, Callable[[], None]] | tuple[Qt.Key, Callable[[], None]]],
     ],
 ) -> list[tuple[str, Callable[[], None]] | tuple[Qt.Key, Callable[[], None]]]:
-    am_config = AnkiMorphsConfig()
+    am_config = ankimorphs_config.get_config()
 
     key_browse_ready: QKeySequence = am_config.shortcut_browse_ready_same_unknown
     key_browse_ready_lemma: QKeySequence = (
@@ -398,26 +399,14 @@ class SkippedCards:
                 self.skipped_known_cards += 1
                 self.did_skip_card = True
         elif am_config.skip_unknown_morph_seen_today_cards:
-            morphs_already_seen_morphs_today: set[str] = (
-                am_db.get_all_morphs_seen_today(
-                    only_lemma=am_config.evaluate_morph_lemma
-                )
-            )
-            card_unknown_morphs_raw: set[tuple[str, str]] | None = (
-                am_db.get_card_morphs(
-                    card_id,
-                    search_unknowns=True,
-                    only_lemma=am_config.evaluate_morph_lemma,
-                )
-            )
+            # only hits the db the first time, or after the index has been reset
+            am_db.load_seen_morphs_index()
 
-            if card_unknown_morphs_raw is not None:
-                card_unknown_morphs: set[str] = {
-                    morph_raw[0] + morph_raw[1] for morph_raw in card_unknown_morphs_raw
-                }
-                if card_unknown_morphs.issubset(morphs_already_seen_morphs_today):
-                    self.skipped_already_seen_morphs_cards += 1
-                    self.did_skip_card = True
+            if seen_morphs_index.card_has_only_seen_unknown_morphs(
+                card_id, only_lemma=am_config.evaluate_morph_lemma
+            ):
+                self.skipped_already_seen_morphs_cards += 1
+                self.did_skip_card = True
 
         self.total_skipped_cards = (
             self.skipped_known_cards + self.skipped_already_seen_morphs_cards
@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+from collections.abc import Iterable
+
+################################################################
+#                     SEEN MORPHS INDEX
+################################################################
+# When skipping cards during review we need to know if all the
+# unknown morphs of a card have already been seen today. Doing
+# that with queries means reading the entire 'Seen_Morphs' table
+# and joining the morphs of the card for every candidate card.
+#
+# Instead, we keep the ids of the seen morphs and the ids of the
+# unknown morphs of every card in memory, which makes the check
+# a set operation. Morph ids are used when evaluating
+# inflections and lemma ids when evaluating lemmas.
+#
+# The 'Seen_Morphs' table is still the source of truth, the
+# index is loaded from it on the first skip check and is kept up
+# to date when cards are answered or set as known. The seen
+# morphs are reloaded when the table is rebuilt (e.g. on undo),
+# and everything is reloaded after recalc since the morph ids
+# change when the ankimorphs.db tables are recreated.
+################################################################
+
+
+class SeenMorphsIndex:
+    __slots__ = (
+        "seen_morph_ids",
+        "seen_lemma_ids",
+        "card_unknown_morph_ids",
+        "card_unknown_lemma_ids",
+    )
+
+    def __init__(self) -> None:
+        self.seen_morph_ids: set[int] | None = None
+        self.seen_lemma_ids: set[int] | None = None
+        self.card_unknown_morph_ids: dict[int, set[int]] | None = None
+        self.card_unknown_lemma_ids: dict[int, set[int]] | None = None
+
+    def reset(self) -> None:
+        self.reset_seen_morphs()
+        self.card_unknown_morph_ids = None
+        self.card_unknown_lemma_ids = None
+
+    def reset_seen_morphs(self) -> None:
+        self.seen_morph_ids = None
+        self.seen_lemma_ids = None
+
+    def has_seen_morphs(self) -> bool:
+        return self.seen_morph_ids is not None
+
+    def has_card_unknown_morphs(self) -> bool:
+        return self.card_unknown_morph_ids is not None
+
+    def set_seen_morphs(
+        self, seen_morph_ids: Iterable[int], seen_lemma_ids: Iterable[int]
+    ) -> None:
+        self.seen_morph_ids = set(seen_morph_ids)
+        self.seen_lemma_ids = set(seen_lemma_ids)
+
+    def add_seen_morphs(self, morph_and_lemma_ids: Iterable[tuple[int, int]]) -> None:
+        if self.seen_morph_ids is None or self.seen_lemma_ids is None:
+            return  # the seen morphs are read from the db when they are needed
+
+        for morph_id, lemma_id in morph_and_lemma_ids:
+            self.seen_morph_ids.add(morph_id)
+            self.seen_lemma_ids.add(lemma_id)
+
+    def set_card_unknown_morphs(
+        self, card_unknown_morphs: Iterable[tuple[int, int, int, int]]
+    ) -> None:
+        """
+        card_unknown_morphs: (card_id, morph_id, lemma_id, highest_lemma_learning_interval)
+        """
+        self.card_unknown_morph_ids = {}
+        self.card_unknown_lemma_ids = {}
+
+        for card_id, morph_id, lemma_id, lemma_interval in card_unknown_morphs:
+            self.card_unknown_morph_ids.setdefault(card_id, set()).add(morph_id)
+            if lemma_interval == 0:
+                self.card_unknown_lemma_ids.setdefault(card_id, set()).add(lemma_id)
+
+    def card_has_only_seen_unknown_morphs(self, card_id: int, only_lemma: bool) -> bool:
+        """
+        Returns False if the card does not have any unknown morphs
+        """
+        if only_lemma:
+            assert self.card_unknown_lemma_ids is not None
+            assert self.seen_lemma_ids is not None
+            unknown_ids = self.card_unknown_lemma_ids.get(card_id)
+            seen_ids = self.seen_lemma_ids
+        else:
+            assert self.card_unknown_morph_ids is not None
+            assert self.seen_morph_ids is not None
+            unknown_ids = self.card_unknown_morph_ids.get(card_id)
+            seen_ids = self.seen_morph_ids
+
+        if unknown_ids is None:
+            return False
+
+        return unknown_ids.issubset(seen_ids)
+
+
+seen_morphs_index = SeenMorphsIndex()
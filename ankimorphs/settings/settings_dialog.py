@@ -14,6 +14,7 @@ from .. import (
     text_preprocessing,
 )
 from ..ankimorphs_config import AnkiMorphsConfig
+from ..highlighting.highlight_just_in_time import invalidate_highlighting_cache
 from ..ui.settings_dialog_ui import Ui_SettingsDialog
 from .settings_algorithm_tab import AlgorithmTab
 from .settings_card_handling_tab import CardHandlingTab
@@ -162,6 +163,7 @@ class SettingsDialog(QDialog):  # pylint:disable=too-many-instance-attributes
 
         ankimorphs_config.update_configs(new_config)
         self._config.update()
+        invalidate_highlighting_cache()
 
         for _tab in self._all_tabs:
             _tab.update_previous_state()
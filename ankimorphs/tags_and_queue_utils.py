@@ -1,6 +1,5 @@
 from collections.abc import Sequence
 
-from anki.cards import Card
 from anki.consts import CardQueue
 from anki.notes import Note, NoteId
 from aqt import mw
@@ -10,12 +9,25 @@ from aqt.utils import tooltip
 
 from . import progress_utils
 from .ankimorphs_config import AnkiMorphsConfig
+from .recalc.anki_data_utils import RecalcCardData, RecalcNoteData
 
 
-def update_tags_and_queue_of_new_cards(
+def update_queue_of_new_card(
     am_config: AnkiMorphsConfig,
-    note: Note,
-    card: Card,
+    card: RecalcCardData,
+    unknowns: int,
+) -> None:
+    # Note: only new cards are handled in this function!
+    suspended = CardQueue(-1)
+
+    if unknowns == 0:
+        if am_config.recalc_suspend_known_new_cards and card.queue != suspended:
+            card.queue = suspended
+
+
+def update_tags_of_new_cards(
+    am_config: AnkiMorphsConfig,
+    note: RecalcNoteData,
     unknowns: int,
     has_learning_morphs: bool,
 ) -> None:
@@ -30,9 +42,8 @@ def update_tags_and_queue_of_new_cards(
     # tags that shouldn't be there for each case, even if it seems
     # redundant.
     #
-    # Note: only new cards are handled in this function!
+    # Note: only notes of new cards are handled in this function!
 
-    suspended = CardQueue(-1)
     mutually_exclusive_tags: list[str] = [
         am_config.tag_ready,
         am_config.tag_not_ready,
@@ -47,8 +58,6 @@ def update_tags_and_queue_of_new_cards(
             note.tags.remove(am_config.tag_fresh)
 
     if unknowns == 0:
-        if am_config.recalc_suspend_known_new_cards and card.queue != suspended:
-            card.queue = suspended
         if am_config.tag_known_manually in note.tags:
             remove_exclusive_tags(note, mutually_exclusive_tags)
         elif am_config.tag_known_automatically not in note.tags:
@@ -68,7 +77,9 @@ def update_tags_and_queue_of_new_cards(
             note.tags.append(am_config.tag_not_ready)
 
 
-def remove_exclusive_tags(note: Note, mutually_exclusive_tags: list[str]) -> None:
+def remove_exclusive_tags(
+    note: RecalcNoteData, mutually_exclusive_tags: list[str]
+) -> None:
     for tag in mutually_exclusive_tags:
         if tag in note.tags:
             note.tags.remove(tag)
@@ -76,7 +87,7 @@ def remove_exclusive_tags(note: Note, mutually_exclusive_tags: list[str]) -> Non
 
 def update_tags_of_review_cards(
     am_config: AnkiMorphsConfig,
-    note: Note,
+    note: RecalcNoteData,
     has_learning_morphs: bool,
 ) -> None:
     if am_config.tag_ready in note.tags:
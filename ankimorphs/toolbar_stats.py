@@ -1,6 +1,6 @@
 import sqlite3
 
-from .ankimorphs_config import AnkiMorphsConfig
+from . import ankimorphs_config
 from .ankimorphs_db import AnkiMorphsDB
 
 
@@ -21,7 +21,7 @@ class MorphToolbarStats:
 
         # this is only reached after the profile is loaded
         am_db.create_morph_table()
-        am_config = AnkiMorphsConfig()
+        am_config = ankimorphs_config.get_config()
         learning_interval: int = 1  # seen morphs
 
         if am_config.toolbar_stats_use_known:
@@ -0,0 +1,238 @@
+from __future__ import annotations
+
+import copy
+import json
+import os
+import platform
+import subprocess
+import time
+from collections.abc import Callable
+from pathlib import Path
+from test.benchmarks import synthetic_data
+from test.fake_configs import default_config_dict
+from test.fake_environment_module import (  # pylint:disable=unused-import
+    FakeEnvironment,
+    FakeEnvironmentParams,
+    fake_environment_fixture,
+)
+from test.test_globals import PATH_TESTS_DATA
+from test.tests.generators_test import _set_morphemizer
+from typing import Any
+
+import pytest
+
+from ankimorphs import ankimorphs_config
+from ankimorphs.ankimorphs_config import AnkiMorphsConfig
+from ankimorphs.ankimorphs_config import RawConfigFilterKeys as FilterKeys
+from ankimorphs.ankimorphs_config import RawConfigKeys as ConfigKeys
+from ankimorphs.generators import (
+    priority_file_generator,
+    readability_report_generator,
+    study_plan_generator,
+)
+from ankimorphs.generators.generators_output_dialog import (
+    GeneratorOutputDialog,
+    OutputOptions,
+)
+from ankimorphs.generators.generators_window import GeneratorWindow
+from ankimorphs.recalc import caching, recalc_main, recalc_profiler
+
+################################################################
+#                        BENCHMARKS
+################################################################
+# These are not run with the normal tests, they have to be run
+# explicitly, e.g.:
+#   pytest test/benchmarks -p no:randomly
+#
+# The sizes can be changed with environment variables:
+#   AM_BENCHMARK_CARDS: comma separated, e.g. "10000,100000,500000"
+#   AM_BENCHMARK_NOTE_TYPES: number of note filters
+#   AM_BENCHMARK_VOCABULARY: number of distinct words
+#   AM_BENCHMARK_OUTPUT_DIR: where the json results are saved
+#
+# The results include the git commit so they can be compared
+# between commits.
+################################################################
+
+_NUM_CARDS: list[int] = [
+    int(num_cards)
+    for num_cards in os.environ.get("AM_BENCHMARK_CARDS", "10000").split(",")
+]
+_NUM_NOTE_TYPES: int = int(os.environ.get("AM_BENCHMARK_NOTE_TYPES", "3"))
+_VOCABULARY_SIZE: int = int(os.environ.get("AM_BENCHMARK_VOCABULARY", "20000"))
+_OUTPUT_DIR = Path(
+    os.environ.get(
+        "AM_BENCHMARK_OUTPUT_DIR", str(Path(PATH_TESTS_DATA, "benchmark_results"))
+    )
+)
+
+_GENERATOR_INPUT_FILES = 20
+_GENERATOR_INPUT_LINES_PER_FILE = 2000
+_SIMPLE_SPACE_SPLITTER = "AnkiMorphs: Simple Space Splitter"
+
+
+def _get_benchmark_config() -> dict[str, Any]:
+    config = copy.deepcopy(default_config_dict)
+    filter_template = config[ConfigKeys.FILTERS][0]
+    config[ConfigKeys.FILTERS] = []
+
+    for note_type_name in synthetic_data.get_note_type_names(_NUM_NOTE_TYPES):
+        config_filter = copy.deepcopy(filter_template)
+        config_filter[FilterKeys.NOTE_TYPE] = note_type_name
+        config_filter[FilterKeys.FIELD] = synthetic_data.BENCHMARK_FIELD
+        config_filter[FilterKeys.MORPHEMIZER_DESCRIPTION] = _SIMPLE_SPACE_SPLITTER
+        config[ConfigKeys.FILTERS].append(config_filter)
+
+    return config
+
+
+def _get_benchmark_params() -> list[FakeEnvironmentParams]:
+    benchmark_config = _get_benchmark_config()
+    return [
+        FakeEnvironmentParams(
+            actual_col=synthetic_data.create_synthetic_collection(
+                num_cards=num_cards,
+                num_note_types=_NUM_NOTE_TYPES,
+                vocabulary_size=_VOCABULARY_SIZE,
+            ),
+            config=benchmark_config,
+        )
+        for num_cards in _NUM_CARDS
+    ]
+
+
+def _time(results: dict[str, float], name: str, function: Callable[[], Any]) -> None:
+    start_time = time.perf_counter()
+    function()
+    results[name] = round(time.perf_counter() - start_time, 4)
+
+
+def _get_git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            capture_output=True,
+            check=True,
+            text=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+@pytest.mark.parametrize(
+    "fake_environment_fixture",
+    _get_benchmark_params(),
+    indirect=True,
+)
+def test_benchmark(  # pylint:disable=too-many-locals
+    fake_environment_fixture: FakeEnvironment | None,
+    qtbot: Any,  # pylint:disable=unused-argument
+) -> None:
+    if fake_environment_fixture is None:
+        pytest.xfail()
+
+    am_config = AnkiMorphsConfig()
+    read_enabled_config_filters = ankimorphs_config.get_read_enabled_filters()
+    modify_enabled_config_filters = ankimorphs_config.get_modify_enabled_filters()
+    collection = fake_environment_fixture.mock_mw.col
+    timings: dict[str, float] = {}
+
+    # the profiler gives us the breakdown of the recalc stages for free
+    recalc_profiler.start(enabled=True)
+    _time(
+        timings,
+        "cache_anki_data",
+        lambda: caching.cache_anki_data(am_config, read_enabled_config_filters),
+    )
+    _time(
+        timings,
+        "cache_anki_data_unchanged",
+        lambda: caching.cache_anki_data(am_config, read_enabled_config_filters),
+    )
+    _time(
+        timings,
+        "update_cards_and_notes",
+        lambda: recalc_main._update_cards_and_notes(
+            am_config, modify_enabled_config_filters
+        ),
+    )
+    recalc_stages = recalc_profiler.get_report()["stages"]
+    recalc_profiler.stop()
+
+    input_dir = synthetic_data.create_generator_input_files(
+        num_files=_GENERATOR_INPUT_FILES,
+        lines_per_file=_GENERATOR_INPUT_LINES_PER_FILE,
+        vocabulary_size=_VOCABULARY_SIZE,
+    )
+    _OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+
+    gw = GeneratorWindow()
+    gw.ui.inputDirLineEdit.setText(str(input_dir))
+    gw._background_gather_files_and_populate_files_column()
+    _set_morphemizer(
+        generator_window=gw, morphemizer_description=_SIMPLE_SPACE_SPLITTER
+    )
+
+    _time(
+        timings,
+        "readability_report",
+        lambda: readability_report_generator.background_generate_report(
+            ui=gw.ui,
+            morphemizers=gw._morphemizers,
+            input_dir_root=gw._input_dir_root,
+            input_files=gw._input_files,
+        ),
+    )
+
+    priority_file_options: OutputOptions = GeneratorOutputDialog(
+        priority_file_mode=True
+    ).get_selected_options()
+    priority_file_options.output_path = Path(_OUTPUT_DIR, "priority_file.csv")
+    _time(
+        timings,
+        "priority_file",
+        lambda: priority_file_generator.background_generate_priority_file(
+            selected_output_options=priority_file_options,
+            ui=gw.ui,
+            morphemizers=gw._morphemizers,
+            input_dir_root=gw._input_dir_root,
+            input_files=gw._input_files,
+        ),
+    )
+
+    study_plan_options: OutputOptions = GeneratorOutputDialog(
+        study_plan_mode=True
+    ).get_selected_options()
+    study_plan_options.output_path = Path(_OUTPUT_DIR, "study_plan.csv")
+    _time(
+        timings,
+        "study_plan",
+        lambda: study_plan_generator.background_generate_study_plan(
+            selected_output_options=study_plan_options,
+            ui=gw.ui,
+            morphemizers=gw._morphemizers,
+            input_dir_root=gw._input_dir_root,
+            input_files=gw._input_files,
+        ),
+    )
+
+    num_cards: int = collection.card_count()
+    result = {
+        "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "git_commit": _get_git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "num_cards": num_cards,
+        "num_note_types": _NUM_NOTE_TYPES,
+        "vocabulary_size": _VOCABULARY_SIZE,
+        "generator_input_files": _GENERATOR_INPUT_FILES,
+        "generator_input_lines_per_file": _GENERATOR_INPUT_LINES_PER_FILE,
+        "timings": timings,
+        "recalc_stages": recalc_stages,
+    }
+
+    result_path = Path(_OUTPUT_DIR, f"benchmark_{num_cards}_cards.json")
+    with result_path.open("w", encoding="utf-8") as file:
+        json.dump(result, file, ensure_ascii=False, indent=4)
+
+    print(json.dumps(result, indent=4))
@@ -0,0 +1,183 @@
+from __future__ import annotations
+
+import itertools
+import random
+import string
+from pathlib import Path
+from test.test_globals import PATH_CARD_COLLECTIONS, PATH_TESTS_DATA
+
+from anki.collection import AddNoteRequest, Collection
+from anki.decks import DeckId
+from anki.models import NotetypeDict
+
+################################################################
+#                    SYNTHETIC DATA
+################################################################
+# Generates card collections and generator input files of any
+# size. The words are drawn from a zipfian distribution, which
+# is roughly how words are distributed in natural languages,
+# i.e. a few words are extremely common and most words are rare.
+#
+# Everything is generated from a fixed seed, so the data is the
+# same on every machine. The files are only generated once and
+# then reused by later benchmark runs.
+################################################################
+
+PATH_BENCHMARK_INPUTS = Path(PATH_TESTS_DATA, "benchmark_inputs")
+
+BENCHMARK_NOTE_TYPE_PREFIX = "benchmark_"
+BENCHMARK_FIELD = "Front"
+
+_SEED = 1337
+_ZIPF_EXPONENT = 1.07
+_MIN_SENTENCE_LENGTH = 3
+_MAX_SENTENCE_LENGTH = 18
+_REVIEWED_CARDS_RATIO = 0.3
+_MAX_INTERVAL = 60
+_ADD_NOTES_CHUNK_SIZE = 10_000
+
+
+class SentenceGenerator:
+    __slots__ = (
+        "_rng",
+        "_vocabulary",
+        "_cumulative_weights",
+    )
+
+    def __init__(self, vocabulary_size: int, seed: int = _SEED) -> None:
+        # the vocabulary is always the same, only the sentences depend on the seed
+        self._vocabulary: list[str] = _get_vocabulary(
+            random.Random(_SEED), vocabulary_size
+        )
+        self._rng = random.Random(seed)
+        self._cumulative_weights: list[float] = list(
+            itertools.accumulate(
+                1 / (rank**_ZIPF_EXPONENT) for rank in range(1, vocabulary_size + 1)
+            )
+        )
+
+    def get_sentence(self) -> str:
+        length = self._rng.randint(_MIN_SENTENCE_LENGTH, _MAX_SENTENCE_LENGTH)
+        words = self._rng.choices(
+            self._vocabulary, cum_weights=self._cumulative_weights, k=length
+        )
+        return " ".join(words)
+
+
+def _get_vocabulary(rng: random.Random, vocabulary_size: int) -> list[str]:
+    vocabulary: dict[str, None] = {}  # dict to keep the insertion order
+    while len(vocabulary) < vocabulary_size:
+        word_length = rng.randint(2, 10)
+        vocabulary["".join(rng.choices(string.ascii_lowercase, k=word_length))] = None
+    return list(vocabulary)
+
+
+def get_collection_name(
+    num_cards: int, num_note_types: int, vocabulary_size: int
+) -> str:
+    return f"benchmark_{num_cards}_cards_{num_note_types}_types_{vocabulary_size}_words"
+
+
+def get_note_type_names(num_note_types: int) -> list[str]:
+    return [f"{BENCHMARK_NOTE_TYPE_PREFIX}{index}" for index in range(num_note_types)]
+
+
+def create_synthetic_collection(  # pylint:disable=too-many-locals
+    num_cards: int, num_note_types: int, vocabulary_size: int
+) -> str:
+    """
+    Creates the collection in the card collections folder (if it does
+    not already exist), and returns its name so it can be used with
+    the FakeEnvironmentParams.
+    """
+    collection_name = get_collection_name(num_cards, num_note_types, vocabulary_size)
+    collection_path = Path(PATH_CARD_COLLECTIONS, f"{collection_name}.anki2")
+
+    if collection_path.is_file():
+        return collection_name
+
+    temp_path = Path(PATH_CARD_COLLECTIONS, f"{collection_name}_tmp.anki2")
+    temp_path.unlink(missing_ok=True)
+    collection = Collection(str(temp_path))
+
+    try:
+        sentence_generator = SentenceGenerator(vocabulary_size)
+        rng = random.Random(_SEED)
+        note_types: list[NotetypeDict] = _add_note_types(collection, num_note_types)
+        deck_id = DeckId(1)  # the default deck
+
+        requests: list[AddNoteRequest] = []
+        for card_index in range(num_cards):
+            note = collection.new_note(note_types[card_index % num_note_types])
+            note[BENCHMARK_FIELD] = sentence_generator.get_sentence()
+            requests.append(AddNoteRequest(note=note, deck_id=deck_id))
+
+            if len(requests) >= _ADD_NOTES_CHUNK_SIZE:
+                collection.add_notes(requests)
+                requests.clear()
+
+        collection.add_notes(requests)
+
+        # some of the cards have to be reviewed, otherwise all the morphs are unknown
+        assert collection.db is not None
+        card_ids: list[int] = collection.db.list("SELECT id FROM cards ORDER BY id")
+        reviewed_cards = rng.sample(
+            card_ids, int(len(card_ids) * _REVIEWED_CARDS_RATIO)
+        )
+        collection.db.executemany(
+            "UPDATE cards SET type = 2, queue = 2, ivl = ? WHERE id = ?",
+            [
+                (rng.randint(1, _MAX_INTERVAL), card_id)
+                for card_id in sorted(reviewed_cards)
+            ],
+        )
+    finally:
+        collection.close()
+
+    temp_path.rename(collection_path)
+    return collection_name
+
+
+def _add_note_types(collection: Collection, num_note_types: int) -> list[NotetypeDict]:
+    basic_note_type = collection.models.by_name("Basic")
+    assert basic_note_type is not None
+
+    note_types: list[NotetypeDict] = []
+    for note_type_name in get_note_type_names(num_note_types):
+        note_type = collection.models.copy(basic_note_type, add=False)
+        note_type["name"] = note_type_name
+        collection.models.add_dict(note_type)
+
+        added_note_type = collection.models.by_name(note_type_name)
+        assert added_note_type is not None
+        note_types.append(added_note_type)
+
+    return note_types
+
+
+def create_generator_input_files(
+    num_files: int, lines_per_file: int, vocabulary_size: int
+) -> Path:
+    input_dir = Path(
+        PATH_BENCHMARK_INPUTS,
+        f"{num_files}_files_{lines_per_file}_lines_{vocabulary_size}_words",
+    )
+
+    if input_dir.is_dir():
+        return input_dir
+
+    temp_dir = Path(PATH_BENCHMARK_INPUTS, f"{input_dir.name}_tmp")
+    temp_dir.mkdir(parents=True, exist_ok=True)
+
+    # a different seed from the collection, otherwise the files would
+    # contain the exact same sentences as the cards
+    sentence_generator = SentenceGenerator(vocabulary_size, seed=_SEED + 1)
+
+    for file_index in range(num_files):
+        lines = [sentence_generator.get_sentence() for _ in range(lines_per_file)]
+        Path(temp_dir, f"benchmark_input_{file_index}.txt").write_text(
+            "\n".join(lines), encoding="utf-8"
+        )
+
+    temp_dir.rename(input_dir)
+    return input_dir
@@ -268,3 +268,29 @@ config_ignoring_custom_characters[ConfigKeys.PREPROCESS_IGNORE_CUSTOM_CHARACTERS
 config_ignoring_custom_characters[ConfigKeys.PREPROCESS_CUSTOM_CHARACTERS_TO_IGNORE] = (
     ",.?"
 )
+
+################################################################
+#             config_custom_algorithm_weights
+################################################################
+# Uses non-default algorithm weights, and moves known cards to
+# the end, to exercise all the terms of the scoring algorithm.
+################################################################
+config_custom_algorithm_weights = copy.deepcopy(default_config_dict)
+config_custom_algorithm_weights.update(
+    {
+        ConfigKeys.RECALC_MOVE_KNOWN_NEW_CARDS_TO_THE_END: True,
+        ConfigKeys.ALGORITHM_AVERAGE_PRIORITY_LEARNING_MORPHS_WEIGHT: 3,
+        ConfigKeys.ALGORITHM_TOTAL_PRIORITY_LEARNING_MORPHS_WEIGHT: 2,
+        ConfigKeys.ALGORITHM_TOTAL_PRIORITY_UNKNOWN_MORPHS_WEIGHT: 1,
+        ConfigKeys.ALGORITHM_LOWER_TARGET_LEARNING_MORPHS_COEFFICIENT_B: 1.5,
+    }
+)
+
+
+################################################################
+#             config_recalc_profiling
+################################################################
+# Works with any arbitrary collection and db
+################################################################
+config_recalc_profiling = copy.deepcopy(config_lemma_evaluation_lemma_extra_fields)
+config_recalc_profiling[ConfigKeys.RECALC_PROFILING] = True
@@ -31,6 +31,7 @@ from ankimorphs import (
     ankimorphs_config,
     ankimorphs_db,
     ankimorphs_globals,
+    browser_utils,
     known_morphs_exporter,
     morph_priority_utils,
     name_file_utils,
@@ -45,11 +46,10 @@ from ankimorphs.generators import (
     priority_file_generator,
     readability_report_generator,
     study_plan_generator,
-    text_extractors,
 )
-from ankimorphs.morphemizers import spacy_wrapper
+from ankimorphs.morphemizers import morphemizer_cache, spacy_wrapper
 from ankimorphs.progression import progression_utils, progression_window
-from ankimorphs.recalc import anki_data_utils, caching, recalc_main
+from ankimorphs.recalc import anki_data_utils, caching, recalc_main, recalc_profiler
 
 
 class FakeEnvironmentParams:
@@ -154,6 +154,9 @@ def fake_environment_fixture(  # pylint:disable=too-many-locals
     sys.path.append(str(PATH_FAKE_MORPHEMIZERS))
     mock_db = FakeDB()
 
+    # the config snapshot could be from a previous test with a different config
+    ankimorphs_config.invalidate_config_snapshot()
+
     try:
         yield FakeEnvironment(
             mock_mw=mock_mw,
@@ -213,7 +216,9 @@ def create_mw_patches(mock_mw: AnkiQt) -> list[Any]:
         mock.patch.object(known_morphs_exporter, "mw", mock_mw),
         mock.patch.object(ankimorphs_extra_settings, "mw", mock_mw),
         mock.patch.object(generators_output_dialog, "mw", mock_mw),
-        mock.patch.object(text_extractors, "mw", mock_mw),
+        mock.patch.object(morphemizer_cache, "mw", mock_mw),
+        mock.patch.object(recalc_profiler, "mw", mock_mw),
+        mock.patch.object(browser_utils, "mw", mock_mw),
     ]
 
 
@@ -253,8 +258,14 @@ def post_test_teardown(
     for patch in patches:
         patch.stop()
 
+    ankimorphs_config.invalidate_config_snapshot()
+
     sys.path.remove(str(PATH_FAKE_MORPHEMIZERS))
 
     Path.unlink(PATH_DB_COPY, missing_ok=True)
+    Path.unlink(
+        Path(mock_mw.pm.profileFolder(), morphemizer_cache.CACHE_FILE_NAME),
+        missing_ok=True,
+    )
     shutil.rmtree(PATH_TEMP_CARD_COLLECTIONS, ignore_errors=True)
     shutil.rmtree(PATH_TESTS_DATA_TESTS_OUTPUTS, ignore_errors=True)
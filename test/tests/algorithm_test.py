@@ -1,8 +1,220 @@
 from __future__ import annotations
 
+import random
+from test.fake_configs import (
+    config_custom_algorithm_weights,
+    config_lemma_evaluation,
+    default_config_dict,
+)
+from test.fake_environment_module import (  # pylint:disable=unused-import
+    FakeEnvironment,
+    FakeEnvironmentParams,
+    fake_environment_fixture,
+)
+
 import pytest
 
+from ankimorphs.ankimorphs_config import AnkiMorphsConfig
+from ankimorphs.morpheme import Morpheme
 from ankimorphs.recalc import card_score
+from ankimorphs.recalc.card_score_batch import CardScoresBatch
+
+################################################################
+#                  REFERENCE IMPLEMENTATION
+################################################################
+# The cards used to be scored one at a time with the classes
+# below. CardScoresBatch has to produce exactly the same scores
+# for every card, see test_card_scores_batch.
+################################################################
+
+
+class CardMorphsMetrics:  # pylint:disable=too-many-instance-attributes
+    __slots__ = (
+        "all_morphs",
+        "unknown_morphs",
+        "num_learning_morphs",
+        "has_learning_morphs",
+        "total_priority_all_morphs",
+        "total_priority_unknown_morphs",
+        "total_priority_learning_morphs",
+        "avg_priority_all_morphs",
+        "avg_priority_learning_morphs",
+    )
+
+    def __init__(
+        self,
+        am_config: AnkiMorphsConfig,
+        card_id: int,
+        card_morph_map_cache: dict[int, list[Morpheme]],
+        morph_priorities: dict[tuple[str, str], int],
+    ) -> None:
+        self.all_morphs: list[Morpheme] = []
+        self.unknown_morphs: list[Morpheme] = []
+        self.num_learning_morphs: int = 0
+        self.has_learning_morphs: bool = False
+        self.total_priority_all_morphs: int = 0
+        self.total_priority_unknown_morphs: int = 0
+        self.total_priority_learning_morphs: int = 0
+        self.avg_priority_all_morphs: int = 0
+        self.avg_priority_learning_morphs: int = 0
+
+        try:
+            self.all_morphs = card_morph_map_cache[card_id]
+        except KeyError:
+            # card does not have morphs or is buggy in some way
+            return
+
+        self._process(am_config, morph_priorities)
+
+    def _process(
+        self,
+        am_config: AnkiMorphsConfig,
+        morph_priorities: dict[tuple[str, str], int],
+    ) -> None:
+        default_morph_priority = len(morph_priorities) + 1
+        learning_interval_attribute: str
+        sub_key_attribute: str
+
+        if am_config.evaluate_morph_inflection:
+            learning_interval_attribute = "highest_inflection_learning_interval"
+            sub_key_attribute = "inflection"
+        else:
+            learning_interval_attribute = "highest_lemma_learning_interval"
+            sub_key_attribute = "lemma"
+
+        for morph in self.all_morphs:
+            learning_interval = getattr(morph, learning_interval_attribute)
+            assert learning_interval is not None
+
+            sub_key = getattr(morph, sub_key_attribute)
+            assert sub_key is not None
+
+            # this is a composite key consisting of either:
+            # - (morph.lemma, morph.lemma)
+            # - (morph.lemma, morph.inflection)
+            key = (morph.lemma, sub_key)
+
+            if key in morph_priorities:
+                morph_priority = morph_priorities[key]
+            else:
+                morph_priority = default_morph_priority
+
+            self.total_priority_all_morphs += morph_priority
+
+            if learning_interval == 0:
+                self.unknown_morphs.append(morph)
+                self.total_priority_unknown_morphs += morph_priority
+            elif learning_interval < am_config.interval_for_known_morphs:
+                self.num_learning_morphs += 1
+                self.total_priority_learning_morphs += morph_priority
+
+        self.avg_priority_all_morphs = int(
+            self.total_priority_all_morphs / len(self.all_morphs)
+        )
+
+        if self.num_learning_morphs > 0:
+            self.has_learning_morphs = True
+            self.avg_priority_learning_morphs = int(
+                self.total_priority_learning_morphs / self.num_learning_morphs
+            )
+
+
+class CardScore:
+    __slots__ = (
+        "score",
+        "terms",
+    )
+
+    def __init__(
+        self, am_config: AnkiMorphsConfig, card_morph_metrics: CardMorphsMetrics
+    ) -> None:
+        self.score = card_score._DEFAULT_SCORE
+        self.terms = "N/A"
+
+        if len(card_morph_metrics.all_morphs) == 0:
+            return
+
+        if am_config.recalc_move_known_new_cards_to_the_end:
+            if len(card_morph_metrics.unknown_morphs) == 0:
+                # Move stale cards to the end of the queue
+                return
+
+        all_morphs_target_difference: int = (
+            card_score._get_all_morphs_target_difference(
+                am_config=am_config,
+                num_morphs=len(card_morph_metrics.all_morphs),
+            )
+        )
+
+        learning_morphs_target_difference: int = (
+            card_score._get_learning_morphs_target_difference(
+                am_config=am_config,
+                num_morphs=card_morph_metrics.num_learning_morphs,
+            )
+        )
+
+        all_morphs_total_priority_score = (
+            am_config.algorithm_total_priority_all_morphs_weight
+            * card_morph_metrics.total_priority_all_morphs
+        )
+        unknown_morphs_total_priority_score = (
+            am_config.algorithm_total_priority_unknown_morphs_weight
+            * card_morph_metrics.total_priority_unknown_morphs
+        )
+        learning_morphs_total_priority_score = (
+            am_config.algorithm_total_priority_learning_morphs_weight
+            * card_morph_metrics.total_priority_learning_morphs
+        )
+
+        all_morphs_avg_priority_score = (
+            am_config.algorithm_average_priority_all_morphs_weight
+            * card_morph_metrics.avg_priority_all_morphs
+        )
+        learning_morphs_avg_priority_score = (
+            am_config.algorithm_average_priority_learning_morphs_weight
+            * card_morph_metrics.avg_priority_learning_morphs
+        )
+
+        leaning_morphs_target_difference_score = (
+            am_config.algorithm_learning_morphs_target_difference_weight
+            * learning_morphs_target_difference
+        )
+        all_morphs_target_difference_score = (
+            am_config.algorithm_all_morphs_target_difference_weight
+            * all_morphs_target_difference
+        )
+
+        tuning: int = (
+            all_morphs_total_priority_score
+            + unknown_morphs_total_priority_score
+            + learning_morphs_total_priority_score
+            + all_morphs_avg_priority_score
+            + learning_morphs_avg_priority_score
+            + leaning_morphs_target_difference_score
+            + all_morphs_target_difference_score
+        )
+
+        unknown_morphs_amount_score = (
+            len(card_morph_metrics.unknown_morphs) * card_score.MORPH_UNKNOWN_PENALTY
+        )
+
+        _score = unknown_morphs_amount_score + min(
+            tuning, card_score.MORPH_UNKNOWN_PENALTY - 1
+        )
+
+        # cap score to prevent 32-bit integer overflow
+        self.score = min(_score, card_score._DEFAULT_SCORE)
+
+        self.terms = card_score.get_score_terms(
+            unknown_morphs_amount_score=unknown_morphs_amount_score,
+            all_morphs_total_priority_score=all_morphs_total_priority_score,
+            unknown_morphs_total_priority_score=unknown_morphs_total_priority_score,
+            learning_morphs_total_priority_score=learning_morphs_total_priority_score,
+            all_morphs_avg_priority_score=all_morphs_avg_priority_score,
+            learning_morphs_avg_priority_score=learning_morphs_avg_priority_score,
+            leaning_morphs_target_difference_score=leaning_morphs_target_difference_score,
+            all_morphs_target_difference_score=all_morphs_target_difference_score,
+        )
 
 
 @pytest.mark.parametrize(
@@ -30,3 +242,78 @@ def test_target_difference_function(
         produced_values.append(_score)
 
     assert expected_values == produced_values
+
+
+@pytest.mark.parametrize(
+    "fake_environment_fixture",
+    [
+        FakeEnvironmentParams(config=default_config_dict),
+        FakeEnvironmentParams(config=config_lemma_evaluation),
+        FakeEnvironmentParams(config=config_custom_algorithm_weights),
+    ],
+    indirect=True,
+)
+def test_card_scores_batch(  # pylint:disable=unused-argument, too-many-locals
+    fake_environment_fixture: FakeEnvironment | None,
+) -> None:
+    # CardScore is the reference implementation, see above, the batch
+    # scores have to be identical to it for every card.
+    am_config = AnkiMorphsConfig()
+    rng = random.Random(0)
+
+    lemmas = [f"lemma{i}" for i in range(60)]
+    lemma_intervals = {lemma: rng.choice([0, 0, 3, 10, 30, 100]) for lemma in lemmas}
+    morphs: list[Morpheme] = []
+    for lemma in lemmas:
+        for inflection_number in range(rng.randint(1, 3)):
+            morphs.append(
+                Morpheme(
+                    lemma=lemma,
+                    inflection=f"{lemma}_{inflection_number}",
+                    highest_lemma_learning_interval=lemma_intervals[lemma],
+                    highest_inflection_learning_interval=rng.choice(
+                        [0, rng.randint(0, lemma_intervals[lemma])]
+                    ),
+                )
+            )
+
+    card_morph_map_cache: dict[int, list[Morpheme]] = {}
+    for card_id in range(1, 500):
+        if card_id % 50 == 0:
+            continue  # cards without morphs
+        card_morph_map_cache[card_id] = sorted(
+            rng.sample(morphs, rng.randint(1, 25)),
+            key=lambda _morph: (_morph.lemma, _morph.inflection),
+        )
+
+    morph_priorities: dict[tuple[str, str], int] = {}
+    for priority, morph in enumerate(rng.sample(morphs, 100)):
+        sub_key = morph.lemma if am_config.evaluate_morph_lemma else morph.inflection
+        morph_priorities.setdefault((morph.lemma, sub_key), priority)
+
+    card_ids = list(range(1, 500))
+    card_scores = CardScoresBatch(
+        am_config=am_config,
+        card_ids=card_ids,
+        card_morph_map_cache=card_morph_map_cache,
+        morph_priorities=morph_priorities,
+    )
+
+    for card_id in card_ids:
+        card_morph_metrics = CardMorphsMetrics(
+            am_config, card_id, card_morph_map_cache, morph_priorities
+        )
+        expected_score = CardScore(am_config, card_morph_metrics)
+        card_index = card_scores.get_index(card_id)
+
+        assert card_scores.scores[card_index] == expected_score.score
+        assert card_scores.get_terms(card_id) == expected_score.terms
+        assert card_scores.get_unknown_morphs(card_id) == (
+            card_morph_metrics.unknown_morphs
+        )
+        assert card_scores.num_unknown_morphs[card_index] == len(
+            card_morph_metrics.unknown_morphs
+        )
+        assert (
+            card_scores.num_learning_morphs[card_index] > 0
+        ) == card_morph_metrics.has_learning_morphs
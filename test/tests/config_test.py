@@ -1,8 +1,24 @@
+from __future__ import annotations
+
+import copy
 import json
-from test.fake_configs import DEFAULT_CONFIG_PATH
+from test.fake_configs import DEFAULT_CONFIG_PATH, default_config_dict
+from test.fake_environment_module import (  # pylint:disable=unused-import
+    FakeEnvironment,
+    FakeEnvironmentParams,
+    fake_environment_fixture,
+)
 from typing import Any
+from unittest import mock
+
+import pytest
 
-from ankimorphs.ankimorphs_config import RawConfigFilterKeys, RawConfigKeys
+from ankimorphs import ankimorphs_config
+from ankimorphs.ankimorphs_config import (
+    AnkiMorphsConfig,
+    RawConfigFilterKeys,
+    RawConfigKeys,
+)
 
 
 def test_am_config_contains_keys() -> None:
@@ -64,3 +80,114 @@ def test_am_config_correct_values() -> None:
             if value.upper() != attr:
                 print(f"attr: {attr} is not upper of value: {value}")
                 assert False
+
+
+@pytest.mark.parametrize(
+    "fake_environment_fixture",
+    # a copy, since the config is modified
+    [FakeEnvironmentParams(config=copy.deepcopy(default_config_dict))],
+    indirect=True,
+)
+def test_am_config_snapshot(
+    fake_environment_fixture: FakeEnvironment | None,
+) -> None:
+    # The snapshot should be reused until the configs are updated,
+    # and the notes should be matched to the filter of their note type.
+    if fake_environment_fixture is None:
+        pytest.xfail()
+
+    am_config = ankimorphs_config.get_config()
+    assert ankimorphs_config.get_config() is am_config
+
+    collection = fake_environment_fixture.mock_mw.col
+    basic_note = collection.get_note(collection.find_notes("note:Basic")[0])
+    config_filter = ankimorphs_config.get_matching_filter(basic_note)
+    assert config_filter is not None
+    assert config_filter.note_type == "Basic"
+    assert ankimorphs_config.get_matching_filter(basic_note) is config_filter
+
+    cloze_note_type = collection.models.by_name("Cloze")
+    assert cloze_note_type is not None
+    cloze_note = collection.new_note(cloze_note_type)
+    assert ankimorphs_config.get_matching_filter(cloze_note) is None
+
+    # prevents the configs from being written to the profile settings file
+    with mock.patch.object(ankimorphs_config, "save_config_to_am_file"):
+        ankimorphs_config.update_configs(
+            {RawConfigKeys.RECALC_DUE_OFFSET: am_config.recalc_due_offset + 1}
+        )
+
+    new_am_config = ankimorphs_config.get_config()
+    assert new_am_config is not am_config
+    assert new_am_config.recalc_due_offset == am_config.recalc_due_offset + 1
+
+
+################################################################
+#             CASE: NOTE TYPE ADDED AFTER RESOLVING
+################################################################
+# The second note filter uses a note type that does not exist
+# until after the note type ids of the filters have been resolved.
+################################################################
+config_added_note_type = copy.deepcopy(default_config_dict)
+config_added_note_type_filter = copy.deepcopy(
+    config_added_note_type[RawConfigKeys.FILTERS][0]
+)
+config_added_note_type_filter[RawConfigFilterKeys.NOTE_TYPE] = "Added Later"
+config_added_note_type[RawConfigKeys.FILTERS].append(config_added_note_type_filter)
+
+
+@pytest.mark.parametrize(
+    "fake_environment_fixture",
+    [FakeEnvironmentParams(config=config_added_note_type)],
+    indirect=True,
+)
+def test_am_config_snapshot_added_note_type(
+    fake_environment_fixture: FakeEnvironment | None,
+) -> None:
+    if fake_environment_fixture is None:
+        pytest.xfail()
+
+    collection = fake_environment_fixture.mock_mw.col
+    basic_note = collection.get_note(collection.find_notes("note:Basic")[0])
+    assert ankimorphs_config.get_matching_filter(basic_note) is not None
+
+    basic_note_type = collection.models.by_name("Basic")
+    assert basic_note_type is not None
+    added_note_type = collection.models.copy(basic_note_type, add=False)
+    added_note_type["name"] = "Added Later"
+    collection.models.add_dict(added_note_type)
+
+    added_note_type = collection.models.by_name("Added Later")
+    assert added_note_type is not None
+    config_filter = ankimorphs_config.get_matching_filter(
+        collection.new_note(added_note_type)
+    )
+    assert config_filter is not None
+    assert config_filter.note_type == "Added Later"
+
+
+################################################################
+#               CASE: INVALID SPACY PROCESS SETTINGS
+################################################################
+# A batch size of zero or a negative number of processes would
+# crash the morphemizing, so they are raised to one instead.
+################################################################
+config_invalid_spacy_settings = copy.deepcopy(default_config_dict)
+config_invalid_spacy_settings[RawConfigKeys.SPACY_WORKER_PROCESSES] = -2
+config_invalid_spacy_settings[RawConfigKeys.SPACY_BATCH_SIZE] = 0
+
+
+@pytest.mark.parametrize(
+    "fake_environment_fixture",
+    [FakeEnvironmentParams(config=config_invalid_spacy_settings)],
+    indirect=True,
+)
+def test_am_config_invalid_spacy_settings(
+    fake_environment_fixture: FakeEnvironment | None,
+) -> None:
+    if fake_environment_fixture is None:
+        pytest.xfail()
+
+    am_config = AnkiMorphsConfig()
+    assert am_config.spacy_worker_processes == 1
+    assert am_config.spacy_batch_size == 1
@@ -19,10 +19,14 @@ from typing import Any
 import pytest
 from aqt.qt import QTableWidgetItem  # pylint:disable=no-name-in-module
 
+from ankimorphs.ankimorphs_config import AnkiMorphsConfig
+from ankimorphs.exceptions import CancelledOperationException
 from ankimorphs.generators import (
+    generators_utils,
     priority_file_generator,
     readability_report_generator,
     study_plan_generator,
+    text_extractors,
 )
 from ankimorphs.generators.generators_output_dialog import (
     GeneratorOutputDialog,
@@ -30,6 +34,7 @@ from ankimorphs.generators.generators_output_dialog import (
 )
 from ankimorphs.generators.generators_utils import Column
 from ankimorphs.generators.generators_window import GeneratorWindow
+from ankimorphs.morpheme import Morpheme
 
 
 @pytest.mark.parametrize(
@@ -214,6 +219,69 @@ def _set_morphemizer(
     generator_window.ui.morphemizerComboBox.setCurrentIndex(index)
 
 
+@pytest.mark.parametrize(
+    "fake_environment_fixture",
+    [default_fake_environment_params],
+    indirect=True,
+)
+def test_morph_occurrences_by_file_order_and_cancel(
+    fake_environment_fixture: FakeEnvironment,
+    qtbot: Any,  # pylint:disable=unused-argument
+) -> None:
+    gw = GeneratorWindow()
+    gw.ui.inputDirLineEdit.setText(str(Path(PATH_TESTS_DATA, "ja_subs")))
+    gw._background_gather_files_and_populate_files_column()
+    _set_morphemizer(
+        generator_window=gw, morphemizer_description="AnkiMorphs: Japanese"
+    )
+
+    # the files are read in parallel, but the output has to follow the input order
+    for input_files in [gw._input_files, list(reversed(gw._input_files))]:
+        morph_occurrences_by_file = generators_utils.generate_morph_occurrences_by_file(
+            ui=gw.ui,
+            morphemizers=gw._morphemizers,
+            input_dir_root=gw._input_dir_root,
+            input_files=input_files,
+        )
+        assert list(morph_occurrences_by_file) == input_files
+
+    fake_environment_fixture.mock_mw.progress.want_cancel.return_value = True
+
+    with pytest.raises(CancelledOperationException):
+        generators_utils.generate_morph_occurrences_by_file(
+            ui=gw.ui,
+            morphemizers=gw._morphemizers,
+            input_dir_root=gw._input_dir_root,
+            input_files=gw._input_files,
+        )
+
+
+@pytest.mark.parametrize(
+    "fake_environment_fixture",
+    [default_fake_environment_params],
+    indirect=True,
+)
+def test_extract_epub_text(  # pylint:disable=unused-argument
+    fake_environment_fixture: FakeEnvironment | None,
+) -> None:
+    # the fake environment sets up the anki backend that strip_html uses
+    if fake_environment_fixture is None:
+        pytest.xfail()
+
+    epub_path = Path(PATH_TESTS_DATA, "epub_files", "romeo_and_juliet.epub")
+
+    # the documents are read from the zip file in the reading order (spine)
+    documents: list[str] = [
+        document.strip() for document in text_extractors.extract_epub_text(epub_path)
+    ]
+
+    assert len(documents) == 10
+    assert documents[0] == '"Cover"'
+    assert documents[1].startswith("The Project Gutenberg eBook of Romeo and Juliet")
+    assert "Contents" in documents[2]
+    assert "THE PROLOGUE\nEnter Chorus." in documents[3]
+
+
 ################################################################
 #            CASES: SOME STUDIED JAPANESE
 ################################################################
@@ -313,6 +381,55 @@ def test_readability_report(  # pylint:disable=too-many-arguments, unused-argume
     assert _item.text() == total_known_percent
 
 
+@pytest.mark.parametrize(
+    "fake_environment_fixture",
+    [case_some_studied_japanese_inflections, case_some_studied_japanese_lemmas],
+    indirect=True,
+)
+def test_morph_learning_intervals(
+    fake_environment_fixture: FakeEnvironment,
+) -> None:
+    # the in-memory intervals have to give the same results as querying the morphs one by one
+    am_config = AnkiMorphsConfig()
+    am_db = fake_environment_fixture.mock_db
+    learning_intervals = generators_utils.MorphLearningIntervals(am_config, am_db)
+
+    morphs: list[Morpheme] = [
+        Morpheme(lemma=lemma, inflection=inflection)
+        for lemma, inflection in am_db.con.execute(
+            "SELECT lemma, inflection FROM Morphs"
+        ).fetchall()
+    ]
+    morphs.append(Morpheme(lemma="not_in_the_db", inflection="not_in_the_db"))
+    assert len(morphs) > 1
+
+    for morph in morphs:
+        if am_config.evaluate_morph_inflection:
+            row = am_db.con.execute(
+                """
+                SELECT highest_inflection_learning_interval
+                FROM Morphs
+                WHERE lemma = ? AND inflection = ?
+                """,
+                (morph.lemma, morph.inflection),
+            ).fetchone()
+        else:
+            row = am_db.con.execute(
+                """
+                SELECT highest_lemma_learning_interval
+                FROM Morphs
+                WHERE lemma = ?
+                LIMIT 1
+                """,
+                (morph.lemma,),
+            ).fetchone()
+
+        expected_interval: int = 0 if row is None else row[0]
+        assert learning_intervals.get_highest_learning_interval(morph) == (
+            expected_interval
+        )
+
+
 @pytest.mark.parametrize(
     "fake_environment_fixture, only_store_lemma, expected_output_file",
     [
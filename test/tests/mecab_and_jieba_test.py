@@ -1,4 +1,5 @@
 import os
+import subprocess
 import sys
 from collections.abc import Iterator
 from test.test_globals import PATH_TESTS_DATA
@@ -7,7 +8,7 @@ from unittest import mock
 import pytest
 
 from ankimorphs.morpheme import Morpheme
-from ankimorphs.morphemizers import spacy_wrapper
+from ankimorphs.morphemizers import mecab_wrapper, spacy_wrapper
 from ankimorphs.morphemizers.morphemizer_utils import get_morphemizer_by_description
 
 
@@ -54,6 +55,88 @@ def test_mecab_morpheme_generation(  # pylint:disable=unused-argument
         assert morph in correct_morphs
 
 
+@pytest.mark.external_morphemizers
+def test_mecab_batch_morpheme_generation(  # pylint:disable=unused-argument
+    _fake_environment_fixture: None,
+) -> None:
+    # all the sentences are sent to mecab at once, the output
+    # should still match the sentences one-to-one and in order.
+    morphemizer = get_morphemizer_by_description("AnkiMorphs: Japanese")
+    assert morphemizer is not None
+
+    sentences = ["猫が好き", "本当に重要な任務の時しか 動かない", "", "犬\nです"] * 500
+    batch_morphs = list(morphemizer.get_morphemes(sentences))
+    assert len(batch_morphs) == len(sentences)
+
+    for sentence, morphs in zip(sentences[:4], batch_morphs[:4]):
+        assert morphs == next(morphemizer.get_morphemes([sentence]))
+
+    for index, morphs in enumerate(batch_morphs):
+        assert morphs == batch_morphs[index % 4]
+
+    assert Morpheme("猫", "猫") in batch_morphs[0]
+    assert Morpheme("動く", "動か") in batch_morphs[1]
+
+
+def test_mecab_exits_early() -> None:
+    # If mecab exits before it has produced the output of every
+    # expression, then the missing morphs should not just be empty.
+    # The fake mecab only answers the first expression and then exits.
+    fake_mecab = subprocess.Popen(  # pylint:disable=consider-using-with
+        [
+            sys.executable,
+            "-c",
+            "import sys; sys.stdout.write(sys.stdin.readline()); sys.stdout.flush()",
+        ],
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+    )
+
+    spawn_mecab_mock = mock.Mock(return_value=fake_mecab)
+
+    with mock.patch.object(mecab_wrapper, "_mecab_encoding", "utf-8"):
+        with mock.patch.object(mecab_wrapper, "_spawn_mecab", spawn_mecab_mock):
+            with pytest.raises(RuntimeError, match="mecab exited after 1 of 3"):
+                list(mecab_wrapper.get_morphemes_mecab_batch(["猫", "犬", "鳥"]))
+
+    # a new mecab process is spawned next time
+    spawn_mecab_mock.cache_clear.assert_called_once()
+
+    fake_mecab.wait()
+    assert fake_mecab.stdout is not None
+    fake_mecab.stdout.close()
+    assert fake_mecab.stdin is not None
+    fake_mecab.stdin.close()
+
+
+def test_mecab_batch_yields_per_chunk() -> None:
+    # The morphs of the first chunk should be yielded before the rest of
+    # the expressions are sent to mecab, otherwise recalc can't report
+    # progress or be cancelled, and highlighting would have to wait for
+    # the lock until all the expressions are done.
+    def fake_interact_batch(bytes_expressions: list[bytes]) -> list[bytes]:
+        # the lock is released between the chunks
+        assert mecab_wrapper._mecab_lock.locked()
+        return [b"\r\n" for _ in bytes_expressions]
+
+    interact_batch_mock = mock.Mock(side_effect=fake_interact_batch)
+
+    with mock.patch.object(mecab_wrapper, "_mecab_encoding", "utf-8"):
+        with mock.patch.object(mecab_wrapper, "_MECAB_CHUNK_SIZE", 2):
+            with mock.patch.object(
+                mecab_wrapper, "_interact_batch", interact_batch_mock
+            ):
+                morphs_generator = mecab_wrapper.get_morphemes_mecab_batch(
+                    ["猫", "犬", "鳥", "魚", "牛"]
+                )
+                assert next(morphs_generator) == []
+                assert interact_batch_mock.call_count == 1
+                assert not mecab_wrapper._mecab_lock.locked()
+
+                assert len(list(morphs_generator)) == 4
+                assert interact_batch_mock.call_count == 3
+
+
 @pytest.mark.external_morphemizers
 def test_jieba_morpheme_generation(  # pylint:disable=unused-argument
     _fake_environment_fixture: None,
@@ -10,9 +10,10 @@ from test.fake_environment_module import (  # pylint:disable=unused-import
 
 import pytest
 
-from ankimorphs import debug_utils, morph_priority_utils
+from ankimorphs import ankimorphs_config, debug_utils, morph_priority_utils
 from ankimorphs.ankimorphs_config import AnkiMorphsConfig
 from ankimorphs.exceptions import PriorityFileMalformedException
+from ankimorphs.recalc import caching
 
 # we don't need any special parameters for these tests
 default_fake_environment_params = FakeEnvironmentParams()
@@ -144,6 +145,124 @@ def test_morph_priority_with_collection_frequency(  # pylint:disable=unused-argu
     assert morph_priorities == correct_morphs_priorities
 
 
+@pytest.mark.parametrize(
+    "fake_environment_fixture",
+    [case_collection_frequency_inflection_params],
+    indirect=True,
+)
+def test_collection_priorities_stored_when_caching(
+    fake_environment_fixture: FakeEnvironment | None,
+) -> None:
+    # The collection frequency ranks should be stored in ankimorphs.db
+    # when caching, with one rank per morph/lemma found on the cards.
+    if fake_environment_fixture is None:
+        pytest.xfail()
+
+    am_config = AnkiMorphsConfig()
+    am_db = fake_environment_fixture.mock_db
+    caching.cache_anki_data(am_config, ankimorphs_config.get_read_enabled_filters())
+
+    for only_lemma_priorities, distinct_morphs_query in [
+        (False, "SELECT COUNT(DISTINCT morph_id) FROM Card_Morph_Map"),
+        (
+            True,
+            """
+            SELECT COUNT(DISTINCT m.lemma_id)
+            FROM Card_Morph_Map cmm
+            INNER JOIN Morphs m ON
+                cmm.morph_id = m.morph_id
+            """,
+        ),
+    ]:
+        num_morphs: int = am_db.con.execute(distinct_morphs_query).fetchone()[0]
+        assert num_morphs > 0
+
+        stored_ranks = [
+            row[0]
+            for row in am_db.con.execute(
+                """
+                SELECT rank
+                FROM Collection_Priorities
+                WHERE only_lemma_priorities = ?
+                """,
+                (only_lemma_priorities,),
+            )
+        ]
+        assert sorted(stored_ranks) == list(range(num_morphs))
+
+        morph_priorities = am_db.get_morph_priorities_from_collection(
+            only_lemma_priorities
+        )
+        assert sorted(morph_priorities.values()) == list(range(num_morphs))
+
+
+@pytest.mark.parametrize(
+    "fake_environment_fixture",
+    [default_fake_environment_params],
+    indirect=True,
+)
+def test_morph_priority_file_cache(
+    fake_environment_fixture: FakeEnvironment,
+) -> None:
+    am_db = fake_environment_fixture.mock_db
+    csv_file_name = "ja_core_news_sm_freq_inflection_min_occurrence.csv"
+    morph_priority_utils.clear_loaded_morph_priorities()
+
+    parsed_morph_priorities = morph_priority_utils._load_morph_priorities_from_file(
+        priority_file_name=csv_file_name, only_lemma_priorities=False
+    )
+    assert len(parsed_morph_priorities) > 0
+
+    morph_priorities = morph_priority_utils.get_morph_priority(
+        am_db=am_db,
+        only_lemma_priorities=False,
+        morph_priority_selection=csv_file_name,
+    )
+    assert morph_priorities == parsed_morph_priorities
+
+    # the same priorities are shared, e.g. by all the note filters in a recalc
+    assert morph_priorities is morph_priority_utils.get_morph_priority(
+        am_db=am_db,
+        only_lemma_priorities=False,
+        morph_priority_selection=csv_file_name,
+    )
+
+    # the compiled priorities are read from the db after a restart
+    morph_priority_utils.clear_loaded_morph_priorities()
+    priority_file_path = Path(
+        fake_environment_fixture.mock_mw.pm.profileFolder(),
+        fake_environment_fixture.priority_files_dir,
+        csv_file_name,
+    )
+    file_stat = priority_file_path.stat()
+
+    # recalc rebuilds the other tables, the cached priorities have to survive that
+    am_db.drop_all_tables()
+    am_db.create_all_tables()
+
+    assert (
+        am_db.get_cached_morph_priorities(
+            str(priority_file_path),
+            False,
+            file_stat.st_mtime_ns,
+            file_stat.st_size,
+        )
+        == parsed_morph_priorities
+    )
+
+    # the cache is invalid if the file changes
+    assert (
+        am_db.get_cached_morph_priorities(
+            str(priority_file_path),
+            False,
+            file_stat.st_mtime_ns,
+            file_stat.st_size + 1,
+        )
+        is None
+    )
+    morph_priority_utils.clear_loaded_morph_priorities()
+
+
 ################################################################
 #                    CASE: NO HEADERS
 ################################################################
@@ -0,0 +1,116 @@
+from test.fake_environment_module import (  # pylint:disable=unused-import
+    FakeEnvironment,
+    FakeEnvironmentParams,
+    fake_environment_fixture,
+)
+from unittest import mock
+
+import pytest
+
+from ankimorphs.ankimorphs_config import AnkiMorphsConfig
+from ankimorphs.morphemizers import morphemizer_cache
+from ankimorphs.morphemizers.simple_space_morphemizer import SimpleSpaceMorphemizer
+
+################################################################
+#                CASE: MORPHEMIZER CACHE
+################################################################
+# Morphemizes the same sentences twice, the second time the
+# morphs should come from the cache instead of the morphemizer.
+# Collection choice is arbitrary.
+# Database choice is arbitrary.
+################################################################
+case_morphemizer_cache_params = FakeEnvironmentParams()
+
+
+@pytest.mark.parametrize(
+    "fake_environment_fixture",
+    [case_morphemizer_cache_params],
+    indirect=True,
+)
+def test_morphemizer_cache(  # pylint:disable=unused-argument
+    fake_environment_fixture: FakeEnvironment,
+) -> None:
+    am_config = AnkiMorphsConfig()
+    morphemizer = SimpleSpaceMorphemizer()
+    sentences = ["the cat sat", "on the mat", "the cat sat"]
+
+    morphemizer_cache.reset_counters()
+    first_run = list(morphemizer.get_processed_morphs(am_config, sentences))
+    assert morphemizer_cache.hits == 1  # the duplicate sentence
+    assert morphemizer_cache.misses == 2
+
+    with mock.patch.object(
+        morphemizer, "get_morphemes", wraps=morphemizer.get_morphemes
+    ) as get_morphemes_spy:
+        second_run = list(morphemizer.get_processed_morphs(am_config, sentences))
+        get_morphemes_spy.assert_not_called()
+
+    assert morphemizer_cache.hits == 4
+    assert morphemizer_cache.misses == 2
+
+    for first_morphs, second_morphs in zip(first_run, second_run):
+        assert first_morphs == second_morphs
+
+
+@pytest.mark.parametrize(
+    "fake_environment_fixture",
+    [case_morphemizer_cache_params],
+    indirect=True,
+)
+def test_morphemizer_cache_single_morphemize_call(  # pylint:disable=unused-argument
+    fake_environment_fixture: FakeEnvironment,
+) -> None:
+    # The sentences are looked up in chunks, but all the misses should
+    # be given to the morphemizer at once, otherwise the spaCy worker
+    # processes would be restarted for every chunk.
+    am_config = AnkiMorphsConfig()
+    morphemizer = SimpleSpaceMorphemizer()
+    list(morphemizer.get_processed_morphs(am_config, ["the cat"]))
+
+    sentences = ["the cat", "a dog", "the cat", "one two", "a dog", "three"]
+
+    with mock.patch.object(morphemizer_cache, "_CHUNK_SIZE", 2):
+        with mock.patch.object(
+            morphemizer, "get_morphemes", wraps=morphemizer.get_morphemes
+        ) as get_morphemes_spy:
+            processed_morphs = list(
+                morphemizer.get_processed_morphs(am_config, sentences)
+            )
+            get_morphemes_spy.assert_called_once_with(["a dog", "one two", "three"])
+
+    assert processed_morphs == list(morphemizer.get_morphemes(sentences))
+
+
+@pytest.mark.parametrize(
+    "fake_environment_fixture",
+    [case_morphemizer_cache_params],
+    indirect=True,
+)
+def test_morphemizer_cache_eviction(  # pylint:disable=unused-argument
+    fake_environment_fixture: FakeEnvironment,
+) -> None:
+    am_config = AnkiMorphsConfig()
+    morphemizer = SimpleSpaceMorphemizer()
+    sentences = [f"sentence number {number}" for number in range(10)]
+
+    cache_path = morphemizer_cache._get_cache_path()
+    assert cache_path is not None
+
+    def get_number_of_entries() -> int:
+        assert cache_path is not None
+        with morphemizer_cache.MorphemizerCache(cache_path) as cache:
+            number_of_entries: int = cache.con.execute(
+                "SELECT COUNT(*) FROM Morphemizer_Cache"
+            ).fetchone()[0]
+        return number_of_entries
+
+    with mock.patch.object(morphemizer_cache, "MAX_CACHE_ENTRIES", 5):
+        list(morphemizer.get_processed_morphs(am_config, sentences))
+
+        # entries are only evicted in the background, i.e. during recalc,
+        # and not every time something is morphemized (highlighting)
+        assert get_number_of_entries() == 10
+
+        morphemizer_cache.update_last_used_and_evict()
+
+    assert get_number_of_entries() == 5
@@ -186,3 +186,46 @@ def test_progression(  # pylint:disable=too-many-arguments, unused-argument, too
         assert _item is not None
         _morph_statuses.append(_item.text())
     assert _morph_statuses == k_morph_statuses
+
+
+@pytest.mark.parametrize(
+    "fake_environment_fixture",
+    [case_big_japanese_collection_params],
+    indirect=True,
+)
+def test_progression_bins_reuse_engine(  # pylint:disable=unused-argument
+    fake_environment_fixture: FakeEnvironment,
+    qtbot: Any,
+) -> None:
+    pw = ProgressionWindow()
+    pw.ui.lemmaRadioButton.setChecked(False)
+    pw.ui.inflectionRadioButton.setChecked(True)
+    pw.ui.morphPriorityCBox.setCurrentText("Collection frequency")
+    pw.ui.minPrioritySpinBox.setValue(1)
+    pw.ui.maxPrioritySpinBox.setValue(50000)
+
+    pw.ui.cumulativeRadioButton.setChecked(False)
+    pw.ui.binSizeSpinBox.setValue(500)
+    pw._background_calculate_progress_and_populate_tables()
+    engine = pw._progression_engine
+    assert engine is not None
+
+    normal_reports = engine.get_progress_reports(pw._get_selected_bins())
+    total_morphs = sum(report.get_total_morphs() for report in normal_reports)
+
+    # only changing the bins should not reload the statuses or priorities
+    pw.ui.cumulativeRadioButton.setChecked(True)
+    pw.ui.binSizeSpinBox.setValue(100)
+    pw._background_calculate_progress_and_populate_tables()
+    assert pw._progression_engine is engine
+
+    cumulative_reports = engine.get_progress_reports(pw._get_selected_bins())
+    assert cumulative_reports[-1].get_total_morphs() == total_morphs
+
+    # cumulative bins are the running totals of the normal bins
+    pw.ui.cumulativeRadioButton.setChecked(False)
+    normal_reports = engine.get_progress_reports(pw._get_selected_bins())
+    running_total = 0
+    for normal_report, cumulative_report in zip(normal_reports, cumulative_reports):
+        running_total += normal_report.get_total_known()
+        assert cumulative_report.get_total_known() == running_total
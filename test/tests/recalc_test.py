@@ -1,6 +1,8 @@
 from __future__ import annotations
 
+import json
 from collections.abc import Sequence
+from pathlib import Path
 from test.fake_configs import (
     config_big_japanese_collection,
     config_default_field,
@@ -13,6 +15,7 @@ from test.fake_configs import (
     config_max_morph_priority,
     config_offset_inflection_enabled,
     config_offset_lemma_enabled,
+    config_recalc_profiling,
     config_suspend_known,
     config_wrong_field_name,
     config_wrong_morph_priority,
@@ -24,13 +27,14 @@ from test.fake_environment_module import (  # pylint:disable=unused-import
     FakeEnvironmentParams,
     fake_environment_fixture,
 )
+from unittest import mock
 
 import pytest
 
 from ankimorphs import ankimorphs_config
 from ankimorphs import ankimorphs_globals as am_globals
 from ankimorphs import text_preprocessing
-from ankimorphs.ankimorphs_config import RawConfigFilterKeys
+from ankimorphs.ankimorphs_config import AnkiMorphsConfig, RawConfigFilterKeys
 from ankimorphs.exceptions import (
     AnkiFieldNotFound,
     AnkiNoteTypeNotFound,
@@ -39,15 +43,20 @@ from ankimorphs.exceptions import (
     MorphemizerNotFoundException,
     PriorityFileNotFoundException,
 )
-from ankimorphs.recalc import recalc_main
+from ankimorphs.morphemizers import morphemizer_utils
+from ankimorphs.recalc import caching, recalc_main, recalc_profiler
 
 # these have to be placed here to avoid cyclical imports
 from anki.cards import Card, CardId  # isort:skip  pylint:disable=wrong-import-order
+from anki.consts import (  # isort:skip pylint:disable=wrong-import-order
+    CARD_TYPE_REV,
+    QUEUE_TYPE_REV,
+)
 from anki.models import (  # isort:skip pylint:disable=wrong-import-order
     ModelManager,
     NotetypeDict,
 )
-from anki.notes import Note  # isort:skip  pylint:disable=wrong-import-order
+from anki.notes import Note, NoteId  # isort:skip  pylint:disable=wrong-import-order
 
 
 ################################################################
@@ -267,6 +276,422 @@ def test_recalc(  # pylint:disable=too-many-locals
             assert actual_note.fields[pos] == expected_note.fields[pos]
 
 
+################################################################
+#                 CASE: INCREMENTAL RECALC
+################################################################
+# Caches the collection twice. The expressions have not changed
+# between the two runs, so the second run should reuse the
+# morphs from the first run instead of morphemizing again.
+# Collection choice is arbitrary.
+################################################################
+@pytest.mark.parametrize(
+    "fake_environment_fixture",
+    [case_same_lemma_and_inflection_scores_params],
+    indirect=True,
+)
+def test_recalc_reuses_unchanged_card_morphs(
+    fake_environment_fixture: FakeEnvironment | None,
+) -> None:
+    if fake_environment_fixture is None:
+        pytest.xfail()
+
+    am_config = AnkiMorphsConfig()
+    read_enabled_config_filters = ankimorphs_config.get_read_enabled_filters()
+    morphemizer = morphemizer_utils.get_morphemizer_by_description(
+        read_enabled_config_filters[0].morphemizer_description
+    )
+    assert morphemizer is not None
+
+    caching.cache_anki_data(am_config, read_enabled_config_filters)
+    card_morphs_first_run = fake_environment_fixture.mock_db.get_all_card_morphs()
+    assert card_morphs_first_run is not None
+    assert len(card_morphs_first_run) > 0
+
+    with mock.patch.object(
+        morphemizer, "get_processed_morphs", wraps=morphemizer.get_processed_morphs
+    ) as get_processed_morphs_spy:
+        caching.cache_anki_data(am_config, read_enabled_config_filters)
+        get_processed_morphs_spy.assert_called_once_with(am_config, [])
+
+    card_morphs_second_run = fake_environment_fixture.mock_db.get_all_card_morphs()
+    assert card_morphs_first_run == card_morphs_second_run
+
+
+################################################################
+#                 CASE: CHUNKED INSERTS
+################################################################
+# The rows are inserted into ankimorphs.db in chunks while the
+# cards are processed, the chunk size should not affect the
+# resulting tables.
+# Collection choice is arbitrary.
+################################################################
+@pytest.mark.parametrize(
+    "fake_environment_fixture",
+    [case_same_lemma_and_inflection_scores_params],
+    indirect=True,
+)
+def test_recalc_chunked_inserts(
+    fake_environment_fixture: FakeEnvironment | None,
+) -> None:
+    if fake_environment_fixture is None:
+        pytest.xfail()
+
+    am_config = AnkiMorphsConfig()
+    read_enabled_config_filters = ankimorphs_config.get_read_enabled_filters()
+    am_db = fake_environment_fixture.mock_db
+
+    def get_tables() -> list[list[tuple[object, ...]]]:
+        return [
+            sorted(am_db.con.execute(f"SELECT * FROM {table}").fetchall())
+            for table in ["Cards", "Morphs", "Card_Morph_Map"]
+        ]
+
+    caching.cache_anki_data(am_config, read_enabled_config_filters)
+    tables_default_chunks = get_tables()
+    assert len(tables_default_chunks[1]) > 0
+
+    with mock.patch.object(caching, "_INSERT_CHUNK_SIZE", 1):
+        caching.cache_anki_data(am_config, read_enabled_config_filters)
+
+    assert get_tables() == tables_default_chunks
+
+
+################################################################
+#               CASE: DUPLICATE EXPRESSIONS
+################################################################
+# Every unique expression should only be morphemized once, and
+# the morphs should then be added to all the cards that have
+# that expression. The preprocessing is patched to give every
+# card the same expression.
+# Collection choice is arbitrary.
+################################################################
+@pytest.mark.parametrize(
+    "fake_environment_fixture",
+    [case_same_lemma_and_inflection_scores_params],
+    indirect=True,
+)
+def test_recalc_duplicate_expressions(
+    fake_environment_fixture: FakeEnvironment | None,
+) -> None:
+    if fake_environment_fixture is None:
+        pytest.xfail()
+
+    am_config = AnkiMorphsConfig()
+    read_enabled_config_filters = ankimorphs_config.get_read_enabled_filters()
+    am_db = fake_environment_fixture.mock_db
+
+    # makes sure none of the morphs of the previous recalc are reused
+    am_db.drop_all_tables()
+    am_db.create_all_tables()
+    caching.reset_counters()
+
+    with mock.patch.object(
+        caching, "get_processed_text", return_value="the same expression"
+    ):
+        caching.cache_anki_data(am_config, read_enabled_config_filters)
+
+    card_amount: int = am_db.con.execute("SELECT COUNT(*) FROM Cards").fetchone()[0]
+    assert card_amount > 1
+    assert caching.morphemized_cards == card_amount
+    assert caching.unique_expressions == 1
+
+    card_morphs = am_db.get_all_card_morphs()
+    assert card_morphs is not None
+    assert len(card_morphs) == card_amount
+    assert len({frozenset(morphs) for morphs in card_morphs.values()}) == 1
+
+
+################################################################
+#                    CASE: TAG FILTERS
+################################################################
+# The tag filters should match tags the same way Anki does, i.e.
+# ignoring the case and including the child tags of hierarchical
+# tags, but not other tags that just start with the same text.
+# Collection choice is arbitrary.
+################################################################
+@pytest.mark.parametrize(
+    "fake_environment_fixture",
+    [case_same_lemma_and_inflection_scores_params],
+    indirect=True,
+)
+def test_recalc_tag_filters(
+    fake_environment_fixture: FakeEnvironment | None,
+) -> None:
+    if fake_environment_fixture is None:
+        pytest.xfail()
+
+    am_config = AnkiMorphsConfig()
+    read_enabled_config_filters = ankimorphs_config.get_read_enabled_filters()
+    am_db = fake_environment_fixture.mock_db
+    caching.cache_anki_data(am_config, read_enabled_config_filters)
+
+    note_type_id = am_db.con.execute("SELECT note_type_id FROM Cards").fetchone()[0]
+    all_cards = am_db.get_am_cards_data_dict(note_type_id, [], [])
+    known_cards = {
+        card_id
+        for card_id, card_data in all_cards.items()
+        if am_config.tag_known_manually in card_data.tags.split()
+    }
+    assert 0 < len(known_cards) < len(all_cards)
+
+    def get_card_ids(include_tags: list[str], exclude_tags: list[str]) -> set[int]:
+        return set(
+            am_db.get_am_cards_data_dict(note_type_id, include_tags, exclude_tags)
+        )
+
+    assert get_card_ids([am_config.tag_known_manually.upper()], []) == known_cards
+    assert get_card_ids([], [am_config.tag_known_manually]) == (
+        set(all_cards) - known_cards
+    )
+    assert get_card_ids([am_config.tag_known_manually[:-1]], []) == set()
+
+    # gives one of the other cards a child tag of the known tag
+    child_tag_card_id = next(iter(set(all_cards) - known_cards))
+    child_tag_id = am_db.con.execute("SELECT MAX(tag_id) + 1 FROM Tags").fetchone()[0]
+    am_db.insert_many_into_tag_table(
+        [(child_tag_id, f"{am_config.tag_known_manually}::child")]
+    )
+    am_db.insert_many_into_card_tags_table([(child_tag_card_id, child_tag_id)])
+
+    assert get_card_ids([am_config.tag_known_manually], []) == (
+        known_cards | {child_tag_card_id}
+    )
+
+
+################################################################
+#                 CASE: OUTDATED DB SCHEMA
+################################################################
+# Older versions stored the lemma and inflection as text in the
+# Card_Morph_Map table. Those tables should be recreated with
+# the integer id schema, and recalc should then work as usual.
+# Collection choice is arbitrary.
+################################################################
+@pytest.mark.parametrize(
+    "fake_environment_fixture",
+    [case_same_lemma_and_inflection_scores_params],
+    indirect=True,
+)
+def test_recalc_outdated_db_schema(
+    fake_environment_fixture: FakeEnvironment | None,
+) -> None:
+    if fake_environment_fixture is None:
+        pytest.xfail()
+
+    am_db = fake_environment_fixture.mock_db
+    am_db.drop_all_tables()
+    with am_db.con:
+        am_db.con.execute(
+            """
+            CREATE TABLE Card_Morph_Map
+            (
+                card_id INTEGER,
+                morph_lemma TEXT,
+                morph_inflection TEXT,
+                PRIMARY KEY(card_id, morph_lemma, morph_inflection)
+            )
+            """
+        )
+
+    am_db.create_all_tables()
+    columns = [
+        row[1] for row in am_db.con.execute("PRAGMA table_info('Card_Morph_Map')")
+    ]
+    assert columns == ["card_id", "morph_id"]
+
+    am_config = AnkiMorphsConfig()
+    read_enabled_config_filters = ankimorphs_config.get_read_enabled_filters()
+    caching.cache_anki_data(am_config, read_enabled_config_filters)
+
+    card_morphs = am_db.get_all_card_morphs()
+    assert card_morphs is not None
+    assert len(card_morphs) > 0
+
+
+################################################################
+#                 CASE: UNCHANGED CARDS
+################################################################
+# Runs recalc twice. Nothing changes between the two runs, so
+# the second run should not load or update any cards or notes.
+# Collection choice is arbitrary.
+################################################################
+@pytest.mark.parametrize(
+    "fake_environment_fixture",
+    [case_same_lemma_and_inflection_scores_params],
+    indirect=True,
+)
+def test_recalc_only_loads_modified_cards(
+    fake_environment_fixture: FakeEnvironment | None,
+) -> None:
+    if fake_environment_fixture is None:
+        pytest.xfail()
+
+    collection = fake_environment_fixture.mock_mw.col
+    read_enabled_config_filters = ankimorphs_config.get_read_enabled_filters()
+    modify_enabled_config_filters = ankimorphs_config.get_modify_enabled_filters()
+
+    recalc_main._recalc_background_op(
+        read_enabled_config_filters=read_enabled_config_filters,
+        modify_enabled_config_filters=modify_enabled_config_filters,
+    )
+
+    with (
+        mock.patch.object(
+            collection, "get_card", wraps=collection.get_card
+        ) as get_card_spy,
+        mock.patch.object(
+            collection, "get_note", wraps=collection.get_note
+        ) as get_note_spy,
+    ):
+        recalc_main._recalc_background_op(
+            read_enabled_config_filters=read_enabled_config_filters,
+            modify_enabled_config_filters=modify_enabled_config_filters,
+        )
+        get_card_spy.assert_not_called()
+        get_note_spy.assert_not_called()
+
+
+################################################################
+#               CASE: NEW AND REVIEW SIBLING CARDS
+################################################################
+# The note type gets a second card template, so every note has
+# a new card and a sibling card. The last card (in card id
+# order) whose update changes the note decides the tags and
+# fields of the note, just like when every card updated its own
+# copy of the note. The review cards have an interval of zero,
+# so the morph statuses stay the same between the two recalcs.
+# Collection choice is arbitrary.
+################################################################
+@pytest.mark.parametrize(
+    "fake_environment_fixture",
+    [case_same_lemma_and_inflection_scores_params],
+    indirect=True,
+)
+def test_recalc_new_and_review_sibling_cards(  # pylint:disable=too-many-locals
+    fake_environment_fixture: FakeEnvironment | None,
+) -> None:
+    if fake_environment_fixture is None:
+        pytest.xfail()
+
+    am_config = AnkiMorphsConfig()
+    collection = fake_environment_fixture.mock_mw.col
+    model_manager: ModelManager = collection.models
+    note_type_dict: NotetypeDict | None = model_manager.by_name(
+        fake_environment_fixture.config["filters"][0]["note_type"]
+    )
+    assert note_type_dict is not None
+
+    first_template = note_type_dict["tmpls"][0]
+    second_template = model_manager.new_template("Card 2")
+    second_template["qfmt"] = f"{first_template['qfmt']}<br>2"
+    second_template["afmt"] = first_template["afmt"]
+    model_manager.add_template(note_type_dict, second_template)
+    model_manager.update_dict(note_type_dict)  # generates the sibling cards
+
+    read_enabled_config_filters = ankimorphs_config.get_read_enabled_filters()
+    modify_enabled_config_filters = ankimorphs_config.get_modify_enabled_filters()
+
+    recalc_main._recalc_background_op(
+        read_enabled_config_filters=read_enabled_config_filters,
+        modify_enabled_config_filters=modify_enabled_config_filters,
+    )
+
+    ready_note_ids = list(collection.find_notes(f"tag:{am_config.tag_ready}"))
+    assert len(ready_note_ids) >= 4
+    review_first_id, review_last_id, review_first_no_tag_id, all_new_id = (
+        ready_note_ids[:4]
+    )
+
+    def make_review_card(note_id: NoteId, card_position: int) -> None:
+        card_ids = sorted(collection.card_ids_of_note(note_id))
+        assert len(card_ids) == 2
+        card: Card = collection.get_card(card_ids[card_position])
+        card.type = CARD_TYPE_REV
+        card.queue = QUEUE_TYPE_REV
+        card.ivl = 0
+        collection.update_card(card)
+
+    make_review_card(review_first_id, 0)
+    make_review_card(review_last_id, 1)
+    make_review_card(review_first_no_tag_id, 0)
+
+    note_without_tag: Note = collection.get_note(review_first_no_tag_id)
+    note_without_tag.tags.remove(am_config.tag_ready)
+    collection.update_note(note_without_tag)
+
+    recalc_main._recalc_background_op(
+        read_enabled_config_filters=read_enabled_config_filters,
+        modify_enabled_config_filters=modify_enabled_config_filters,
+    )
+
+    def has_ready_tag(note_id: NoteId) -> bool:
+        return am_config.tag_ready in collection.get_note(note_id).tags
+
+    # the new card is last, but it does not change the note, so the
+    # update of the review card, which removes the tag, is used.
+    assert not has_ready_tag(review_first_id)
+    # the review card is last and its update removes the tag
+    assert not has_ready_tag(review_last_id)
+    # the new card is last and its update adds the tag back
+    assert has_ready_tag(review_first_no_tag_id)
+    # none of the cards change the note
+    assert has_ready_tag(all_new_id)
+
+
+################################################################
+#                 CASE: RECALC PROFILING
+################################################################
+# The profiler should write a report with the timings of the
+# recalc stages to the profile folder.
+# Collection choice is arbitrary.
+################################################################
+@pytest.mark.parametrize(
+    "fake_environment_fixture",
+    [
+        FakeEnvironmentParams(
+            actual_col="lemma_evaluation_lemma_extra_fields_collection",
+            config=config_recalc_profiling,
+        )
+    ],
+    indirect=True,
+)
+def test_recalc_profiling(
+    fake_environment_fixture: FakeEnvironment | None,
+) -> None:
+    if fake_environment_fixture is None:
+        pytest.xfail()
+
+    report_path = Path(
+        fake_environment_fixture.mock_mw.pm.profileFolder(),
+        recalc_profiler.REPORT_FILE_NAME,
+    )
+
+    report = recalc_main._recalc_background_op(
+        read_enabled_config_filters=ankimorphs_config.get_read_enabled_filters(),
+        modify_enabled_config_filters=ankimorphs_config.get_modify_enabled_filters(),
+    )
+
+    try:
+        assert report is not None
+        with report_path.open(encoding="utf-8") as file:
+            assert json.load(file) == report
+
+        stages = {stage["name"]: stage for stage in report["stages"]}
+        for stage_name in [
+            "Anki DB read",
+            "Preprocessing",
+            "ankimorphs.db inserts",
+            "get_card_morph_map_cache",
+            "Scoring",
+            "Tag and field updates",
+            "update_cards/update_notes",
+        ]:
+            assert stages[stage_name]["calls"] > 0
+        assert stages["Anki DB read"]["items"] > 0
+        assert stages["Scoring"]["items"] > 0
+    finally:
+        report_path.unlink(missing_ok=True)
+
+
 ################################################################
 #                  CASE: WRONG NOTE TYPE
 ################################################################
@@ -10,12 +10,14 @@ from test.fake_environment_module import (  # pylint:disable=unused-import
 )
 
 import pytest
+from anki.cards import CardId
 from anki.consts import CardQueue
 from aqt.reviewer import Reviewer
 
-from ankimorphs import reviewing_utils
+from ankimorphs import browser_utils, reviewing_utils
 from ankimorphs.ankimorphs_config import AnkiMorphsConfig
 from ankimorphs.reviewing_utils import SkippedCards
+from ankimorphs.seen_morphs_index import seen_morphs_index
 
 ################################################################
 #                  CASE: SKIP INFLECTIONS
@@ -64,6 +66,9 @@ def test_custom_review(
     am_config = AnkiMorphsConfig()
     skipped_cards = SkippedCards()
 
+    # the index is kept in memory between tests
+    seen_morphs_index.reset()
+
     reviewing_utils.init_undo_targets()
 
     mock_mw.reviewer.nextCard = partial(
@@ -96,3 +101,51 @@ def test_custom_review(
     reviewing_utils._set_card_as_known_and_skip(am_config)
     assert mock_mw.col.get_card(second_card).queue == CardQueue(-2)  # buried
     assert mock_mw.reviewer.card.id == third_card
+
+    # the incremental updates should give the same result as reading the db
+    seen_morph_ids = seen_morphs_index.seen_morph_ids
+    seen_lemma_ids = seen_morphs_index.seen_lemma_ids
+    seen_morphs_index.reset_seen_morphs()
+    mock_db.load_seen_morphs_index()
+    assert seen_morphs_index.seen_morph_ids == seen_morph_ids
+    assert seen_morphs_index.seen_lemma_ids == seen_lemma_ids
+
+
+@pytest.mark.parametrize(
+    "fake_environment_fixture",
+    [case_skip_inflections_params],
+    indirect=True,
+)
+def test_browse_same_morphs_card_ids(
+    fake_environment_fixture: FakeEnvironment,
+) -> None:
+    mock_db = fake_environment_fixture.mock_db
+    am_config = AnkiMorphsConfig()
+
+    # the card has the morphs: "man", "the", and "walk"
+    card_id = CardId(1715776939301)
+    walk_cards = {CardId(1715776939301)}
+    walk_lemma_cards = {
+        CardId(1715776939301),
+        CardId(1715776946917),
+        CardId(1715776953867),
+    }
+
+    assert mock_db.get_ids_of_cards_with_same_morphs(card_id, search_unknowns=True) == (
+        walk_cards
+    )
+    assert (
+        mock_db.get_ids_of_cards_with_same_morphs(
+            card_id, search_unknowns=True, search_lemma_only=True
+        )
+        == walk_lemma_cards
+    )
+
+    all_card_ids = mock_db.get_ids_of_cards_with_same_morphs(card_id)
+    assert all_card_ids is not None
+    assert walk_lemma_cards < all_card_ids
+
+    query = browser_utils.focus_query(am_config, walk_lemma_cards)
+    assert query is not None
+    assert query.startswith("cid:")
+    assert {CardId(int(_id)) for _id in query[4:].split(",")} == walk_lemma_cards
@@ -612,3 +612,29 @@ def test_spacy(  # pylint:disable=unused-argument
 
     assert processed_morphs == expected_am_morphs
     # assert False
+
+
+def test_spacy_worker_processes(  # pylint:disable=unused-argument
+    fake_environment_fixture: None,
+) -> None:
+    # the results should be the same and in the same order regardless
+    # of how many processes are used
+    spacy_wrapper.load_spacy_modules()
+
+    morphemizer = SpacyMorphemizer("en_core_web_sm")
+    sentences = [f"the {number} cats are sleeping" for number in range(20)] + [
+        "we walked home",
+        "she reads books",
+    ]
+
+    # get_morphemes is used directly, the morphemizer cache would
+    # otherwise return the morphs of the first run the second time.
+    morphemizer.batch_size = 4
+    morphemizer.worker_processes = 1
+    single_process_morphs = list(morphemizer.get_morphemes(sentences))
+
+    morphemizer.worker_processes = 3
+    multi_process_morphs = list(morphemizer.get_morphemes(sentences))
+
+    assert len(single_process_morphs) == len(sentences)
+    assert single_process_morphs == multi_process_morphs
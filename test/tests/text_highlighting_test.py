@@ -1,3 +1,4 @@
+# pylint:disable=too-many-lines
 from __future__ import annotations
 
 from test.fake_configs import (
@@ -15,6 +16,7 @@ from unittest import mock
 import anki
 import pytest
 
+import ankimorphs
 from ankimorphs import ankimorphs_config
 from ankimorphs.ankimorphs_config import AnkiMorphsConfig, AnkiMorphsConfigFilter
 from ankimorphs.highlighting import highlight_just_in_time
@@ -877,6 +879,7 @@ def test_highlighting(  # pylint:disable=unused-argument
     # needs to be cleared between runs since the learning intervals are
     # manually created and therefore inconsistent across tests
     Morpheme.get_learning_status.cache_clear()
+    highlight_just_in_time.invalidate_highlighting_cache()
 
     am_config = AnkiMorphsConfig()
 
@@ -946,3 +949,110 @@ def _get_filter_name(ruby_type: type[Ruby]) -> str:
     if ruby_type == KanaRuby:
         return "am-highlight-kana"
     return "am-highlight"
+
+
+@pytest.mark.parametrize(
+    "fake_environment_fixture",
+    [case_japanese_one_params],
+    indirect=True,
+)
+def test_highlighting_cache(  # pylint:disable=unused-argument
+    fake_environment_fixture: FakeEnvironment,
+) -> None:
+    Morpheme.get_learning_status.cache_clear()
+    highlight_just_in_time.invalidate_highlighting_cache()
+
+    morphemizing_calls: list[str] = []
+
+    def _get_morph_meta_for_text(
+        morphemizer: Morphemizer, field_text: str, am_config: AnkiMorphsConfig
+    ) -> list[Morpheme]:
+        morphemizing_calls.append(field_text)
+        return case_japanese_one_card_morphs
+
+    patches: list[Any] = [
+        mock.patch.object(
+            highlight_just_in_time,
+            "_get_morph_meta_for_text",
+            _get_morph_meta_for_text,
+        ),
+        mock.patch.object(
+            ankimorphs_config,
+            "get_matching_filter",
+            lambda _: mock.Mock(
+                spec=AnkiMorphsConfigFilter, morphemizer_description=""
+            ),
+        ),
+        mock.patch.object(
+            morphemizer_utils,
+            "get_morphemizer_by_description",
+            lambda _: mock.Mock(spec=Morphemizer),
+        ),
+    ]
+
+    for patch in patches:
+        patch.start()
+
+    context = mock.Mock(spec=anki.template.TemplateRenderContext)
+    context.note.return_value = mock.Mock(mid=1)
+
+    def _highlight() -> str:
+        return highlight_morphs_jit(
+            field_text=CASE_JAPANESE_ONE_INPUT_TEXT,
+            field_name="",
+            filter_name="am-highlight-furigana",
+            context=context,
+        )
+
+    try:
+        # the question and the answer side render the same field
+        assert _highlight() == CASE_JAPANESE_ONE_CORRECT_FURIGANA_OUTPUT
+        assert _highlight() == CASE_JAPANESE_ONE_CORRECT_FURIGANA_OUTPUT
+        assert len(morphemizing_calls) == 1
+
+        # recalc invalidates the cache
+        highlight_just_in_time.invalidate_highlighting_cache()
+        assert _highlight() == CASE_JAPANESE_ONE_CORRECT_FURIGANA_OUTPUT
+        assert len(morphemizing_calls) == 2
+
+        # so does saving the configs in the config editor of the add-ons dialog
+        ankimorphs.invalidate_config_caches({})
+        assert _highlight() == CASE_JAPANESE_ONE_CORRECT_FURIGANA_OUTPUT
+        assert len(morphemizing_calls) == 3
+    finally:
+        for patch in patches:
+            patch.stop()
+
+
+@pytest.mark.parametrize(
+    "fake_environment_fixture, correct_output, ruby_type",
+    [
+        (case_japanese_one_params, CASE_JAPANESE_ONE_CORRECT_TEXT_OUTPUT, TextRuby),
+        (case_japanese_one_params, CASE_JAPANESE_ONE_CORRECT_KANJI_OUTPUT, KanjiRuby),
+        (case_japanese_one_params, CASE_JAPANESE_ONE_CORRECT_KANA_OUTPUT, KanaRuby),
+        (
+            case_japanese_one_params,
+            CASE_JAPANESE_ONE_CORRECT_FURIGANA_OUTPUT,
+            FuriganaRuby,
+        ),
+    ],
+    indirect=["fake_environment_fixture"],
+)
+def test_highlighting_long_field(  # pylint:disable=unused-argument
+    fake_environment_fixture: FakeEnvironment,
+    correct_output: str,
+    ruby_type: type[Ruby],
+) -> None:
+    # Long fields (e.g. full transcripts) have to give the same result as
+    # highlighting every part of them separately.
+    Morpheme.get_learning_status.cache_clear()
+    repetitions = 100
+
+    highlighted_text: str = TextHighlighter(
+        AnkiMorphsConfig(),
+        CASE_JAPANESE_ONE_INPUT_TEXT * repetitions,
+        case_japanese_one_card_morphs,
+        ruby_type,
+    ).highlighted()
+
+    assert highlighted_text == correct_output * repetitions